@@ -1,13 +1,12 @@
-import uuid
-from datetime import datetime
+from app.models.base import BaseModel
 
 
-class Amenity:
+class Amenity(BaseModel):
+    __slots__ = ("_name",)
+
     def __init__(self, name):
-        self.id = str(uuid.uuid4())
+        super().__init__()
         self.name = name
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
 
     """
     NAME
@@ -27,22 +26,3 @@ class Amenity:
         if len(value) > 50:
             raise ValueError("Amenity name cannot exceed 50 characters")
         self._name = value
-
-    """
-    SAVE
-    """
-
-    def save(self):
-        """Function to save created_at time"""
-        self.updated_at = datetime.now()
-
-    """
-    UPDATE
-    """
-
-    def update(self, data):
-        """Function to save updated_at time"""
-        for key, value in data.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
-        self.save()
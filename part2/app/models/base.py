@@ -0,0 +1,197 @@
+import uuid
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+ID_SIZE = 16
+
+
+def to_key(obj_id):
+    """16 bytes of a canonical UUID string, any other id is returned as is"""
+    if isinstance(obj_id, str) and len(obj_id) == 36 and obj_id[8] == obj_id[13] == obj_id[18] == obj_id[23] == "-":
+        try:
+            return bytes.fromhex(obj_id.replace("-", ""))
+        except ValueError:
+            pass
+    return obj_id
+
+
+def from_key(key):
+    """Inverse of to_key"""
+    if isinstance(key, bytes):
+        h = key.hex()
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+    return key
+
+
+def to_epoch(value):
+    """Microseconds since 1970 of a naive datetime"""
+    return (value - EPOCH) // MICROSECOND
+
+
+def from_epoch(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+class BaseModel:
+    """Id and timestamps shared by every model, kept compact.
+
+    Models declare __slots__ so instances have no __dict__. The id is
+    held as 16 bytes (exposed as the usual string) and the timestamps as
+    microseconds since 1970 (exposed as datetimes).
+    """
+
+    __slots__ = ("_id", "_created_at", "_updated_at")
+
+    def __init__(self):
+        self._id = uuid.uuid4().bytes
+        self._created_at = self._updated_at = to_epoch(datetime.now())
+
+    """
+    ID
+    """
+    @property
+    def id(self):
+        return from_key(self._id)
+
+    @id.setter
+    def id(self, value):
+        key = to_key(value)
+        if not isinstance(key, bytes):
+            raise ValueError("Id must be a UUID")
+        self._id = key
+
+    @property
+    def key(self):
+        """Compact id, what repositories store objects by"""
+        return self._id
+
+    """
+    TIMESTAMPS
+    """
+    @property
+    def created_at(self):
+        return from_epoch(self._created_at)
+
+    @created_at.setter
+    def created_at(self, value):
+        self._created_at = to_epoch(value)
+
+    @property
+    def updated_at(self):
+        return from_epoch(self._updated_at)
+
+    @updated_at.setter
+    def updated_at(self, value):
+        self._updated_at = to_epoch(value)
+
+    """
+    SAVE
+    """
+    def save(self):
+        """Function to save updated_at time"""
+        self.updated_at = datetime.now()
+
+    """
+    UPDATE
+    """
+    def update(self, data):
+        """Function to save updated_at time"""
+        for key, value in data.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+        self.save()
+
+    """
+    STATE
+    """
+    def __getstate__(self):
+        """Slot values, as pickle and DurableStore use them"""
+        return {
+            name: getattr(self, name)
+            for cls in type(self).__mro__
+            for name in getattr(cls, "__slots__", ())
+            if hasattr(self, name)
+        }
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+
+"""
+ID SETS
+"""
+# Back-reference collections: None while empty, a bytearray of packed
+# 16-byte ids up to PACKED_MAX ids, then a dict of ids (values unused),
+# which keeps insertion order with O(1) membership and removal. Ids are
+# unique, as in a set. Functions taking an item accept an object or its id.
+PACKED_MAX = 32
+
+
+def _item_key(item):
+    key = getattr(item, "key", None)
+    if key is None:
+        key = to_key(item)
+    if not isinstance(key, bytes):
+        raise ValueError("Id must be a UUID")
+    return key
+
+
+def _find_id(packed, key):
+    start = 0
+    while True:
+        index = packed.find(key, start)
+        if index < 0 or index % ID_SIZE == 0:
+            return index
+        start = index + 1
+
+
+def append_id(ids, item):
+    """ids with the id of item added at the end, unless it is there already"""
+    key = _item_key(item)
+    if ids is None:
+        return bytearray(key)
+    if type(ids) is dict:
+        ids[key] = None
+        return ids
+    if _find_id(ids, key) >= 0:
+        return ids
+    if len(ids) >= PACKED_MAX * ID_SIZE:
+        ids = dict.fromkeys(bytes(ids[i:i + ID_SIZE]) for i in range(0, len(ids), ID_SIZE))
+        ids[key] = None
+        return ids
+    ids += key
+    return ids
+
+
+def remove_id(ids, item):
+    """ids without item's id (None once empty), and whether it was there"""
+    if not ids:
+        return ids, False
+    key = _item_key(item)
+    if type(ids) is dict:
+        if ids.pop(key, False) is not None:
+            return ids, False
+        return ids or None, True
+    index = _find_id(ids, key)
+    if index < 0:
+        return ids, False
+    del ids[index:index + ID_SIZE]
+    return ids or None, True
+
+
+def contains_id(ids, item):
+    if not ids:
+        return False
+    key = _item_key(item)
+    return key in ids if type(ids) is dict else _find_id(ids, key) >= 0
+
+
+def unpack_ids(ids):
+    """Id strings of ids, in insertion order"""
+    if not ids:
+        return []
+    if type(ids) is dict:
+        return [from_key(key) for key in ids]
+    return [from_key(bytes(ids[i:i + ID_SIZE])) for i in range(0, len(ids), ID_SIZE)]
@@ -1,19 +1,18 @@
-import uuid
-from datetime import datetime
-from app.models.users import User  # Assuming the User class is here
+from app.models.base import BaseModel, append_id, contains_id, from_key, remove_id, to_key, unpack_ids
+
+class Place(BaseModel):
+    __slots__ = ("_title", "_description", "_price", "_latitude", "_longitude", "_owner_id", "_review_ids",
+                 "amenities")
 
-class Place():
     def __init__(self, title, description, price, latitude, longitude, owner_id, amenities=None):
-        self.id = str(uuid.uuid4())
+        super().__init__()
         self.title = title
         self.description = description
         self.price = price
         self.latitude = latitude
         self.longitude = longitude
         self.owner_id = owner_id
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
-        self.reviews = []
+        self._review_ids = None
         self.amenities = amenities or []
 
     """
@@ -95,36 +94,32 @@ class Place():
     """
     @property
     def owner_id(self):
-        return self._owner_id
+        return from_key(self._owner_id)
 
     @owner_id.setter
     def owner_id(self, value):
         if not value:
             raise ValueError("Owner ID cannot be found")
-        self._owner_id = str(value)
+        self._owner_id = to_key(str(value))
 
     """
-    SAVE
-    """
-    def save(self):
-        """Function to save created_at time"""
-        self.updated_at = datetime.now()
-
+    REVIEWS
     """
-    UPDATE
-    """
-    def update(self, data):
-        """Function to save updated_at time"""
-        for key, value in data.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
-        self.save()
+    @property
+    def reviews(self):
+        """Ids of the reviews of the place"""
+        return unpack_ids(self._review_ids)
 
-    """
-    ADD REVIEW
-    """
     def add_review(self, review):
-        self.reviews.append(review)
+        self._review_ids = append_id(self._review_ids, review)
+
+    def has_review(self, review):
+        return contains_id(self._review_ids, review)
+
+    def remove_review(self, review):
+        """Remove a review, returns whether the place had it"""
+        self._review_ids, removed = remove_id(self._review_ids, review)
+        return removed
 
     """
     ADD AMENITY
@@ -1,32 +1,33 @@
-import uuid
 from datetime import datetime
 
+from app.models.base import BaseModel
+
+
+class Review(BaseModel):
+    __slots__ = ("text", "_rating", "place", "user")
 
-class Review:
     def __init__(self, text, rating, place, user):
         if not text or not isinstance(text, str):
             raise ValueError("Review text is required and must be a string.")
-        self.id = str(uuid.uuid4())
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
+        super().__init__()
         self.text = text
         self.rating = rating  # Will be validated by property setter
         self.place = place  # Will be validated below
         self.user = user  # Will be validated below
 
-        # Validate user and place
-        if not hasattr(user, "reviews"):
+        # Validate user and place, on the class: the reviews property unpacks every id
+        if not hasattr(type(user), "reviews"):
             raise ValueError(
                 "User must be a valid User instance with a 'reviews' attribute."
             )
-        if not hasattr(place, "reviews"):
+        if not hasattr(type(place), "reviews"):
             raise ValueError(
                 "Place must be a valid Place instance with a 'reviews' attribute."
             )
 
         # Add this review to user and place
-        user.reviews.append(self)
-        place.reviews.append(self)
+        user.add_review(self)
+        place.add_review(self)
 
     """
     RATING
@@ -43,16 +44,12 @@ class Review:
         self.updated_at = datetime.now()
 
     """
-    SAVE
+    PLACE ID / USER ID
     """
-    def save(self):
-        self.updated_at = datetime.now()
+    @property
+    def place_id(self):
+        return self.place.id
 
-    """
-    UPDATE
-    """
-    def update(self, data):
-        for key, value in data.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
-        self.save()
+    @property
+    def user_id(self):
+        return self.user.id
@@ -1,22 +1,22 @@
 import re
-import uuid
-from datetime import datetime
 from flask_bcrypt import Bcrypt
 
+from app.models.base import BaseModel, append_id, contains_id, remove_id, unpack_ids
+
 bcrypt = Bcrypt()
 
 
-class User:
+class User(BaseModel):
+    __slots__ = ("_first_name", "_last_name", "_email", "_is_admin", "_password_hash", "_place_ids", "_review_ids")
+
     def __init__(self, first_name, last_name, email, is_admin=False):
-        self.id = str(uuid.uuid4())
+        super().__init__()
         self.first_name = first_name
         self.last_name = last_name
         self.email = email
         self.is_admin = is_admin
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
-        self.places = []  # User owned places
-        self.reviews = []  # User owned reviews
+        self._place_ids = None  # User owned places
+        self._review_ids = None  # User owned reviews
 
     """
     FIRST NAME
@@ -95,24 +95,33 @@ class User:
         self._is_admin = bool(value)
 
     """
-    SAVE
+    PLACES / REVIEWS
     """
 
-    def save(self):
-        """Function to save created_at time"""
-        self.updated_at = datetime.now()
+    @property
+    def places(self):
+        """Ids of the places owned by the user"""
+        return unpack_ids(self._place_ids)
 
-    """
-    UPDATE
-    """
+    def add_place(self, place):
+        self._place_ids = append_id(self._place_ids, place)
+
+    @property
+    def reviews(self):
+        """Ids of the reviews written by the user"""
+        return unpack_ids(self._review_ids)
+
+    def add_review(self, review):
+        self._review_ids = append_id(self._review_ids, review)
+
+    def has_review(self, review):
+        return contains_id(self._review_ids, review)
+
+    def remove_review(self, review):
+        """Remove a review, returns whether the user had it"""
+        self._review_ids, removed = remove_id(self._review_ids, review)
+        return removed
 
-    def update(self, data):
-        """Function to save updated_at time"""
-        for key, value in data.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
-        self.save()
-    
     def set_password(self, password):
         """Hash and store the password securely"""
         self._password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
@@ -0,0 +1,342 @@
+"""
+Optional persistence for the in-memory repositories.
+
+Every add, update and delete appends the object's new state (or its
+deletion) to a write-ahead log and returns once the record is on disk.
+Writers that arrive while a sync runs share the next fsync (group
+commit), so a burst of writes costs a few fsyncs rather than one each.
+Records are framed as length, CRC32 and a pickled
+(op, repository, id, model, state) tuple.
+
+A background thread snapshots every repository once records have piled
+up: it starts a new log segment, writes the snapshot next to it, and
+deletes the older segments and snapshots. The snapshot is taken while
+writes go on, but each record holds a full state, so replaying the new
+segment on top of it gives the latest state. Opening a store recovers
+the latest snapshot plus every later segment, cutting off a torn record
+at the end of the log (a crash during a write).
+
+Objects are stored as their slot values (BaseModel.__getstate__), with
+references to other stored objects kept as Ref(model, id). The review
+id arrays of users and places are not stored; they are rebuilt from the
+reviews.
+"""
+import atexit
+import logging
+import os
+import pickle
+import re
+import struct
+import threading
+import zlib
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Length and CRC32 of the payload
+HEADER = struct.Struct("<II")
+PUT, DELETE = "put", "delete"
+SEGMENT = re.compile(r"^(wal|snapshot)-(\d{8})$")
+
+Ref = namedtuple("Ref", "model id")
+
+# Back-reference id arrays of each model, not stored but rebuilt on recovery
+DERIVED = {"User": ("_review_ids", "_place_ids"), "Place": ("_review_ids",)}
+# Model -> (reference, method adding the object to the referenced one)
+BACKREFS = {"Review": (("user", "add_review"), ("place", "add_review"))}
+
+
+class CorruptLogError(Exception):
+    pass
+
+
+def _frame(record):
+    payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(path):
+    """(records, end of the last whole record) of a log or snapshot file"""
+    records = []
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        length, crc = HEADER.unpack_from(data, offset)
+        payload = data[offset + HEADER.size:offset + HEADER.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        records.append(pickle.loads(payload))
+        offset += HEADER.size + length
+    return records, offset
+
+
+class Journal:
+    """Append-only log segments with group commit"""
+
+    def __init__(self, directory, segment, fsync=True):
+        self.directory = directory
+        self.fsync = fsync
+        self.segment = segment
+        self._cond = threading.Condition(threading.Lock())
+        self._file = open(self._path(segment), "ab")
+        self._written = 0
+        self._synced = 0
+        self._syncing = False
+
+    def _path(self, segment):
+        return os.path.join(self.directory, f"wal-{segment:08d}")
+
+    def write(self, record):
+        """Buffer record, returns the sequence number to pass to wait()"""
+        frame = _frame(record)
+        with self._cond:
+            self._file.write(frame)
+            self._written += 1
+            return self._written
+
+    def wait(self, seq):
+        """Return once record seq is on disk, syncing it and whatever else is buffered"""
+        with self._cond:
+            while self._synced < seq:
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                self._sync_locked()
+
+    def _sync_locked(self):
+        # The leader flushes under the lock but fsyncs without it, so new
+        # records keep coming in for the next sync
+        target = self._written
+        self._syncing = True
+        try:
+            self._file.flush()
+            if self.fsync:
+                fd = self._file.fileno()
+                self._cond.release()
+                try:
+                    os.fsync(fd)
+                finally:
+                    self._cond.acquire()
+            self._synced = max(self._synced, target)
+        finally:
+            self._syncing = False
+            self._cond.notify_all()
+
+    @property
+    def written(self):
+        """Number of records written since the journal was opened"""
+        with self._cond:
+            return self._written
+
+    def rotate(self):
+        """Sync the current segment and continue in a new one.
+
+        Returns the new segment number and the number of records written
+        before it.
+        """
+        with self._cond:
+            while self._syncing:
+                self._cond.wait()
+            self._sync_locked()
+            self._file.close()
+            self.segment += 1
+            self._file = open(self._path(self.segment), "ab")
+            _sync_directory(self.directory)
+            return self.segment, self._written
+
+    def close(self):
+        with self._cond:
+            while self._syncing:
+                self._cond.wait()
+            self._sync_locked()
+            self._file.close()
+
+
+def _sync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DurableStore:
+    """Write-ahead log and snapshots of a set of InMemoryRepository.
+
+    attach() every repository with the model class it holds, then
+    open(): the repositories are filled from disk and log their changes
+    from then on. A snapshot is taken every snapshot_interval seconds
+    when at least snapshot_min_records were logged since the last one.
+    With fsync=False the log is only flushed to the OS, which survives a
+    crash of the process but not of the machine.
+    """
+
+    def __init__(self, directory, fsync=True, snapshot_interval=60, snapshot_min_records=1000):
+        self.directory = directory
+        self.fsync = fsync
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_min_records = snapshot_min_records
+        self._repositories = {}
+        self._models = {}
+        self._journal = None
+        # Journal records already covered by the last snapshot
+        self._snapshot_written = 0
+        self._snapshot_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def attach(self, name, repository, model):
+        self._repositories[name] = repository
+        self._models[model.__name__] = (model, name)
+
+    """
+    RECOVERY
+    """
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        snapshots, segments = self._files()
+        objects = {name: {} for name in self._repositories}
+        start = 0
+        if snapshots:
+            start = snapshots[-1]
+            records, _ = read_records(self._file("snapshot", start))
+            for record in records:
+                self._apply(objects, record)
+        replay = [segment for segment in segments if segment >= start]
+        for segment in replay:
+            path = self._file("wal", segment)
+            records, end = read_records(path)
+            if end < os.path.getsize(path):
+                if segment != replay[-1]:
+                    raise CorruptLogError(f"{path} is damaged at byte {end}")
+                logger.warning("Cutting a torn record off the end of %s at byte %d", path, end)
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+            for record in records:
+                self._apply(objects, record)
+        self._load(objects)
+        self._journal = Journal(self.directory, replay[-1] if replay else start, self.fsync)
+        for name, repository in self._repositories.items():
+            repository._store, repository._store_name = self, name
+        self._thread = threading.Thread(target=self._snapshot_loop, name="snapshots", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def _files(self):
+        found = {"wal": [], "snapshot": []}
+        for name in os.listdir(self.directory):
+            match = SEGMENT.match(name)
+            if match:
+                found[match.group(1)].append(int(match.group(2)))
+        return sorted(found["snapshot"]), sorted(found["wal"])
+
+    def _file(self, kind, segment):
+        return os.path.join(self.directory, f"{kind}-{segment:08d}")
+
+    def _apply(self, objects, record):
+        op, name, obj_id, model, state = record
+        if op == DELETE:
+            objects[name].pop(obj_id, None)
+            return
+        cls = self._models[model][0]
+        obj = cls.__new__(cls)
+        obj.__setstate__(state)
+        for attr in DERIVED.get(model, ()):
+            object.__setattr__(obj, attr, None)
+        objects[name][obj_id] = obj
+
+    def _load(self, objects):
+        """Resolve references and fill the repositories"""
+        def resolve(value):
+            if isinstance(value, Ref):
+                target = self._models.get(value.model)
+                return objects[target[1]].get(value.id) if target else None
+            if isinstance(value, list):
+                return [resolve(item) for item in value]
+            return value
+
+        for stored in objects.values():
+            for obj in stored.values():
+                for attr, value in obj.__getstate__().items():
+                    if isinstance(value, (Ref, list)):
+                        object.__setattr__(obj, attr, resolve(value))
+        for stored in objects.values():
+            for obj in stored.values():
+                for reference, add in BACKREFS.get(type(obj).__name__, ()):
+                    owner = getattr(obj, reference)
+                    if owner is not None:
+                        getattr(owner, add)(obj)
+        for name, stored in objects.items():
+            for obj in stored.values():
+                self._repositories[name].add(obj)
+
+    """
+    LOGGING
+    """
+    def _state(self, obj):
+        skip = DERIVED.get(type(obj).__name__, ())
+
+        def encode(value):
+            if type(value).__name__ in self._models and hasattr(value, "id"):
+                return Ref(type(value).__name__, value.id)
+            if isinstance(value, list):
+                return [encode(item) for item in value]
+            return value
+
+        return {attr: encode(value) for attr, value in obj.__getstate__().items() if attr not in skip}
+
+    def log_put(self, name, obj):
+        """Buffer the state of obj, call under the lock that serialises its changes"""
+        return self._journal.write((PUT, name, obj.id, type(obj).__name__, self._state(obj)))
+
+    def log_delete(self, name, obj_id):
+        return self._journal.write((DELETE, name, obj_id, None, None))
+
+    def wait(self, seq):
+        self._journal.wait(seq)
+
+    """
+    SNAPSHOTS
+    """
+    def unsnapshotted(self):
+        """Records logged since the last snapshot"""
+        return self._journal.written - self._snapshot_written
+
+    def snapshot(self):
+        """Write a snapshot and drop the log segments it covers"""
+        with self._snapshot_lock:
+            segment, self._snapshot_written = self._journal.rotate()
+            path = self._file("snapshot", segment)
+            with open(path + ".tmp", "wb") as f:
+                for name, repository in self._repositories.items():
+                    for obj in repository.get_all():
+                        f.write(_frame((PUT, name, obj.id, type(obj).__name__, self._state(obj))))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            _sync_directory(self.directory)
+            snapshots, segments = self._files()
+            for old in snapshots:
+                if old < segment:
+                    os.remove(self._file("snapshot", old))
+            for old in segments:
+                if old < segment:
+                    os.remove(self._file("wal", old))
+
+    def _snapshot_loop(self):
+        while not self._stopped.wait(self.snapshot_interval):
+            if self.unsnapshotted() >= self.snapshot_min_records:
+                try:
+                    self.snapshot()
+                except OSError:
+                    logger.exception("Snapshot failed")
+
+    def close(self):
+        if self._journal is None or self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._journal.close()
+        atexit.unregister(self.close)
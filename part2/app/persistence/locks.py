@@ -0,0 +1,104 @@
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """Shared by readers or held by one writer.
+
+    A waiting writer blocks new readers so writes are not starved. Both
+    locks are re-entrant and the writing thread may also read, but a
+    reader must not ask for the write lock (that would deadlock).
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        # Read depth of each reading thread
+        self._readers = {}
+        self._writer = None
+        self._writes = 0
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writes += 1
+                return
+            if me not in self._readers:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._release_write()
+                return
+            if self._readers[me] > 1:
+                self._readers[me] -= 1
+                return
+            del self._readers[me]
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writes += 1
+                return
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+            self._writes = 1
+
+    def release_write(self):
+        with self._cond:
+            self._release_write()
+
+    def _release_write(self):
+        self._writes -= 1
+        if not self._writes:
+            self._writer = None
+            self._cond.notify_all()
+
+    @contextmanager
+    def reading(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def writing(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+@contextmanager
+def locked(*targets, write=True):
+    """Lock the shards holding each (repository, obj_id) of targets.
+
+    Shards are locked in one global order (repository creation, then
+    shard), so two threads locking overlapping shards cannot deadlock.
+    Inside the block, further repository calls on these shards re-enter
+    the locks; calls on other shards must come later in that order.
+    """
+    locks = dict(repository.shard_lock(obj_id) for repository, obj_id in targets)
+    ordered = [locks[key] for key in sorted(locks)]
+    acquired = []
+    try:
+        for lock in ordered:
+            lock.acquire_write() if write else lock.acquire_read()
+            acquired.append(lock)
+        yield
+    finally:
+        for lock in reversed(acquired):
+            lock.release_write() if write else lock.release_read()
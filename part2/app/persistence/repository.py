@@ -1,5 +1,12 @@
+import itertools
 from abc import ABC, abstractmethod
 
+from app.models.base import from_key, to_key
+from app.persistence.locks import RWLock
+
+# Creation order of the repositories, the order in which locked() takes their shards
+_repository_order = itertools.count()
+
 
 class Repository(ABC):
     @abstractmethod
@@ -28,35 +35,235 @@ class Repository(ABC):
 
 
 class InMemoryRepository(Repository):
-    def __init__(self):
-        self._storage = {}
+    """Thread-safe objects by id, with optional hash indexes on attributes.
 
-    def add(self, obj):
-        self._storage[obj.id] = obj
+    Objects are spread over shards by the hash of their id, each shard
+    behind its own reader-writer lock, so requests on different objects
+    do not wait for each other and reads of the same shard run together.
+    Use locked() to hold several shards across repositories at once.
+
+    unique_indexes map a value to the one object holding it (None is not
+    indexed), indexes map a value to every object holding it: the object
+    itself while there is one, a dict by id from the second. Both are
+    kept up to date by add, update and delete; an object changed some
+    other way must be passed to reindex(). Index locks are taken after
+    shard locks, never before.
+
+    Once a DurableStore is opened on the repository, add, update, delete
+    and reindex return when the change is in its write-ahead log. A caller
+    holding locks passes wait=False to add or delete, releases the locks,
+    then calls wait() with the sequence number they return, so the fsync
+    does not hold up other requests on those shards.
+    """
+
+    def __init__(self, unique_indexes=(), indexes=(), shards=16):
+        self._order = next(_repository_order)
+        self._shards = [{} for _ in range(shards)]
+        self._locks = [RWLock() for _ in range(shards)]
+        self._unique = {attr: {} for attr in unique_indexes}
+        self._indexes = {attr: {} for attr in indexes}
+        self._indexed = (*self._unique, *self._indexes)
+        # Indexed values of each object, as they were when it was indexed
+        self._values = {}
+        self._index_lock = RWLock()
+        # Set by DurableStore.open()
+        self._store = None
+        self._store_name = None
+
+    @staticmethod
+    def _key_of(obj):
+        """Compact id the object is stored by, see to_key()"""
+        key = getattr(obj, "key", None)
+        return key if key is not None else to_key(obj.id)
+
+    def _shard(self, key):
+        return hash(key) % len(self._shards)
+
+    def shard_lock(self, obj_id):
+        """(global order, lock) of the shard holding obj_id, see locked()"""
+        shard = self._shard(to_key(obj_id))
+        return (self._order, shard), self._locks[shard]
+
+    def add(self, obj, wait=True):
+        key = self._key_of(obj)
+        shard = self._shard(key)
+        with self._locks[shard].writing(), self._index_lock.writing():
+            values = self._index_values(obj)
+            self._check_unique(key, values)
+            self._unindex(key)
+            self._shards[shard][key] = obj
+            self._index(key, obj, values)
+            seq = self._log_put(obj)
+        if not wait:
+            return seq
+        self.wait(seq)
 
     def get(self, obj_id):
-        return self._storage.get(obj_id)
+        key = to_key(obj_id)
+        shard = self._shard(key)
+        with self._locks[shard].reading():
+            return self._shards[shard].get(key)
 
     def get_all(self):
-        return list(self._storage.values())
+        objs = []
+        for lock, shard in zip(self._locks, self._shards):
+            with lock.reading():
+                objs.extend(shard.values())
+        return objs
 
     def update(self, obj_id, data):
-        obj = self.get(obj_id)
-        if obj:
-            obj.update(data)
-            return obj
-        return None
+        key = to_key(obj_id)
+        shard = self._shard(key)
+        with self._locks[shard].writing():
+            obj = self._shards[shard].get(key)
+            if not obj:
+                return None
+            previous = {attr: getattr(obj, attr) for attr in self._unique if attr in data}
+            try:
+                obj.update(data)
+            finally:
+                # Also after a failing setter, the ones before it have run
+                try:
+                    self._reindex_or_restore(key, obj, previous)
+                finally:
+                    seq = self._log_put(obj)
+        self.wait(seq)
+        return obj
 
-    def delete(self, obj_id):
-        if obj_id in self._storage:
-            del self._storage[obj_id]
+    def delete(self, obj_id, wait=True):
+        key = to_key(obj_id)
+        shard = self._shard(key)
+        with self._locks[shard].writing(), self._index_lock.writing():
+            if key not in self._shards[shard]:
+                return None
+            self._unindex(key)
+            del self._shards[shard][key]
+            seq = self._log_delete(key)
+        if not wait:
+            return seq
+        self.wait(seq)
+
+    def clear(self):
+        for lock in self._locks:
+            lock.acquire_write()
+        try:
+            with self._index_lock.writing():
+                seq = None
+                for shard in self._shards:
+                    for key in shard if self._store else ():
+                        seq = self._log_delete(key)
+                    shard.clear()
+                self._values.clear()
+                for index in (*self._unique.values(), *self._indexes.values()):
+                    index.clear()
+        finally:
+            for lock in reversed(self._locks):
+                lock.release_write()
+        self.wait(seq)
 
     def get_by_attribute(self, attr_name, attr_value):
-        return next(
-            (
-                obj
-                for obj in self._storage.values()
-                if getattr(obj, attr_name) == attr_value
-            ),
-            None,
-        )
+        if attr_name in self._unique:
+            with self._index_lock.reading():
+                return self._unique[attr_name].get(to_key(attr_value))
+        if attr_name in self._indexes:
+            with self._index_lock.reading():
+                bucket = self._indexes[attr_name].get(to_key(attr_value))
+                return next(iter(bucket.values())) if type(bucket) is dict else bucket
+        return next((obj for obj in self.get_all() if getattr(obj, attr_name) == attr_value), None)
+
+    def get_all_by_attribute(self, attr_name, attr_value):
+        if attr_name in self._unique:
+            with self._index_lock.reading():
+                obj = self._unique[attr_name].get(to_key(attr_value))
+            return [obj] if obj is not None else []
+        if attr_name in self._indexes:
+            with self._index_lock.reading():
+                bucket = self._indexes[attr_name].get(to_key(attr_value))
+            if bucket is None:
+                return []
+            return list(bucket.values()) if type(bucket) is dict else [bucket]
+        return [obj for obj in self.get_all() if getattr(obj, attr_name) == attr_value]
+
+    """
+    INDEXES
+    """
+    def reindex(self, obj):
+        """Update the indexes of obj, raises a ValueError if it takes a unique value of another object"""
+        key = self._key_of(obj)
+        with self._locks[self._shard(key)].writing():
+            self._reindex(key, obj)
+            seq = self._log_put(obj)
+        self.wait(seq)
+
+    def _reindex(self, key, obj):
+        """reindex() without logging, call with the shard write lock held"""
+        with self._index_lock.writing():
+            values = self._index_values(obj)
+            self._check_unique(key, values)
+            self._unindex(key)
+            self._index(key, obj, values)
+
+    def _log_put(self, obj):
+        return self._store.log_put(self._store_name, obj) if self._store else None
+
+    def _log_delete(self, key):
+        return self._store.log_delete(self._store_name, from_key(key)) if self._store else None
+
+    def wait(self, seq):
+        """Return once the change numbered seq is in the write-ahead log, None is already there"""
+        if seq is not None:
+            self._store.wait(seq)
+
+    def _reindex_or_restore(self, key, obj, previous):
+        try:
+            self._reindex(key, obj)
+        except ValueError:
+            for attr, value in previous.items():
+                setattr(obj, attr, value)
+            self._reindex(key, obj)
+            raise
+
+    def _index_values(self, obj):
+        # Ids are indexed in their compact form, like the objects are stored
+        return tuple(to_key(getattr(obj, attr)) for attr in self._indexed)
+
+    def _check_unique(self, key, values):
+        for (attr, index), value in zip(self._unique.items(), values):
+            owner = index.get(value)
+            if value is not None and owner is not None and self._key_of(owner) != key:
+                raise ValueError(f"{attr} {from_key(value)!r} is already used")
+
+    def _index(self, key, obj, values):
+        if not self._indexed:
+            return
+        self._values[key] = values
+        unique = len(self._unique)
+        for value, index in zip(values, self._unique.values()):
+            if value is not None:
+                index[value] = obj
+        for value, index in zip(values[unique:], self._indexes.values()):
+            bucket = index.get(value)
+            if bucket is None:
+                index[value] = obj
+            elif type(bucket) is dict:
+                bucket[key] = obj
+            else:
+                index[value] = {self._key_of(bucket): bucket, key: obj}
+
+    def _unindex(self, key):
+        values = self._values.pop(key, None)
+        if values is None:
+            return
+        unique = len(self._unique)
+        for value, index in zip(values, self._unique.values()):
+            owner = index.get(value)
+            if owner is not None and self._key_of(owner) == key:
+                del index[value]
+        for value, index in zip(values[unique:], self._indexes.values()):
+            bucket = index.get(value)
+            if type(bucket) is dict:
+                bucket.pop(key, None)
+                if len(bucket) == 1:
+                    index[value] = next(iter(bucket.values()))
+            elif bucket is not None and self._key_of(bucket) == key:
+                del index[value]
@@ -1,3 +1,6 @@
+import os
+
 from app.services.facade import HBnBFacade
 
-facade = HBnBFacade()
\ No newline at end of file
+# Set HBNB_DATA_DIR to keep the data across restarts
+facade = HBnBFacade(data_dir=os.getenv("HBNB_DATA_DIR"))
@@ -2,15 +2,28 @@ from app.models.amenity import Amenity
 from app.models.place import Place
 from app.models.review import Review
 from app.models.users import User
+from app.persistence.durable import DurableStore
+from app.persistence.locks import locked
 from app.persistence.repository import InMemoryRepository
 
 
 class HBnBFacade:
-    def __init__(self):
-        self.user_repo = InMemoryRepository()
-        self.place_repo = InMemoryRepository()
-        self.review_repo = InMemoryRepository()
+    def __init__(self, data_dir=None):
+        # Created in the order locked() takes their shards: a review is
+        # added while its user and place are locked
+        self.user_repo = InMemoryRepository(unique_indexes=["email"])
+        self.place_repo = InMemoryRepository(indexes=["owner_id"])
+        self.review_repo = InMemoryRepository(indexes=["place_id", "user_id"])
         self.amenity_repo = InMemoryRepository()
+        # With a data_dir, the repositories are restored from it and log every change to it
+        self.store = None
+        if data_dir:
+            self.store = DurableStore(data_dir)
+            self.store.attach("users", self.user_repo, User)
+            self.store.attach("places", self.place_repo, Place)
+            self.store.attach("reviews", self.review_repo, Review)
+            self.store.attach("amenities", self.amenity_repo, Amenity)
+            self.store.open()
 
     """
     USER
@@ -63,6 +76,9 @@ class HBnBFacade:
     def update_place(self, place_id, place_data):
         return self.place_repo.update(place_id, place_data)
 
+    def get_places_by_owner(self, owner_id):
+        return self.place_repo.get_all_by_attribute("owner_id", owner_id)
+
     """
     REVIEW
     """
@@ -73,17 +89,22 @@ class HBnBFacade:
         for field in required_fields:
             if field not in review_data:
                 raise ValueError(f"Missing required field: {field}")
-        user = self.user_repo.get(review_data["user_id"])
-        if not user:
-            raise ValueError("User not found")
-        place = self.place_repo.get(review_data["place_id"])
-        if not place:
-            raise ValueError("Place not found")
-        text = review_data["text"]
-        rating = review_data["rating"]
-        # Review class will validate text and rating
-        review = Review(text=text, rating=rating, place=place, user=user)
-        self.review_repo.add(review)
+        user_id, place_id = review_data["user_id"], review_data["place_id"]
+        # Nothing else touches the user's and place's reviews meanwhile
+        with locked((self.user_repo, user_id), (self.place_repo, place_id)):
+            user = self.user_repo.get(user_id)
+            if not user:
+                raise ValueError("User not found")
+            place = self.place_repo.get(place_id)
+            if not place:
+                raise ValueError("Place not found")
+            text = review_data["text"]
+            rating = review_data["rating"]
+            # Review class will validate text and rating
+            review = Review(text=text, rating=rating, place=place, user=user)
+            seq = self.review_repo.add(review, wait=False)
+        # Off the locks, other requests on the user and place go on during the fsync
+        self.review_repo.wait(seq)
         return review
 
     def get_review(self, review_id):
@@ -93,29 +114,32 @@ class HBnBFacade:
         return self.review_repo.get_all()
 
     def get_reviews_by_place(self, place_id):
-        place = self.place_repo.get(place_id)
-        if not place:
-            return None
-        return place.reviews
+        with locked((self.place_repo, place_id), write=False):
+            place = self.place_repo.get(place_id)
+            if not place:
+                return None
+            review_ids = place.reviews
+        return [review for review in map(self.review_repo.get, review_ids) if review is not None]
 
     def update_review(self, review_id, review_data):
-        review = self.review_repo.get(review_id)
-        if not review:
-            return None
         # Only allow updating text and rating
         allowed_fields = ["text", "rating"]
         update_data = {k: v for k, v in review_data.items() if k in allowed_fields}
-        review.update(update_data)
-        return review
+        return self.review_repo.update(review_id, update_data)
 
     def delete_review(self, review_id):
         review = self.review_repo.get(review_id)
         if not review:
             return False
-        # Remove from user and place reviews lists
-        if review in review.user.reviews:
-            review.user.reviews.remove(review)
-        if review in review.place.reviews:
-            review.place.reviews.remove(review)
-        self.review_repo.delete(review_id)
+        with locked(
+            (self.user_repo, review.user_id), (self.place_repo, review.place_id), (self.review_repo, review_id)
+        ):
+            if self.review_repo.get(review_id) is not review:
+                # Deleted by another request meanwhile
+                return False
+            # Remove from user and place reviews lists
+            review.user.remove_review(review)
+            review.place.remove_review(review)
+            seq = self.review_repo.delete(review_id, wait=False)
+        self.review_repo.wait(seq)
         return True
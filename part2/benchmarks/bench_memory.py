@@ -0,0 +1,104 @@
+"""
+Memory per entity of the in-memory backend.
+
+Creates --count users, amenities, places and reviews and reports the
+bytes allocated per entity (tracemalloc), twice: the model objects alone
+(kept in a list), and the entities stored through an HBnBFacade, which
+adds the repository dicts, the indexes and the back-reference lists.
+Only the models' public constructors and the facade are used, so the
+same script runs on older commits for a before/after comparison.
+
+    cd part2
+    python -m benchmarks.bench_memory --count 100000
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+from app.models.amenity import Amenity
+from app.models.place import Place
+from app.models.review import Review
+from app.models.users import User
+from app.services.facade import HBnBFacade
+
+
+def measure(build):
+    """Bytes still allocated after build(), which returns what to keep alive"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return allocated, kept
+
+
+def user_fields(i):
+    return {"first_name": f"First{i % 1000}", "last_name": f"Last{i % 997}", "email": f"user{i}@memory.io"}
+
+
+def place_args(i, rng, owner):
+    return (f"Place {i}", "Memory place", rng.uniform(10, 1000), rng.uniform(-60, 70), rng.uniform(-180, 180),
+            owner.id)
+
+
+def models_alone(count, rng):
+    """Bytes per model object, not stored in any repository"""
+    results = {}
+    allocated, users = measure(lambda: [User(**user_fields(i)) for i in range(count)])
+    results["User"] = allocated / count
+    allocated, _ = measure(lambda: [Amenity(f"Amenity {i}") for i in range(count)])
+    results["Amenity"] = allocated / count
+    allocated, places = measure(lambda: [Place(*place_args(i, rng, rng.choice(users))) for i in range(count)])
+    results["Place"] = allocated / count
+    allocated, _ = measure(lambda: [Review("Memory review", rng.randint(1, 5), rng.choice(places), rng.choice(users))
+                                    for _ in range(count)])
+    results["Review"] = allocated / count
+    return results
+
+
+def stored(count, rng):
+    """Bytes per entity stored through the facade"""
+    facade = HBnBFacade()
+    results = {}
+    allocated, users = measure(lambda: [facade.create_user(user_fields(i)) for i in range(count)])
+    results["User"] = allocated / count
+    allocated, _ = measure(lambda: [facade.create_amenity({"name": f"Amenity {i}"}) for i in range(count)])
+    results["Amenity"] = allocated / count
+
+    def add_places():
+        places = [Place(*place_args(i, rng, rng.choice(users))) for i in range(count)]
+        for place in places:
+            facade.place_repo.add(place)
+        return places
+
+    allocated, places = measure(add_places)
+    results["Place"] = allocated / count
+    allocated, _ = measure(lambda: [facade.create_review({
+        "text": "Memory review", "rating": rng.randint(1, 5),
+        "user_id": rng.choice(users).id, "place_id": rng.choice(places).id,
+    }) for _ in range(count)])
+    results["Review"] = allocated / count
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000, help="entities of each model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--projected-reviews", type=int, default=5000000)
+    args = parser.parse_args()
+
+    alone = models_alone(args.count, random.Random(args.seed))
+    with_storage = stored(args.count, random.Random(args.seed))
+    print(f"{'model':<10}{'object bytes':>14}{'stored bytes':>14}")
+    for model in alone:
+        print(f"{model:<10}{alone[model]:>14.0f}{with_storage[model]:>14.0f}")
+    print(f"\n{args.projected_reviews:,} stored reviews: about "
+          f"{with_storage['Review'] * args.projected_reviews / 2 ** 30:.2f} GiB")
+
+
+if __name__ == "__main__":
+    main()
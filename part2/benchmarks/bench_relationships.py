@@ -0,0 +1,63 @@
+"""
+Cost of keeping review back-references at many reviews per place.
+
+For each --reviews size, creates that many reviews of a single place
+(from --users users) through an HBnBFacade, then deletes them in random
+order, and reports the mean time per create and per delete. With O(1)
+back-references both stay flat as the place grows; with lists the
+deletes grow linearly. Only the facade is used, so the same script runs
+on older commits for a before/after comparison.
+
+    cd part2
+    python -m benchmarks.bench_relationships --reviews 1000 10000 50000
+"""
+import argparse
+import random
+import time
+
+from app.models.place import Place
+from app.services.facade import HBnBFacade
+
+
+def run(size, users, rng):
+    facade = HBnBFacade()
+    user_ids = [
+        facade.create_user({'first_name': 'Bench', 'last_name': 'Mark', 'email': f'user{i}@relationships.io'}).id
+        for i in range(users)
+    ]
+    place = Place('Busy place', 'Many reviews', 100, 10, 10, user_ids[0])
+    facade.place_repo.add(place)
+
+    started = time.perf_counter()
+    review_ids = [
+        facade.create_review({'text': 'Review', 'rating': rng.randint(1, 5),
+                              'user_id': rng.choice(user_ids), 'place_id': place.id}).id
+        for _ in range(size)
+    ]
+    created = time.perf_counter() - started
+    listed = len(facade.get_reviews_by_place(place.id))
+
+    rng.shuffle(review_ids)
+    started = time.perf_counter()
+    for review_id in review_ids:
+        facade.delete_review(review_id)
+    deleted = time.perf_counter() - started
+    return created / size, deleted / size, listed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reviews', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'reviews':>8}  {'create us':>10}  {'delete us':>10}")
+    for size in args.reviews:
+        create, delete, listed = run(size, args.users, random.Random(args.seed))
+        assert listed == size, f'{listed} reviews listed, {size} created'
+        print(f"{size:>8}  {create * 1e6:>10.1f}  {delete * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Multi-threaded stress benchmark of the in-memory facade.
+
+Fills an HBnBFacade, then runs a read-heavy mix of facade calls (lookups
+by id and email, reviews of a place, review creation and deletion, place
+updates) from 1, 2, 4... threads for a fixed time. Reports throughput and
+latency per thread count, then checks the data is still consistent:
+every stored review is in its user's and place's lists and nothing else
+is, and every index lookup finds its object. Exits with status 1 when it
+is not.
+
+Under the GIL the threads do not run Python code in parallel, so the
+throughput mostly shows what the locks cost and that it holds up as
+threads are added; on a free-threaded build, reads of different shards
+run in parallel.
+
+    cd part2
+    python -m benchmarks.stress_repository --threads 1 2 4 8 --seconds 5
+"""
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+
+from app.models.place import Place
+from app.services.facade import HBnBFacade
+
+# Operation -> share of the calls
+MIX = {
+    'get_user': 0.25,
+    'get_user_by_email': 0.15,
+    'get_place': 0.2,
+    'get_reviews_by_place': 0.15,
+    'get_review': 0.1,
+    'create_review': 0.07,
+    'delete_review': 0.05,
+    'update_place': 0.03,
+}
+
+
+def populate(facade, users, places, reviews, rng):
+    user_ids, place_ids = [], []
+    for i in range(users):
+        user = facade.create_user({'first_name': 'Stress', 'last_name': 'Test', 'email': f'user{i}@stress.io'})
+        user_ids.append(user.id)
+    for i in range(places):
+        place = Place(f'Place {i}', 'Stress place', 100, rng.uniform(-60, 70), rng.uniform(-180, 180),
+                      rng.choice(user_ids))
+        facade.place_repo.add(place)
+        place_ids.append(place.id)
+    review_ids = [
+        facade.create_review({'text': 'Stress review', 'rating': rng.randint(1, 5),
+                              'user_id': rng.choice(user_ids), 'place_id': rng.choice(place_ids)}).id
+        for _ in range(reviews)
+    ]
+    return user_ids, place_ids, review_ids
+
+
+class Worker(threading.Thread):
+    def __init__(self, facade, ids, seed, deadline, start_barrier):
+        super().__init__(daemon=True)
+        self.facade = facade
+        self.user_ids, self.place_ids, self.review_ids = ids
+        self.rng = random.Random(seed)
+        self.deadline = deadline
+        self.start_barrier = start_barrier
+        self.timings = []
+        self.errors = []
+
+    def call(self, operation):
+        facade, rng = self.facade, self.rng
+        if operation == 'get_user':
+            facade.get_user(rng.choice(self.user_ids))
+        elif operation == 'get_user_by_email':
+            facade.get_user_by_email(f'user{rng.randrange(len(self.user_ids))}@stress.io')
+        elif operation == 'get_place':
+            facade.get_place(rng.choice(self.place_ids))
+        elif operation == 'get_reviews_by_place':
+            facade.get_reviews_by_place(rng.choice(self.place_ids))
+        elif operation == 'get_review':
+            facade.get_review(rng.choice(self.review_ids))
+        elif operation == 'create_review':
+            review = facade.create_review({'text': 'Stress review', 'rating': rng.randint(1, 5),
+                                           'user_id': rng.choice(self.user_ids),
+                                           'place_id': rng.choice(self.place_ids)})
+            # Shared with the other threads, so they delete each other's reviews
+            self.review_ids.append(review.id)
+        elif operation == 'delete_review':
+            facade.delete_review(rng.choice(self.review_ids))
+        else:
+            facade.update_place(rng.choice(self.place_ids), {'price': rng.randint(10, 1000)})
+
+    def run(self):
+        operations, weights = list(MIX), list(MIX.values())
+        self.start_barrier.wait()
+        while time.perf_counter() < self.deadline:
+            operation = self.rng.choices(operations, weights)[0]
+            started = time.perf_counter()
+            try:
+                self.call(operation)
+            except Exception as e:
+                self.errors.append(f'{operation}: {e!r}')
+            self.timings.append(time.perf_counter() - started)
+
+
+def check_consistency(facade, user_ids):
+    """Descriptions of every inconsistency found, empty when there is none"""
+    problems = []
+    reviews = facade.get_all_reviews()
+    stored = {review.id for review in reviews}
+    for review in reviews:
+        if not review.user.has_review(review):
+            problems.append(f'review {review.id} missing from its user')
+        if not review.place.has_review(review):
+            problems.append(f'review {review.id} missing from its place')
+    for owner in (*facade.user_repo.get_all(), *facade.place_repo.get_all()):
+        for review_id in owner.reviews:
+            if review_id not in stored:
+                problems.append(f'deleted review {review_id} still listed by {owner.id}')
+    for place in facade.place_repo.get_all():
+        indexed = facade.review_repo.get_all_by_attribute('place_id', place.id)
+        if len(indexed) != len(place.reviews):
+            problems.append(f'place {place.id}: {len(indexed)} indexed reviews, {len(place.reviews)} listed')
+    for i, user_id in enumerate(user_ids):
+        found = facade.get_user_by_email(f'user{i}@stress.io')
+        if found is None or found.id != user_id:
+            problems.append(f'user{i}@stress.io not indexed')
+    return problems
+
+
+def run(threads, args):
+    rng = random.Random(args.seed)
+    facade = HBnBFacade()
+    user_ids, place_ids, review_ids = populate(facade, args.users, args.places, args.reviews, rng)
+    start_barrier = threading.Barrier(threads + 1)
+    deadline = time.perf_counter() + args.seconds + 0.1
+    workers = [Worker(facade, (user_ids, place_ids, review_ids), args.seed + n, deadline, start_barrier)
+               for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    timings = sorted(t for worker in workers for t in worker.timings)
+    errors = [error for worker in workers for error in worker.errors]
+    problems = check_consistency(facade, user_ids)
+    print(f"{threads:>7}  {len(timings) / elapsed:>10.0f}  {statistics.median(timings) * 1e6:>10.1f}"
+          f"  {timings[int(len(timings) * 0.99)] * 1e6:>10.1f}  {len(errors):>6}  {len(problems):>12}")
+    for message in (errors + problems)[:10]:
+        print(f"         {message}")
+    return not errors and not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--places', type=int, default=2000)
+    parser.add_argument('--reviews', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'threads':>7}  {'ops/s':>10}  {'p50 us':>10}  {'p99 us':>10}  {'errors':>6}  {'inconsistent':>12}")
+    consistent = all([run(threads, args) for threads in args.threads])
+    return 0 if consistent else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
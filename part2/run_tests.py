@@ -3,6 +3,10 @@ import unittest
 
 from test.test_amenities_api import TestAmenityEndpoints
 from test.test_places_api import TestPlaceEndpoints
+from test.test_base_model import TestCompactModels
+from test.test_durable import TestDurableStore
+from test.test_locks import TestAtomicReviews, TestRWLock
+from test.test_repository import TestInMemoryRepositoryIndexes
 from test.test_reviews_api import TestReviewEndpoints
 from test.test_users_api import TestUserEndpoints
 
@@ -17,6 +21,11 @@ def run_tests():
     test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestPlaceEndpoints))
     test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestReviewEndpoints))
     test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestAmenityEndpoints))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestInMemoryRepositoryIndexes))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestRWLock))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestAtomicReviews))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestDurableStore))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestCompactModels))
 
     # Run the tests
     runner = unittest.TextTestRunner(verbosity=2)
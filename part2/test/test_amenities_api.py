@@ -15,10 +15,10 @@ class TestAmenityEndpoints(unittest.TestCase):
         # Clear all repositories to ensure test isolation
         from app.services import facade
 
-        facade.user_repo._storage.clear()
-        facade.place_repo._storage.clear()
-        facade.review_repo._storage.clear()
-        facade.amenity_repo._storage.clear()
+        facade.user_repo.clear()
+        facade.place_repo.clear()
+        facade.review_repo.clear()
+        facade.amenity_repo.clear()
         self.app_context.pop()
 
     def test_create_amenity_success(self):
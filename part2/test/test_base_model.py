@@ -0,0 +1,102 @@
+import pickle
+import unittest
+import uuid
+from datetime import datetime
+
+from app.models.amenity import Amenity
+from app.models.base import PACKED_MAX, append_id, contains_id, from_key, remove_id, to_key, unpack_ids
+from app.models.place import Place
+from app.models.review import Review
+from app.models.users import User
+
+
+class TestCompactModels(unittest.TestCase):
+    def setUp(self):
+        self.user = User("Alice", "Smith", "alice@example.com")
+        self.place = Place("Flat", "A flat", 100, 10.0, 20.0, self.user.id)
+
+    def test_no_instance_dict(self):
+        for obj in (self.user, self.place, Amenity("Wifi"), Review("Nice", 4, self.place, self.user)):
+            self.assertFalse(hasattr(obj, "__dict__"), type(obj).__name__)
+
+    def test_id_round_trip(self):
+        obj_id = str(uuid.uuid4())
+        self.user.id = obj_id
+        self.assertEqual(self.user.id, obj_id)
+        self.assertEqual(len(self.user.key), 16)
+        self.assertEqual(from_key(to_key(obj_id)), obj_id)
+        with self.assertRaises(ValueError):
+            self.user.id = "not-a-uuid"
+
+    def test_non_uuid_ids_pass_through(self):
+        self.assertEqual(to_key("test-user-id"), "test-user-id")
+        place = Place("Flat", "A flat", 100, 10.0, 20.0, "test-user-id")
+        self.assertEqual(place.owner_id, "test-user-id")
+
+    def test_timestamps_round_trip(self):
+        now = datetime(2024, 2, 29, 13, 45, 7, 123456)
+        self.place.updated_at = now
+        self.assertEqual(self.place.updated_at, now)
+        self.assertIsInstance(self.place.created_at, datetime)
+        before = self.place.updated_at
+        self.place.update({"price": 120})
+        self.assertGreater(self.place.updated_at, before)
+
+    def test_setters_still_validate(self):
+        with self.assertRaises(ValueError):
+            self.user.update({"first_name": ""})
+        with self.assertRaises(ValueError):
+            self.place.price = -1
+
+    def test_review_id_arrays(self):
+        first = Review("Nice", 4, self.place, self.user)
+        second = Review("Fine", 3, self.place, self.user)
+        self.assertEqual(self.place.reviews, [first.id, second.id])
+        self.assertEqual(self.user.reviews, [first.id, second.id])
+        self.assertTrue(self.place.remove_review(first))
+        self.assertFalse(self.place.remove_review(first))
+        self.assertFalse(self.place.has_review(first))
+        self.assertTrue(self.user.has_review(first.id))
+        self.assertEqual(self.place.reviews, [second.id])
+        self.assertTrue(self.place.remove_review(second.id))
+        self.assertEqual(self.place.reviews, [])
+
+    def test_id_array_helpers(self):
+        ids = [str(uuid.uuid4()) for _ in range(3)]
+        packed = None
+        for obj_id in ids:
+            packed = append_id(packed, obj_id)
+        self.assertEqual(len(packed), 48)
+        packed, removed = remove_id(packed, ids[1])
+        self.assertTrue(removed)
+        self.assertEqual(unpack_ids(packed), [ids[0], ids[2]])
+        self.assertIs(append_id(packed, ids[0]), packed)
+        self.assertEqual(len(packed), 32)
+
+    def test_id_set_grows_past_packed(self):
+        ids = [str(uuid.uuid4()) for _ in range(PACKED_MAX * 3)]
+        stored = None
+        for obj_id in ids:
+            stored = append_id(stored, obj_id)
+        self.assertIsInstance(stored, dict)
+        stored = append_id(stored, ids[5])
+        self.assertEqual(unpack_ids(stored), ids)
+        self.assertTrue(contains_id(stored, ids[40]))
+        stored, removed = remove_id(stored, ids[40])
+        self.assertTrue(removed)
+        self.assertFalse(contains_id(stored, ids[40]))
+        self.assertFalse(remove_id(stored, ids[40])[1])
+        self.assertEqual(unpack_ids(stored), ids[:40] + ids[41:])
+        for obj_id in ids:
+            stored, _ = remove_id(stored, obj_id)
+        self.assertIsNone(stored)
+
+    def test_pickle(self):
+        copy = pickle.loads(pickle.dumps(self.user))
+        self.assertEqual(copy.id, self.user.id)
+        self.assertEqual(copy.email, "alice@example.com")
+        self.assertEqual(copy.created_at, self.user.created_at)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from app.models.amenity import Amenity
+from app.models.place import Place
+from app.persistence.durable import read_records
+from app.services.facade import HBnBFacade
+
+
+class TestDurableStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.facade = HBnBFacade(data_dir=self.directory)
+
+    def tearDown(self):
+        self.facade.store.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+        self.facade.store.close()
+        self.facade = HBnBFacade(data_dir=self.directory)
+        return self.facade
+
+    def populate(self):
+        facade = self.facade
+        user = facade.create_user({"first_name": "Alice", "last_name": "Smith", "email": "alice@example.com"})
+        wifi = facade.create_amenity({"name": "Wifi"})
+        place = Place("Flat", "A flat", 100, 10.0, 20.0, user.id, [wifi])
+        facade.place_repo.add(place)
+        review = facade.create_review({"text": "Great", "rating": 5, "user_id": user.id, "place_id": place.id})
+        return user, wifi, place, review
+
+    def test_recovers_objects_and_references(self):
+        user, wifi, place, review = self.populate()
+        facade = self.reopen()
+
+        restored = facade.get_user_by_email("alice@example.com")
+        self.assertEqual(restored.id, user.id)
+        self.assertEqual(restored.created_at, user.created_at)
+        restored_place = facade.get_place(place.id)
+        self.assertIsInstance(restored_place.amenities[0], Amenity)
+        self.assertIs(restored_place.amenities[0], facade.get_amenity(wifi.id))
+        restored_review = facade.get_review(review.id)
+        self.assertIs(restored_review.place, restored_place)
+        self.assertIs(restored_review.user, restored)
+        self.assertEqual(restored.reviews, [review.id])
+        self.assertEqual(facade.get_reviews_by_place(place.id), [restored_review])
+        self.assertEqual(facade.review_repo.get_all_by_attribute("place_id", place.id), [restored_review])
+
+    def test_replays_updates_and_deletes(self):
+        user, _, place, review = self.populate()
+        self.facade.update_place(place.id, {"price": 250})
+        self.facade.user_repo.update(user.id, {"email": "alice@new.com"})
+        self.facade.delete_review(review.id)
+        facade = self.reopen()
+
+        self.assertEqual(facade.get_place(place.id).price, 250.0)
+        self.assertIsNone(facade.get_user_by_email("alice@example.com"))
+        self.assertEqual(facade.get_user_by_email("alice@new.com").id, user.id)
+        self.assertIsNone(facade.get_review(review.id))
+        self.assertEqual(facade.get_place(place.id).reviews, [])
+
+    def test_one_record_per_update(self):
+        _, _, place, _ = self.populate()
+        path = os.path.join(self.directory, "wal-00000000")
+        before = len(read_records(path)[0])
+        self.facade.update_place(place.id, {"title": "Renamed", "price": 120})
+        records, _ = read_records(path)
+
+        self.assertEqual(len(records), before + 1)
+        self.assertEqual(records[-1][:3], ("put", "places", place.id))
+
+    def test_snapshot_then_log_tail(self):
+        user, _, place, _ = self.populate()
+        self.facade.store.snapshot()
+        self.assertEqual(self.facade.store.unsnapshotted(), 0)
+        self.facade.update_place(place.id, {"title": "After snapshot"})
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(names, ["snapshot-00000001", "wal-00000001"])
+        self.facade.store.close()
+        records, _ = read_records(os.path.join(self.directory, "wal-00000001"))
+        self.assertEqual(self.facade.store.unsnapshotted(), len(records))
+        facade = self.reopen()
+
+        self.assertEqual(facade.get_place(place.id).title, "After snapshot")
+        self.assertEqual(len(facade.get_user(user.id).reviews), 1)
+
+    def test_torn_record_is_cut_off(self):
+        user, _, _, _ = self.populate()
+        self.facade.store.close()
+        path = os.path.join(self.directory, "wal-00000000")
+        size = os.path.getsize(path)
+        with open(path, "ab") as f:
+            f.write(b"\x40\x00\x00\x00partial")
+        facade = self.reopen()
+
+        self.assertEqual(os.path.getsize(path), size)
+        self.assertEqual(facade.get_user(user.id).email, "alice@example.com")
+
+    def test_concurrent_writes_are_all_logged(self):
+        def create(n):
+            for i in range(50):
+                self.facade.create_amenity({"name": f"Amenity {n}-{i}"})
+
+        threads = [threading.Thread(target=create, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        records, _ = read_records(os.path.join(self.directory, "wal-00000000"))
+        self.assertEqual(len(records), 200)
+        # The snapshot trigger counts every record, whichever thread logged it
+        self.assertEqual(self.facade.store.unsnapshotted(), 200)
+        self.assertEqual(len(self.reopen().get_all_amenities()), 200)
+
+    def test_review_writes_wait_off_the_locks(self):
+        user, _, place, review = self.populate()
+        store = self.facade.store
+        held = []
+
+        def wait(seq):
+            # Whether the user's or place's shard is still write-locked during the fsync
+            held.append(any(repo.shard_lock(obj_id)[1]._writer is not None
+                            for repo, obj_id in ((self.facade.user_repo, user.id),
+                                                 (self.facade.place_repo, place.id))))
+            type(store).wait(store, seq)
+
+        store.wait = wait
+        self.facade.create_review({"text": "Again", "rating": 4, "user_id": user.id, "place_id": place.id})
+        self.facade.delete_review(review.id)
+        self.assertEqual(held, [False, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
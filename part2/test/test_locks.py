@@ -0,0 +1,99 @@
+import threading
+import unittest
+
+from app.models.place import Place
+from app.models.users import User
+from app.persistence.locks import RWLock, locked
+from app.services.facade import HBnBFacade
+
+
+class TestRWLock(unittest.TestCase):
+    def test_readers_share_the_lock(self):
+        lock = RWLock()
+        both_reading = threading.Barrier(2, timeout=5)
+
+        def read():
+            with lock.reading():
+                both_reading.wait()
+
+        threads = [threading.Thread(target=read) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertFalse(both_reading.broken)
+
+    def test_writer_excludes_readers(self):
+        lock = RWLock()
+        events = []
+        lock.acquire_write()
+        reader = threading.Thread(target=lambda: (lock.acquire_read(), events.append("read"), lock.release_read()))
+        reader.start()
+        reader.join(0.1)
+        events.append("write done")
+        lock.release_write()
+        reader.join(5)
+        self.assertEqual(events, ["write done", "read"])
+
+    def test_reentrant(self):
+        lock = RWLock()
+        with lock.writing(), lock.writing(), lock.reading():
+            pass
+        with lock.reading(), lock.reading():
+            pass
+        # Fully released: another thread can write
+        writer = threading.Thread(target=lock.acquire_write)
+        writer.start()
+        writer.join(5)
+        self.assertFalse(writer.is_alive())
+
+
+class TestAtomicReviews(unittest.TestCase):
+    def setUp(self):
+        self.facade = HBnBFacade()
+        self.user = self.facade.create_user({"first_name": "Alice", "last_name": "Smith", "email": "a@example.com"})
+        self.place = Place("Flat", "A flat", 100, 10.0, 20.0, self.user.id)
+        self.facade.place_repo.add(self.place)
+
+    def test_concurrent_create_and_delete_keep_lists_consistent(self):
+        def work():
+            for i in range(200):
+                review = self.facade.create_review(
+                    {"text": "Nice", "rating": 4, "user_id": self.user.id, "place_id": self.place.id}
+                )
+                if i % 2:
+                    self.facade.delete_review(review.id)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stored = self.facade.get_all_reviews()
+        self.assertEqual(len(stored), 800)
+        stored_ids = [review.id for review in stored]
+        self.assertCountEqual(self.user.reviews, stored_ids)
+        self.assertCountEqual(self.place.reviews, stored_ids)
+
+    def test_locked_orders_shards(self):
+        other = User("Bob", "Jones", "b@example.com")
+        self.facade.user_repo.add(other)
+        done = []
+
+        def lock(first, second):
+            for _ in range(500):
+                with locked((self.facade.review_repo, "x"), first, second):
+                    pass
+            done.append(True)
+
+        users = (self.facade.user_repo, self.user.id), (self.facade.user_repo, other.id)
+        threads = [threading.Thread(target=lock, args=users), threading.Thread(target=lock, args=users[::-1])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(len(done), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+from app.models.place import Place
+from app.models.review import Review
+from app.models.users import User
+from app.persistence.repository import InMemoryRepository
+
+
+class TestInMemoryRepositoryIndexes(unittest.TestCase):
+    def setUp(self):
+        self.users = InMemoryRepository(unique_indexes=["email"])
+        self.places = InMemoryRepository(indexes=["owner_id"])
+        self.reviews = InMemoryRepository(indexes=["place_id"])
+        self.alice = User("Alice", "Smith", "alice@example.com")
+        self.bob = User("Bob", "Jones", "bob@example.com")
+        self.users.add(self.alice)
+        self.users.add(self.bob)
+
+    def make_place(self, title, owner):
+        place = Place(title, "A place", 100, 10.0, 20.0, owner.id)
+        self.places.add(place)
+        return place
+
+    def test_unique_lookup(self):
+        self.assertIs(self.users.get_by_attribute("email", "bob@example.com"), self.bob)
+        self.assertIsNone(self.users.get_by_attribute("email", "nobody@example.com"))
+
+    def test_duplicate_unique_value_rejected(self):
+        with self.assertRaises(ValueError):
+            self.users.add(User("Other", "Alice", "alice@example.com"))
+        self.assertEqual(len(self.users.get_all()), 2)
+
+    def test_update_moves_unique_value(self):
+        self.users.update(self.alice.id, {"email": "  alice@new.com "})
+        self.assertIsNone(self.users.get_by_attribute("email", "alice@example.com"))
+        # The setter strips the value, the index holds what the object holds
+        self.assertIs(self.users.get_by_attribute("email", "alice@new.com"), self.alice)
+
+    def test_update_to_taken_value_restores_object(self):
+        with self.assertRaises(ValueError):
+            self.users.update(self.alice.id, {"email": "bob@example.com"})
+        self.assertEqual(self.alice.email, "alice@example.com")
+        self.assertIs(self.users.get_by_attribute("email", "alice@example.com"), self.alice)
+        self.assertIs(self.users.get_by_attribute("email", "bob@example.com"), self.bob)
+
+    def test_failing_setter_keeps_index_in_sync(self):
+        with self.assertRaises(ValueError):
+            # email is set before first_name fails validation
+            self.users.update(self.alice.id, {"email": "alice@new.com", "first_name": ""})
+        self.assertIs(self.users.get_by_attribute("email", self.alice.email), self.alice)
+
+    def test_delete_frees_unique_value(self):
+        self.users.delete(self.alice.id)
+        self.assertIsNone(self.users.get_by_attribute("email", "alice@example.com"))
+        self.users.add(User("New", "Alice", "alice@example.com"))
+
+    def test_non_unique_index(self):
+        first = self.make_place("First", self.alice)
+        second = self.make_place("Second", self.alice)
+        self.make_place("Third", self.bob)
+        self.assertEqual(self.places.get_all_by_attribute("owner_id", self.alice.id), [first, second])
+        self.assertIs(self.places.get_by_attribute("owner_id", self.alice.id), first)
+
+        self.places.update(first.id, {"owner_id": self.bob.id})
+        self.assertEqual(self.places.get_all_by_attribute("owner_id", self.alice.id), [second])
+        self.places.delete(second.id)
+        self.assertEqual(self.places.get_all_by_attribute("owner_id", self.alice.id), [])
+        self.assertEqual(len(self.places.get_all_by_attribute("owner_id", self.bob.id)), 2)
+
+    def test_derived_attribute_index(self):
+        place = self.make_place("Reviewed", self.alice)
+        review = Review("Great", 5, place, self.bob)
+        self.reviews.add(review)
+        self.assertEqual(self.reviews.get_all_by_attribute("place_id", place.id), [review])
+
+    def test_unindexed_attribute_scans(self):
+        self.assertIs(self.users.get_by_attribute("first_name", "Bob"), self.bob)
+        self.assertEqual(self.users.get_all_by_attribute("last_name", "Smith"), [self.alice])
+
+    def test_reindex_after_direct_change(self):
+        self.alice.email = "alice@direct.com"
+        self.users.reindex(self.alice)
+        self.assertIs(self.users.get_by_attribute("email", "alice@direct.com"), self.alice)
+        self.assertIsNone(self.users.get_by_attribute("email", "alice@example.com"))
+
+    def test_clear(self):
+        self.users.clear()
+        self.assertEqual(self.users.get_all(), [])
+        self.assertIsNone(self.users.get_by_attribute("email", "alice@example.com"))
+
+
+if __name__ == "__main__":
+    unittest.main()
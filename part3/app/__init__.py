@@ -2,10 +2,20 @@ from flask import Flask
 from flask_restx import Api
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
+from app.passwords import PasswordHasher
+from app.querystats import QueryStats
+from app.metrics import Metrics
+from app.profiling import Profiler
+from app.pragmas import SQLitePragmas
 
 # Initialize extensions
 db = SQLAlchemy()
 bcrypt = Bcrypt()
+passwords = PasswordHasher()
+query_stats = QueryStats()
+metrics = Metrics()
+profiler = Profiler()
+sqlite_pragmas = SQLitePragmas(db)
 
 def create_app(config_class="config.DevelopmentConfig"):
     app = Flask(__name__)
@@ -13,7 +23,10 @@ def create_app(config_class="config.DevelopmentConfig"):
 
     # Initialize extensions with app
     db.init_app(app)
+    sqlite_pragmas.init_app(app)
     bcrypt.init_app(app)
+    passwords.init_app(app)
+    query_stats.init_app(app)
 
     api = Api(app, version="1.0", title="HBnB API", description="HBnB Application API")
 
@@ -29,4 +42,18 @@ def create_app(config_class="config.DevelopmentConfig"):
     api.add_namespace(places_ns, path="/api/v1/places")
     api.add_namespace(amenity_ns, path="/api/v1/amenities")
 
+    # Size the facade's entity cache for this app, this also empties it
+    from app.services import facade
+    facade.init_cache(app.config.get("ENTITY_CACHE"))
+
+    if app.config.get("SEARCH_INDEX_CHECK", True):
+        from app.persistence import search
+        with app.app_context(), db.engine.begin() as connection:
+            if search.rebuild_if_stale(connection):
+                app.logger.warning("Full-text index out of step with places, rebuilt")
+
+    profiler.init_app(app)
+    # Last, so that every route is registered before the metrics are
+    metrics.init_app(app)
+
     return app
\ No newline at end of file
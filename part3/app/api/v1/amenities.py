@@ -1,6 +1,12 @@
 from flask_restx import Namespace, Resource, fields
 from flask import request
 from app.services import facade
+from app.api.v1.conditional import (
+    conditional, entity_validators, is_not_modified, is_precondition_failed,
+    list_etag, not_modified, validators
+)
+from app.api.v1.batch import batch_response, get_batch_payload
+from app.api.v1.pagination import get_page_args, page_params, page_response
 
 api = Namespace('amenities', description='Amenity operations')
 
@@ -13,12 +19,19 @@ amenity_model = api.model('Amenity', {
     'name': fields.String(required=True, description='Name of the amenity')
 })
 
+# Columns read by amenity_to_dict, list endpoints project only these
+amenity_columns = ('id', 'name')
+
 def amenity_to_dict(amenity):
     return {
         "id": amenity.id,
         "name": amenity.name,
     }
 
+def amenity_etag(amenity_id):
+    amenity = facade.get_amenity(amenity_id)
+    return entity_validators(amenity)[0] if amenity else None
+
 @api.route('/')
 class AmenityList(Resource):
     @api.expect(amenity_model)
@@ -33,35 +46,69 @@ class AmenityList(Resource):
         except Exception as e:
             return {"Error": str(e)}, 400
 
+    @api.doc(params=page_params)
     @api.response(200, 'List of amenities retrieved successfully')
+    @api.response(304, 'List not modified since the ETag in If-None-Match')
+    @api.response(400, 'Invalid pagination parameters')
     def get(self):
         """Retrieve a list of all amenities"""
-        amenities = facade.get_all_amenities()
-        return [amenity_to_dict(a) for a in amenities], 200
+        etag = list_etag('amenities', facade.get_amenities_version())
+        if is_not_modified(etag):
+            return not_modified(validators(etag))
+        try:
+            page = get_page_args()
+            if page:
+                amenities, next_cursor = facade.get_amenities_page(*page, columns=amenity_columns)
+                return page_response([amenity_to_dict(a) for a in amenities], next_cursor), 200, validators(etag)
+        except ValueError as e:
+            return {"Error": str(e)}, 400
+        amenities = facade.get_all_amenities(columns=amenity_columns)
+        return [amenity_to_dict(a) for a in amenities], 200, validators(etag)
+
+@api.route('/batch')
+class AmenityBatch(Resource):
+    @api.expect([amenity_model])
+    @api.response(201, 'All amenities successfully created')
+    @api.response(207, 'Some amenities could not be created, see results')
+    @api.response(400, 'Invalid batch payload')
+    def post(self):
+        """Register many amenities in one request"""
+        try:
+            items = get_batch_payload()
+        except ValueError as e:
+            return {"Error": str(e)}, 400
+        try:
+            return batch_response(facade.create_amenities(items))
+        except Exception:
+            return {"Error": "An error occurred while creating the amenities, none of them was created"}, 500
 
 @api.route('/<amenity_id>')
 class AmenityResource(Resource):
     @api.response(200, 'Amenity details retrieved successfully')
+    @api.response(304, 'Amenity not modified')
     @api.response(404, 'Amenity not found')
     def get(self, amenity_id):
         """Get amenity details by ID"""
         amenity = facade.get_amenity(amenity_id)
         if not amenity:
             return {"Error": "Amenity not found"}, 404
-        return amenity_to_dict(amenity), 200
+        return conditional(*entity_validators(amenity), lambda: (amenity_to_dict(amenity), 200))
 
     @api.expect(amenity_model)
     @api.response(200, 'Amenity updated successfully')
     @api.response(404, 'Amenity not found')
     @api.response(400, 'Invalid input data')
+    @api.response(412, 'Amenity was modified since the ETag in If-Match')
     def put(self, amenity_id):
         """Update an amenity's information"""
         data = request.json
+        if is_precondition_failed(lambda: amenity_etag(amenity_id)):
+            return {"Error": "Amenity was modified, fetch it again before updating"}, 412
         try:
             amenity = facade.update_amenity(amenity_id, data)
             if not amenity:
                 return {"Error": "Amenity not found"}, 404
-            return {"Success": "Amenity updated successfully"}, 200
+            return {"Success": "Amenity updated successfully"}, 200, validators(*entity_validators(amenity))
         except Exception as e:
             return {"Error": str(e)}, 400
     
@@ -69,7 +116,7 @@ class AmenityResource(Resource):
     @api.response(404, 'Amenity not found')
     def delete(self, amenity_id):
         """Delete an amenity by ID"""
-        success = facade.amenity_repo.delete(amenity_id)
+        success = facade.delete_amenity(amenity_id)
         if success:
             return {"Success": "Amenity deleted successfully"}, 200
         return {"Error": "Amenity not found"}, 404
@@ -0,0 +1,25 @@
+from flask import current_app, request
+
+
+def get_batch_payload():
+    """Return the JSON array posted to a .../batch endpoint, raises ValueError if unusable"""
+    items = request.get_json(silent=True)
+    if not isinstance(items, list) or not items:
+        raise ValueError("Expected a non-empty JSON array")
+    max_items = current_app.config['BATCH_MAX_ITEMS']
+    if len(items) > max_items:
+        raise ValueError(f"A batch cannot contain more than {max_items} items")
+    return items
+
+
+def batch_response(results):
+    """Per-item outcome of a batch create, 201 if every item was created, 207 otherwise"""
+    items = []
+    for index, (obj_id, error) in enumerate(results):
+        if error is None:
+            items.append({'index': index, 'status': 201, 'id': obj_id})
+        else:
+            items.append({'index': index, 'status': 400, 'error': error})
+    created = sum(1 for item in items if item['status'] == 201)
+    body = {'created': created, 'failed': len(items) - created, 'results': items}
+    return body, 201 if created == len(items) else 207
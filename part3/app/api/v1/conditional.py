@@ -0,0 +1,83 @@
+import hashlib
+from datetime import timezone
+from flask import Response, request
+from werkzeug.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Opaque validator built from whatever identifies a representation's version"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def entity_validators(obj, related=()):
+    """(ETag, Last-Modified) of a single entity, derived from its id and updated_at.
+
+    related holds the versions, (row count, latest updated_at), of the
+    relations embedded in the response (?include=), so that a change to
+    an embedded row changes the validators too.
+    """
+    if not related:
+        return make_etag(type(obj).__name__, obj.id, obj.updated_at), obj.updated_at
+    return (make_etag(type(obj).__name__, obj.id, obj.updated_at, *related),
+            latest(obj.updated_at, *(version[1] for version in related)))
+
+
+def list_etag(name, version):
+    """ETag of a list response, the query string selects a different representation"""
+    return make_etag(name, version, sorted(request.args.items(multi=True)))
+
+
+def latest(*timestamps):
+    """Most recent of the given updated_at values, ignoring empty collections"""
+    return max((ts for ts in timestamps if ts is not None), default=None)
+
+
+def validators(etag, last_modified=None):
+    """Response headers carrying the validators of a representation"""
+    headers = {'ETag': quote_etag(etag)}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified.replace(tzinfo=timezone.utc))
+    return headers
+
+
+def is_not_modified(etag, last_modified=None):
+    """True when If-None-Match (or else If-Modified-Since) shows the client copy is current"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have a one second resolution
+        modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+        return modified <= request.if_modified_since
+    return False
+
+
+def not_modified(headers):
+    """Empty 304 response, sent without serializing anything"""
+    return Response(status=304, headers=headers)
+
+
+def is_precondition_failed(get_etag):
+    """True when the request has If-Match and it names another version.
+
+    get_etag is only called when If-Match is present, it returns None when
+    the resource does not exist (the caller then answers 404 as usual).
+    """
+    if not request.if_match:
+        return False
+    etag = get_etag()
+    return etag is not None and not request.if_match.contains(etag)
+
+
+def conditional(etag, last_modified, build):
+    """Answer a GET with 304 when the client copy is current, else build() with validators.
+
+    The query string (?fields=, ?include=...) selects another representation
+    of the entity, which gets its own ETag.
+    """
+    if request.args:
+        etag = make_etag(etag, sorted(request.args.items(multi=True)))
+    headers = validators(etag, last_modified)
+    if is_not_modified(etag, last_modified):
+        return not_modified(headers)
+    body, status = build()
+    return body, status, headers
@@ -0,0 +1,33 @@
+from flask import current_app, request
+
+# Swagger documentation for the list endpoints query string
+page_params = {
+    'limit': 'Maximum number of items to return (enables pagination)',
+    'cursor': 'next_cursor value from the previous page',
+}
+
+
+def get_page_args():
+    """Read ?limit=&cursor= from the request.
+
+    Returns None when the client asked for neither, so list endpoints keep
+    returning the plain list. Raises ValueError on a bad limit.
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is None and cursor is None:
+        return None
+    if limit is None:
+        limit = current_app.config['PAGE_SIZE_DEFAULT']
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, current_app.config['PAGE_SIZE_MAX']), cursor or None
+
+
+def page_response(items, next_cursor):
+    """Wrap one page of serialized items with the cursor for the next one"""
+    return {'items': items, 'next_cursor': next_cursor}
@@ -1,13 +1,23 @@
 from app.services import facade
 from flask_restx import Namespace, Resource, fields
-from flask import request
+from flask import current_app, request
+from app.api.v1.conditional import (
+    conditional, is_not_modified, is_precondition_failed, latest, list_etag,
+    make_etag, not_modified, validators
+)
+from app.api.v1.batch import batch_response, get_batch_payload
+from app.api.v1.pagination import get_page_args, page_params, page_response
+from app.api.v1.serializers import compile_model, json_response
+from app.api.v1.sparse import Representation, column, fieldset_params
+from app.api.v1.streaming import ndjson_response, stream_batch_size, wants_ndjson
 
 
 
 api = Namespace("places", description="Place operations")
 
 link_model = api.model('AmenityLink', {
-    'amenity_id': fields.String(required=True, description="ID of the amenity to add")
+    'amenity_id': fields.String(description="ID of the amenity to add"),
+    'amenity_ids': fields.List(fields.String, description="IDs of several amenities to add at once")
 })
 
 # Define the models for related entities
@@ -59,12 +69,129 @@ place_output_model = api.model('PlaceOutput', {
     'latitude': fields.Float(description='Latitude'),
     'longitude': fields.Float(description='Longitude'),
     'owner_id': fields.String(description='Owner ID'),
+    'review_count': fields.Integer(description='Number of reviews'),
+    'average_rating': fields.Float(description='Mean rating, null without reviews'),
+    'rating_histogram': fields.Raw(description='Number of reviews per rating, keyed "1" to "5"'),
     'amenities': fields.List(fields.Nested(amenity_model)),
     'reviews': fields.List(fields.Nested(review_model))
 })
 
 
 
+place_search_model = api.inherit('PlaceSearchResult', place_output_model, {
+    'distance_km': fields.Float(description='Distance from the search point in kilometres')
+})
+
+place_text_result_model = api.inherit('PlaceTextResult', place_output_model, {
+    'score': fields.Float(description='BM25 relevance, higher is better'),
+    'snippet': fields.String(description='Matching text with the matched words in <b></b>'),
+})
+
+# Serializers equivalent to marshal() with the models above, built once
+serialize_place_output = compile_model(place_output_model)
+serialize_place_search = compile_model(place_search_model)
+serialize_place_text = compile_model(place_text_result_model)
+serialize_place_review = compile_model(review_model)
+
+# Swagger documentation for the search query string
+search_params = {
+    'q': 'Words to find in titles and descriptions, a trailing * matches a prefix (cannot be combined with a location)',
+    'lat': 'Latitude of the search point',
+    'lng': 'Longitude of the search point',
+    'radius_km': 'Only return places within this distance of the point',
+    'bbox': 'Only return places inside min_lng,min_lat,max_lng,max_lat',
+    'k': 'Maximum number of places to return, nearest first',
+}
+
+
+def float_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+def get_search_args():
+    """Read the search query string, raises ValueError on malformed values"""
+    bbox = request.args.get('bbox')
+    if bbox is not None:
+        try:
+            bbox = [float(value) for value in bbox.split(',')]
+        except ValueError:
+            bbox = []
+        if len(bbox) != 4:
+            raise ValueError("bbox must be min_lng,min_lat,max_lng,max_lat")
+    return {
+        'latitude': float_arg('lat'),
+        'longitude': float_arg('lng'),
+        'radius_km': float_arg('radius_km'),
+        'bbox': bbox,
+        'k': get_k(),
+    }
+
+
+# Swagger documentation for the list filters and sort
+listing_params = {
+    'min_price': 'Only places with a price of at least this much',
+    'max_price': 'Only places with a price of at most this much',
+    'amenity_id': 'Only places having this amenity, repeat it to require several',
+    'owner_id': 'Only places owned by this user',
+    'min_rating': 'Only places with an average rating of at least this much',
+    'sort': 'price, -price, created_at, -created_at, rating or -rating (- for descending)',
+}
+
+
+def get_listing_args():
+    """Read the list filters and sort, raises ValueError on malformed values"""
+    return {
+        'min_price': float_arg('min_price'),
+        'max_price': float_arg('max_price'),
+        'amenity_ids': request.args.getlist('amenity_id'),
+        'owner_id': request.args.get('owner_id'),
+        'min_rating': float_arg('min_rating'),
+        'sort': request.args.get('sort'),
+    }
+
+
+def get_k():
+    k = request.args.get('k', current_app.config['PAGE_SIZE_DEFAULT'])
+    try:
+        return min(int(k), current_app.config['PAGE_SIZE_MAX'])
+    except ValueError:
+        raise ValueError("k must be an integer")
+
+
+# Relationships walked by Place.to_dict, fetched with one SELECT ... IN each
+place_list_load = ('amenities_r', 'reviews_r')
+
+# Fields and relations available to ?fields= and ?include=
+place_representation = Representation(
+    dict(
+        {name: column(name) for name in
+         ('id', 'title', 'description', 'price', 'latitude', 'longitude', 'owner_id', 'review_count')},
+        average_rating=(('rating_sum', 'review_count'),
+                        lambda read: read('rating_sum') / read('review_count') if read('review_count') else None),
+        rating_histogram=(tuple(f'rating_{rating}' for rating in range(1, 6)),
+                          lambda read: {str(rating): read(f'rating_{rating}') for rating in range(1, 6)}),
+    ),
+    {
+        'amenities': ('amenities_r', lambda amenity: amenity.to_dict()),
+        'reviews': ('reviews_r', lambda review: serialize_place_review(review.to_dict())),
+    },
+)
+
+
+def serialize_place(place):
+    return serialize_place_output(place.to_dict())
+
+
+def place_validators(place):
+    """(ETag, Last-Modified) of a place, its embedded reviews and amenities included"""
+    updated_at, reviews, amenities = facade.get_place_version(place)
+    return make_etag(place.id, updated_at, reviews, amenities), latest(updated_at, reviews[1], amenities[1])
 
 
 @api.route('/')
@@ -81,20 +208,10 @@ class PlaceList(Resource):
         if not all(data.get(field) for field in required_fields):
             return {'Error': 'Missing required fields'}, 400
 
-        # Extract amenities from data before creating place
-        amenities = data.pop('amenities', [])
-
         try:
-            # Create place using facade
+            # Create place using facade, amenities are resolved in one query
             new_place = facade.create_place(data)
 
-            # Handle amenities if provided
-            if amenities:
-                for amenity_id in amenities:
-                    amenity = facade.get_amenity(amenity_id)
-                    if amenity:
-                        new_place.add_amenity(amenity)
-
             return {
                 'message': 'Place successfully created',
                 'place': {
@@ -110,39 +227,115 @@ class PlaceList(Resource):
         except Exception as e:
             return {'error': str(e)}, 400
     
-    @api.marshal_list_with(place_output_model)
-    @api.response(200, 'List of places retrieved successfully')
-
-    
+    @api.doc(params=dict(page_params, **listing_params, **fieldset_params))
+    @api.response(200, 'List of places retrieved successfully', [place_output_model])
+    @api.response(304, 'List not modified since the ETag in If-None-Match')
+    @api.response(400, 'Invalid pagination, filter, sort or fieldset parameters')
+    @api.produces(['application/json', 'application/x-ndjson'])
     def get(self):
-        """Retrieve a list of all places with amenities and reviews"""
-        places = facade.place_repo.get_all()
-        return [place.to_dict() for place in places]
+        """Retrieve a list of places with amenities and reviews, optionally filtered and sorted"""
+        try:
+            listing = get_listing_args()
+            serialize, options = place_representation.for_request(serialize_place, {'load': place_list_load})
+            if wants_ndjson():
+                places = facade.iter_places(stream_batch_size(), **options, **listing)
+                return ndjson_response(places, serialize)
+            etag = list_etag('places', facade.get_places_version())
+            if is_not_modified(etag):
+                return not_modified(validators(etag))
+            page = get_page_args()
+            if page:
+                places, next_cursor = facade.get_places_page(*page, **options, **listing)
+                return json_response(page_response([serialize(place) for place in places], next_cursor),
+                                     200, validators(etag))
+            places = facade.get_all_places(**options, **listing)
+        except ValueError as e:
+            return {'Error': str(e)}, 400
+        return json_response([serialize(place) for place in places], 200, validators(etag))
 
 
 
+@api.route('/batch')
+class PlaceBatch(Resource):
+    @api.expect([place_input_model])
+    @api.response(201, 'All places successfully created')
+    @api.response(207, 'Some places could not be created, see results')
+    @api.response(400, 'Invalid batch payload')
+    def post(self):
+        """Register many places in one request"""
+        try:
+            items = get_batch_payload()
+        except ValueError as e:
+            return {'Error': str(e)}, 400
+        try:
+            return batch_response(facade.create_places(items))
+        except Exception:
+            return {'error': 'An error occurred while creating the places, none of them was created'}, 500
+
+
+@api.route('/search')
+class PlaceSearch(Resource):
+    @api.doc(params=search_params)
+    @api.response(200, 'Places found, nearest first (best match first with q)', [place_search_model])
+    @api.response(400, 'Invalid search parameters')
+    def get(self):
+        """Find places by text (q), around a point (lat, lng, radius_km, k) or inside a bounding box (bbox)"""
+        try:
+            if 'q' in request.args:
+                if any(name in request.args for name in ('lat', 'lng', 'radius_km', 'bbox')):
+                    raise ValueError("q cannot be combined with lat, lng, radius_km or bbox")
+                matches = facade.search_places_text(request.args['q'], get_k(), load=place_list_load)
+                return json_response([
+                    serialize_place_text(dict(place.to_dict(), score=score, snippet=snippet))
+                    for place, score, snippet in matches
+                ])
+            results = facade.search_places(load=place_list_load, **get_search_args())
+        except ValueError as e:
+            return {'Error': str(e)}, 400
+        return json_response([
+            serialize_place_search(dict(place.to_dict(), distance_km=round(distance, 3)))
+            for place, distance in results
+        ])
+
+
 @api.route("/<place_id>")
 class PlaceResource(Resource):
 
+    @api.doc(params=fieldset_params)
     @api.response(200, "Place details retrieved successfully")
+    @api.response(304, "Place not modified")
+    @api.response(400, "Invalid fieldset parameters")
     @api.response(404, "Place not found")
     def get(self, place_id):
         """Get place details by ID"""
+        try:
+            serialize, _ = place_representation.for_request(lambda place: place.to_dict())
+        except ValueError as e:
+            return {"Error": str(e)}, 400
+
         place = facade.get_place(place_id.strip())
 
         if not place:
             return {"Error": "Place not found"}, 404
 
-        return place.to_dict() if hasattr(place, "to_dict") else str(place), 200
+        return conditional(*place_validators(place), lambda: (serialize(place), 200))
 
     @api.expect(place_input_model)
     @api.response(200, 'Place updated successfully')
     @api.response(404, 'Place not found')
     @api.response(400, 'Invalid input data')
+    @api.response(412, 'Place was modified since the ETag in If-Match')
     def put(self, place_id):
         """Update a place's information"""
         data = api.payload
 
+        def current_etag():
+            place = facade.get_place(place_id.strip())
+            return place_validators(place)[0] if place else None
+
+        if is_precondition_failed(current_etag):
+            return {'Error': 'Place was modified, fetch it again before updating'}, 412
+
         updated_place = facade.update_place(place_id.strip(), data)
 
         if not updated_place:
@@ -151,7 +344,7 @@ class PlaceResource(Resource):
         return {
             'Success': 'Place updated successfully',
             'Updated': updated_place.to_dict() if hasattr(updated_place, 'to_dict') else str(updated_place)
-        }, 200
+        }, 200, validators(*place_validators(updated_place))
     
     @api.response(200, "Place deleted successfully")
     @api.response(404, "Place not found")
@@ -168,13 +361,19 @@ class PlaceResource(Resource):
 class AddAmenityToPlace(Resource):
     @api.expect(link_model)
     @api.response(200, 'Amenity successfully added to place')
+    @api.response(400, 'No amenity ID given')
     @api.response(404, 'Place or amenity not found')
     def post(self, place_id):
-        """Add an amenity to a place"""
-        data = request.get_json()
-        amenity_id = data.get("amenity_id")
+        """Add one amenity (amenity_id) or several (amenity_ids) to a place"""
+        data = request.get_json() or {}
+        amenity_ids = data.get("amenity_ids")
+        if amenity_ids is None and data.get("amenity_id"):
+            amenity_ids = [data["amenity_id"]]
+        if not isinstance(amenity_ids, list) or not amenity_ids \
+                or not all(isinstance(a, str) for a in amenity_ids):
+            return {"error": "amenity_id or a non-empty amenity_ids list is required"}, 400
         try:
-            place = facade.add_amenity_to_place(place_id, amenity_id)
+            place = facade.add_amenities_to_place(place_id, amenity_ids)
             return place.to_dict(), 200
         except ValueError as e:
             return {"error": str(e)}, 404
@@ -1,6 +1,14 @@
 from app.services import facade
 from flask import request
 from flask_restx import Namespace, Resource, fields
+from app.api.v1.conditional import (
+    conditional, entity_validators, is_not_modified, is_precondition_failed,
+    list_etag, not_modified, validators
+)
+from app.api.v1.batch import batch_response, get_batch_payload
+from app.api.v1.pagination import get_page_args, page_params, page_response
+from app.api.v1.sparse import Representation, column, fieldset_params
+from app.api.v1.streaming import ndjson_response, stream_batch_size, wants_ndjson
 
 api = Namespace("reviews", description="Review operations")
 
@@ -18,16 +26,30 @@ review_model = api.model(
 )
 
 
+# Columns read by review_to_dict, list endpoints project only these
+review_columns = ("id", "text", "rating", "user_id", "place_id")
+
+
 def review_to_dict(review):
     return {
         "id": review.id,
         "text": review.text,
         "rating": review.rating,
-        "user_id": review.user_r.id,
-        "place_id": review.place_r.id,
+        "user_id": review.user_id,
+        "place_id": review.place_id,
     }
 
 
+# Fields and relations available to ?fields= and ?include=
+review_representation = Representation(
+    {name: column(name) for name in review_columns},
+    {
+        "user": ("user_r", lambda user: {"id": user.id, "first_name": user.first_name, "last_name": user.last_name}),
+        "place": ("place_r", lambda place: {"id": place.id, "title": place.title}),
+    },
+)
+
+
 @api.route("/")
 class ReviewList(Resource):
     @api.expect(review_model)
@@ -59,29 +81,73 @@ class ReviewList(Resource):
                     "error": "An error occurred while creating the review. Please try again."
                 }, 500
 
+    @api.doc(params=dict(page_params, **fieldset_params))
     @api.response(200, "List of reviews retrieved successfully")
+    @api.response(304, "List not modified since the ETag in If-None-Match")
+    @api.response(400, "Invalid pagination or fieldset parameters")
+    @api.produces(["application/json", "application/x-ndjson"])
     def get(self):
         """Retrieve a list of all reviews"""
-        reviews = facade.get_all_reviews()
-        return [review_to_dict(r) for r in reviews], 200
+        try:
+            serialize, options = review_representation.for_request(review_to_dict, {"columns": review_columns})
+            if wants_ndjson():
+                return ndjson_response(facade.iter_reviews(stream_batch_size(), **options), serialize)
+            etag = list_etag("reviews", facade.get_reviews_version())
+            if is_not_modified(etag):
+                return not_modified(validators(etag))
+            page = get_page_args()
+            if page:
+                reviews, next_cursor = facade.get_reviews_page(*page, **options)
+                return page_response([serialize(r) for r in reviews], next_cursor), 200, validators(etag)
+            reviews = facade.get_all_reviews(**options)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        return [serialize(r) for r in reviews], 200, validators(etag)
+
+
+@api.route("/batch")
+class ReviewBatch(Resource):
+    @api.expect([review_model])
+    @api.response(201, "All reviews successfully created")
+    @api.response(207, "Some reviews could not be created, see results")
+    @api.response(400, "Invalid batch payload")
+    def post(self):
+        """Register many reviews in one request"""
+        try:
+            items = get_batch_payload()
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        try:
+            return batch_response(facade.create_reviews(items))
+        except Exception:
+            return {"error": "An error occurred while creating the reviews, none of them was created"}, 500
 
 
 @api.route("/<review_id>")
 class ReviewResource(Resource):
+    @api.doc(params=fieldset_params)
     @api.response(200, "Review details retrieved successfully")
+    @api.response(304, "Review not modified")
+    @api.response(400, "Invalid fieldset parameters")
     @api.response(404, "Review not found")
     def get(self, review_id):
         """Get review details by ID"""
+        try:
+            serialize, options = review_representation.for_request(review_to_dict)
+        except ValueError as e:
+            return {"error": str(e)}, 400
         review = facade.get_review(review_id)
         if not review:
             return {"Error": "Review not found"}, 404
-        return review_to_dict(review), 200
+        related = facade.get_relations_version(review, options.get("load", ()))
+        return conditional(*entity_validators(review, related), lambda: (serialize(review), 200))
 
     @api.expect(review_model)
     @api.response(200, "Review updated successfully")
     @api.response(404, "Review not found")
     @api.response(403, "Unauthorized to update this review")
     @api.response(400, "Invalid input data")
+    @api.response(412, "Review was modified since the ETag in If-Match")
     def put(self, review_id):
         """Update a review's information (only by its author)"""
         data = request.json
@@ -94,9 +160,12 @@ class ReviewResource(Resource):
         if review.user_id != user_id:
             return {"error": "You are not authorized to update this review"}, 403
 
+        if is_precondition_failed(lambda: entity_validators(review)[0]):
+            return {"error": "Review was modified, fetch it again before updating"}, 412
+
         try:
             updated_review = facade.update_review(review_id, data)
-            return {"message": "Review updated successfully"}, 200
+            return {"message": "Review updated successfully"}, 200, validators(*entity_validators(updated_review))
         except ValueError as e:
             return {"error": str(e)}, 400
         except Exception:
@@ -129,10 +198,14 @@ class ReviewResource(Resource):
 @api.route("/places/<place_id>/reviews")
 class PlaceReviewList(Resource):
     @api.response(200, "List of reviews for the place retrieved successfully")
+    @api.response(304, "List not modified since the ETag in If-None-Match")
     @api.response(404, "Place not found")
     def get(self, place_id):
         """Get all reviews for a specific place"""
-        reviews = facade.get_reviews_by_place(place_id)
-        if reviews is None:
+        if not facade.get_place(place_id):
             return {"Error": "Place not found"}, 404
-        return [review_to_dict(r) for r in reviews], 200
+        etag = list_etag(("reviews", place_id), facade.get_reviews_version(place_id))
+        if is_not_modified(etag):
+            return not_modified(validators(etag))
+        reviews = facade.get_reviews_by_place(place_id)
+        return [review_to_dict(r) for r in reviews], 200, validators(etag)
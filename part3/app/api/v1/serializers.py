@@ -0,0 +1,117 @@
+"""
+Serializers compiled from flask-restx models.
+
+marshal() walks the field tree of a model for every object it outputs:
+one output() call per field, get_value() splitting each key on dots, a
+new marshal() per nested item. compile_model() reads the model once and
+generates a plain function with the lookups and formatting of every
+field unrolled into a single dict literal. It returns what marshal()
+returns for the common fields (String, Integer, Float, Boolean, Raw and
+Nested or List of those), any other field or option goes through its own
+output() as before. The models are left untouched, so the Swagger
+documentation does not change.
+
+dumps() encodes to bytes with orjson when it is installed, and falls
+back to the json module otherwise.
+"""
+import json
+from flask import Response
+from flask_restx import fields, marshal
+from flask_restx.inputs import boolean
+
+try:
+    import orjson
+except ImportError:  # optional, only makes encoding faster
+    orjson = None
+
+# Expression formatting a non-None value v, per exact field class
+FORMATS = {
+    fields.Raw: 'v',
+    fields.String: 'str(v)',
+    fields.Integer: 'int(v)',
+    fields.Float: 'float(v)',
+    fields.Boolean: 'boolean(v)',
+}
+
+
+def _is_plain(field):
+    """True when the field reads a plain key and has no default to fall back to"""
+    attribute = field.attribute
+    return (attribute is None or (isinstance(attribute, str) and '.' not in attribute)) and field.default is None
+
+
+class _Compiler:
+    def __init__(self):
+        self.namespace = {'boolean': boolean}
+        self.compiled = {}
+
+    def name(self, prefix, value):
+        name = f'{prefix}{len(self.namespace)}'
+        self.namespace[name] = value
+        return name
+
+    def model(self, model):
+        """Name of the function serializing model, compiled on first use"""
+        if id(model) in self.compiled:
+            return self.compiled[id(model)]
+        function = self.name('serialize_', None)
+        self.compiled[id(model)] = function
+        items = []
+        for key, field in getattr(model, 'resolved', model).items():
+            if isinstance(field, type):
+                field = field()
+            items.append(f'{key!r}: {self.field(key, field)}')
+        source = (f'def {function}(obj):\n'
+                  f'    get = obj.get if type(obj) is dict else lambda key: getattr(obj, key, None)\n'
+                  f'    return {{{", ".join(items)}}}\n')
+        exec(source, self.namespace)
+        return function
+
+    def field(self, key, field):
+        """Expression outputting field from obj"""
+        fallback = f'{self.name("field_", field)}.output({key!r}, obj)'
+        if not _is_plain(field):
+            return fallback
+        value = f'get({(field.attribute or key)!r})'
+        item = self.item(field)
+        if item is None:
+            return fallback
+        if isinstance(field, fields.List):
+            return f'(None if (v := {value}) is None else [{item} for v in v] if type(v) is list else {fallback})'
+        if isinstance(field, fields.Nested) and not field.allow_null:
+            return f'{self.model(field.nested)}({value})'
+        return f'(None if (v := {value}) is None else {item})'
+
+    def item(self, field):
+        """Expression formatting a non-None value v of field, None when it has no fast path"""
+        if type(field) in FORMATS:
+            return FORMATS[type(field)]
+        if type(field) is fields.Nested and not field.skip_none and not field.as_list:
+            return f'{self.model(field.nested)}(v)'
+        if type(field) is fields.List and not isinstance(field.container, fields.List):
+            container = field.container
+            if type(container) is fields.Nested and not container.allow_null:
+                return self.item(container)
+            if type(container) in FORMATS and container.default is None:
+                return f'(None if v is None else {FORMATS[type(container)]})'
+        return None
+
+
+def compile_model(model):
+    """Function serializing one object (dict or instance) exactly like marshal(obj, model)"""
+    if any(isinstance(field, fields.Wildcard) for field in getattr(model, 'resolved', model).values()):
+        return lambda obj: marshal(obj, model)
+    compiler = _Compiler()
+    return compiler.namespace[compiler.model(model)]
+
+
+def dumps(data):
+    """Encode data as compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+def json_response(data, status=200, headers=None):
+    """Response with data already encoded, skipping the restx representation"""
+    return Response(dumps(data), status, headers, mimetype='application/json')
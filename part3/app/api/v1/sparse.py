@@ -0,0 +1,99 @@
+from collections import namedtuple
+from flask import request
+from sqlalchemy import inspect
+from sqlalchemy.engine import Row
+from app.models.ordered_set import OrderedSet
+
+# Swagger documentation for ?fields= and ?include=
+fieldset_params = {
+    'fields': 'Comma separated fields to return (id is always returned), e.g. id,title,price',
+    'include': 'Comma separated related resources to embed',
+}
+
+Fieldset = namedtuple('Fieldset', 'fields relations')
+
+
+def column_reader(obj):
+    """Read table columns by name from a projected row or a model instance"""
+    if isinstance(obj, Row):
+        return obj._mapping.__getitem__
+    mapper = inspect(obj).mapper
+    return lambda name: getattr(obj, mapper.get_property_by_column(mapper.local_table.c[name]).key)
+
+
+def column(name):
+    """Field read straight from the column of the same name"""
+    return (name,), lambda read: read(name)
+
+
+class Representation:
+    """Fields and embeddable relations of a resource, for sparse responses.
+
+    fields maps an output name to (table columns it reads, getter), the
+    getter receives a column_reader. relations maps an output name to
+    (relationship attribute, serializer of one related object).
+    """
+
+    def __init__(self, fields, relations=None):
+        self.fields = fields
+        self.relations = relations or {}
+
+    def from_request(self):
+        """Fieldset asked for with ?fields= and ?include=, None when neither is given.
+
+        Without fields every field is returned. A relation is embedded when
+        it is named in fields or in include. Raises ValueError on unknown names.
+        """
+        fields_arg, include_arg = request.args.get('fields'), request.args.get('include')
+        if fields_arg is None and include_arg is None:
+            return None
+        requested = [name for name in (fields_arg or '').split(',') if name]
+        included = [name for name in (include_arg or '').split(',') if name]
+        for name in requested:
+            if name not in self.fields and name not in self.relations:
+                raise ValueError(f"Unknown field: {name}")
+        for name in included:
+            if name not in self.relations:
+                raise ValueError(f"Unknown relation: {name}")
+        if fields_arg is None:
+            fields = list(self.fields)
+        else:
+            fields = ['id'] + [name for name in requested if name in self.fields and name != 'id']
+        relations = [name for name in self.relations if name in requested or name in included]
+        return Fieldset(fields, relations)
+
+    def for_request(self, default_serialize, default_options=None):
+        """(serializer, repository options) of this request's fieldset.
+
+        Requests without ?fields= and ?include= get the defaults. Raises
+        ValueError on unknown names.
+        """
+        fieldset = self.from_request()
+        if fieldset is None:
+            return default_serialize, default_options or {}
+        return (lambda obj: self.serialize(obj, fieldset)), self.query_options(fieldset)
+
+    def query_options(self, fieldset):
+        """load/columns arguments of the repository read methods for a fieldset.
+
+        Without relations only the needed columns are selected, otherwise
+        model instances are loaded with the requested relationships only.
+        """
+        if fieldset.relations:
+            return {'load': [self.relations[name][0] for name in fieldset.relations]}
+        columns = []
+        for name in fieldset.fields:
+            columns.extend(c for c in self.fields[name][0] if c not in columns)
+        return {'columns': columns}
+
+    def serialize(self, obj, fieldset):
+        read = column_reader(obj)
+        data = {name: self.fields[name][1](read) for name in fieldset.fields}
+        for name in fieldset.relations:
+            attribute, serialize = self.relations[name]
+            related = getattr(obj, attribute)
+            if isinstance(related, (list, OrderedSet)):
+                data[name] = [serialize(item) for item in related]
+            else:
+                data[name] = serialize(related) if related is not None else None
+        return data
@@ -0,0 +1,27 @@
+from flask import Response, current_app, request, stream_with_context
+from app.api.v1.serializers import dumps
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson():
+    """True when the client prefers NDJSON over JSON in its Accept header"""
+    best = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def stream_batch_size():
+    return current_app.config['STREAM_BATCH_SIZE']
+
+
+def ndjson_response(rows, serialize):
+    """Stream one JSON object per line as rows are read from the database.
+
+    rows should be a lazy iterable (e.g. a yield_per query) so that the
+    whole collection never sits in memory at once.
+    """
+    def generate():
+        for row in rows:
+            yield dumps(serialize(row)) + b'\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
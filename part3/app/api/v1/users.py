@@ -1,5 +1,13 @@
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
+from app.passwords import PasswordHasherBusy
+from app.api.v1.conditional import (
+    conditional, entity_validators, is_not_modified, is_precondition_failed,
+    list_etag, not_modified, validators
+)
+from app.api.v1.pagination import get_page_args, page_params, page_response
+from app.api.v1.sparse import Representation, column, fieldset_params
+from app.api.v1.streaming import ndjson_response, stream_batch_size, wants_ndjson
 
 api = Namespace('users', description='User operations')
 
@@ -17,24 +25,61 @@ user_update_model = api.model('UserUpdate', {
     'last_name': fields.String(required=False, description='Last name of the user')
 })
 
+# Columns read by user_to_dict, list endpoints project only these
+user_columns = ('id', 'first_name', 'last_name', 'email')
+
+def user_to_dict(user):
+    return {
+        'id': user.id,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'email': user.email
+    }
+
+# Fields and relations available to ?fields= and ?include=
+user_representation = Representation(
+    {name: column(name) for name in user_columns},
+    {
+        'places': ('places_r', lambda place: {'id': place.id, 'title': place.title, 'price': place.price}),
+        'reviews': ('reviews_r', lambda review: review.to_dict()),
+    },
+)
+
+def user_etag(user_id):
+    user = facade.get_user(user_id)
+    return entity_validators(user)[0] if user else None
+
 @api.route('/')
 class UserList(Resource):
 
+    @api.doc(params=dict(page_params, **fieldset_params))
     @api.response(200, 'List of users')
+    @api.response(304, 'List not modified since the ETag in If-None-Match')
+    @api.response(400, 'Invalid pagination or fieldset parameters')
+    @api.produces(['application/json', 'application/x-ndjson'])
     def get(self):
         """Get all users"""
-        users = facade.user_repo.get_all()
-        return [{
-            'id': user.id,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'email': user.email
-        } for user in users], 200
+        try:
+            serialize, options = user_representation.for_request(user_to_dict, {'columns': user_columns})
+            if wants_ndjson():
+                return ndjson_response(facade.iter_users(stream_batch_size(), **options), serialize)
+            etag = list_etag('users', facade.get_users_version())
+            if is_not_modified(etag):
+                return not_modified(validators(etag))
+            page = get_page_args()
+            if page:
+                users, next_cursor = facade.get_users_page(*page, **options)
+                return page_response([serialize(user) for user in users], next_cursor), 200, validators(etag)
+            users = facade.get_all_users(**options)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        return [serialize(user) for user in users], 200, validators(etag)
     
     @api.expect(user_model, validate=True)
     @api.response(201, 'User successfully created')
     @api.response(400, 'Email already registered')
     @api.response(400, 'Invalid input data')
+    @api.response(503, 'Too many signups in progress, retry later')
     def post(self):
         """Register a new user"""
         
@@ -62,6 +107,8 @@ class UserList(Resource):
             }, 201
         except ValueError as e:
             return {'error': str(e)}, 400
+        except PasswordHasherBusy:
+            return {'error': 'Server is busy, please retry shortly'}, 503, {'Retry-After': '1'}
         except Exception as e:
             print("CREATE USER ERROR:", e)
             # Catch database integrity errors and other exceptions
@@ -73,27 +120,33 @@ class UserList(Resource):
 @api.route('/<user_id>')
 class UserResource(Resource):
 
+    @api.doc(params=fieldset_params)
     @api.response(200, 'User details retrieved successfully')
+    @api.response(304, 'User not modified')
+    @api.response(400, 'Invalid fieldset parameters')
     @api.response(404, 'User not found')
     def get(self, user_id):
         """Get user details by ID"""
+        try:
+            serialize, options = user_representation.for_request(user_to_dict)
+        except ValueError as e:
+            return {'error': str(e)}, 400
         user = facade.get_user(user_id)
         if not user:
             return {'error': 'User not found'}, 404
-        return {
-            'id': user.id,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'email': user.email
-        }, 200
+        related = facade.get_relations_version(user, options.get('load', ()))
+        return conditional(*entity_validators(user, related), lambda: (serialize(user), 200))
 
     @api.expect(user_update_model)
     @api.response(200, 'User updated successfully')
     @api.response(404, 'User not found')
     @api.response(400, 'Invalid input data')
+    @api.response(412, 'User was modified since the ETag in If-Match')
     def put(self, user_id):
         """Update a user's information"""
         user_data = api.payload
+        if is_precondition_failed(lambda: user_etag(user_id)):
+            return {'error': 'User was modified, fetch it again before updating'}, 412
         try:
             updated_user = facade.update_user(user_id, user_data)
             if not updated_user:
@@ -106,7 +159,7 @@ class UserResource(Resource):
                     'last_name': updated_user.last_name,
                     'email': updated_user.email
                 }
-            }, 200
+            }, 200, validators(*entity_validators(updated_user))
         except ValueError as e:
             return {'error': str(e)}, 400
         except Exception as e:
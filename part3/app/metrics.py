@@ -0,0 +1,247 @@
+"""
+Prometheus metrics, served as text on GET /metrics.
+
+Metrics records the latency, SQL time and status of every request in
+per-route objects created once by init_app, one for each URL rule and
+method, so a request only does a dict lookup, a bisect and a few
+additions under an uncontended lock. Requests never add series: those of
+no registered (rule, method) are recorded under UNMATCHED, with methods
+outside METHODS labelled "other", so the label set stays bounded whatever
+methods and paths clients send. Gauges that describe the state of
+the process (connection pool, password hashing queue, entity caches) are
+read when /metrics is scraped.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, current_app, g, request
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Upper bounds in seconds, +Inf is implied
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+# Route label of requests no pre-registered series describes: no URL rule
+# matched (404, 405...), or the rule is not recorded for that method
+UNMATCHED = '<unmatched>'
+# Method label of requests with any method but these, which clients choose freely
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+OTHER_METHOD = 'other'
+
+
+def _labels(**labels):
+    if not labels:
+        return ''
+
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Counts of observations per bucket, with their sum; not locked, see RouteMetrics"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}'
+        yield f'{name}_sum{_labels(**labels)} {_number(self.sum)}'
+        yield f'{name}_count{_labels(**labels)} {cumulative}'
+
+
+class RouteMetrics:
+    """Everything recorded about one (route, method)"""
+
+    def __init__(self, route, method):
+        self.labels = {'route': route, 'method': method}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.in_flight = 0
+        self.statuses = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def finish(self, status, duration, db_duration):
+        with self.lock:
+            self.in_flight -= 1
+            self.latency.observe(duration)
+            if db_duration is not None:
+                self.db_time.observe(db_duration)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+class Metrics:
+    """Flask extension recording request metrics and serving them on /metrics.
+
+    Settings read by init_app:
+        METRICS         record requests and add the /metrics route
+    """
+
+    def __init__(self, app=None):
+        self._routes = {}
+        self.checkout_wait = Histogram(CHECKOUT_BUCKETS)
+        self._checkout_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Pre-register every route of app, call it once all namespaces are added.
+
+        This also resets everything recorded so far.
+        """
+        if not app.config.get('METRICS', True):
+            return
+        routes = {}
+        app.add_url_rule('/metrics', 'metrics', self.render)
+        for rule in app.url_map.iter_rules():
+            for method in rule.methods - {'HEAD', 'OPTIONS'}:
+                routes[rule.rule, method] = RouteMetrics(rule.rule, method)
+        for method in METHODS + (OTHER_METHOD,):
+            routes[UNMATCHED, method] = RouteMetrics(UNMATCHED, method)
+        self._routes = routes
+        self.checkout_wait = Histogram(CHECKOUT_BUCKETS)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+        from app import db
+        with app.app_context():
+            for engine in db.engines.values():
+                self._time_checkouts(engine)
+
+    def _route(self, rule, method):
+        """Series of a request, one of those registered by init_app"""
+        if method not in METHODS:
+            method = OTHER_METHOD
+        metrics = self._routes.get((rule.rule, method)) if rule is not None else None
+        return metrics if metrics is not None else self._routes[UNMATCHED, method]
+
+    def _time_checkouts(self, engine):
+        """Time how long each new Connection waits for the pool"""
+        raw_connection = engine.raw_connection
+
+        def timed_raw_connection():
+            started = time.perf_counter()
+            try:
+                return raw_connection()
+            finally:
+                waited = time.perf_counter() - started
+                with self._checkout_lock:
+                    self.checkout_wait.observe(waited)
+
+        engine.raw_connection = timed_raw_connection
+
+    """
+    REQUEST HOOKS
+    """
+    def _start(self):
+        route = self._route(request.url_rule, request.method)
+        route.start()
+        g.metrics_request = route, time.perf_counter()
+
+    def _finish(self, response):
+        self._record(response.status_code)
+        return response
+
+    def _teardown(self, exc):
+        # after_request is skipped when the view raised
+        self._record(500)
+
+    def _record(self, status):
+        started = g.pop('metrics_request', None)
+        if started is None:
+            return
+        route, started = started
+        recorder = g.get('query_recorder')
+        route.finish(status, time.perf_counter() - started, recorder.duration if recorder else None)
+
+    """
+    EXPOSITION
+    """
+    def render(self):
+        return Response('\n'.join(self.lines()) + '\n', content_type=CONTENT_TYPE)
+
+    def lines(self):
+        routes = list(self._routes.values())
+
+        yield '# HELP hbnb_http_request_duration_seconds Time to build the response, by route'
+        yield '# TYPE hbnb_http_request_duration_seconds histogram'
+        for route in routes:
+            with route.lock:
+                yield from route.latency.lines('hbnb_http_request_duration_seconds', route.labels)
+
+        yield '# HELP hbnb_http_request_db_seconds Time spent running SQL statements per request, by route'
+        yield '# TYPE hbnb_http_request_db_seconds histogram'
+        for route in routes:
+            with route.lock:
+                yield from route.db_time.lines('hbnb_http_request_db_seconds', route.labels)
+
+        yield '# HELP hbnb_http_requests_in_flight Requests being handled, by route'
+        yield '# TYPE hbnb_http_requests_in_flight gauge'
+        for route in routes:
+            yield f'hbnb_http_requests_in_flight{_labels(**route.labels)} {route.in_flight}'
+
+        yield '# HELP hbnb_http_responses_total Responses sent, by route and status code'
+        yield '# TYPE hbnb_http_responses_total counter'
+        for route in routes:
+            with route.lock:
+                statuses = sorted(route.statuses.items())
+            for status, count in statuses:
+                yield f'hbnb_http_responses_total{_labels(**route.labels, status=status)} {count}'
+
+        yield '# HELP hbnb_db_pool_checkout_seconds Time waited for a pooled database connection'
+        yield '# TYPE hbnb_db_pool_checkout_seconds histogram'
+        with self._checkout_lock:
+            yield from self.checkout_wait.lines('hbnb_db_pool_checkout_seconds', {})
+        yield from self._pool_lines()
+        yield from self._password_lines()
+        yield from self._cache_lines()
+
+    def _pool_lines(self):
+        from app import db
+        yield '# HELP hbnb_db_pool_checked_out Connections currently checked out of the pool'
+        yield '# TYPE hbnb_db_pool_checked_out gauge'
+        for bind, engine in db.engines.items():
+            checkedout = getattr(engine.pool, 'checkedout', None)
+            if checkedout is not None:
+                yield f'hbnb_db_pool_checked_out{_labels(bind=bind or "default")} {checkedout()}'
+
+    def _password_lines(self):
+        from app import passwords
+        yield '# HELP hbnb_password_hash_pending Password hashes queued or running in the pool'
+        yield '# TYPE hbnb_password_hash_pending gauge'
+        yield f'hbnb_password_hash_pending {passwords.pending}'
+        yield '# HELP hbnb_password_hash_max_pending Pending hashes above which signups get a 503'
+        yield '# TYPE hbnb_password_hash_max_pending gauge'
+        yield f'hbnb_password_hash_max_pending {passwords.max_pending}'
+
+    def _cache_lines(self):
+        from app.services import facade
+        stats = facade.cache.stats()
+        for name, key, kind, help_text in (
+            ('hbnb_cache_hits_total', 'hits', 'counter', 'Entity cache lookups served from the cache'),
+            ('hbnb_cache_misses_total', 'misses', 'counter', 'Entity cache lookups that went to the database'),
+            ('hbnb_cache_evictions_total', 'evictions', 'counter', 'Entries dropped to make room'),
+            ('hbnb_cache_entries', 'size', 'gauge', 'Entries in the entity cache'),
+            ('hbnb_cache_hit_ratio', 'hit_ratio', 'gauge', 'Share of lookups served from the cache'),
+        ):
+            yield f'# HELP {name} {help_text}'
+            yield f'# TYPE {name} {kind}'
+            for cache, values in sorted(stats.items()):
+                yield f'{name}{_labels(kind=cache)} {_number(values[key])}'
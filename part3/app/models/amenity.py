@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
 from app.models.baseclass import BaseModel
+from app.models.ordered_set import OrderedSet
 from sqlalchemy.orm import relationship
 from app import db
 
@@ -11,7 +12,8 @@ class Amenity(BaseModel):
     _name = db.Column('name', db.String(50), nullable=False)
 
     # Relationship to Place (many-to-many)
-    places_r = relationship("Place", secondary="place_amenity", back_populates="amenities_r")
+    places_r = relationship("Place", secondary="place_amenity", back_populates="amenities_r",
+                            collection_class=OrderedSet)
 
     def __init__(self, name):
         super().__init__()
@@ -40,7 +42,7 @@ class Amenity(BaseModel):
     """
     def save(self):
         """Function to save created_at time"""
-        self.updated_at = datetime.now()
+        self.updated_at = datetime.utcnow()
 
     """
     UPDATE
@@ -2,10 +2,22 @@
 from app import db
 import uuid
 from datetime import datetime
+from sqlalchemy.orm import declared_attr
 
 class BaseModel(db.Model):
     __abstract__ = True  # This ensures SQLAlchemy does not create a table for BaseModel
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Assign the id up front so it is known before the row is flushed
+        if self.id is None:
+            self.id = str(uuid.uuid4())
+
+    @declared_attr
+    def __table_args__(cls):
+        # Keyset pagination seeks on (created_at, id), see SQLAlchemyRepository.get_page
+        return (db.Index(f'ix_{cls.__tablename__}_created_at_id', 'created_at', 'id'),)
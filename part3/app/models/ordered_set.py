@@ -0,0 +1,58 @@
+from sqlalchemy.orm.collections import collection
+
+
+class OrderedSet:
+    """Relationship collection with O(1) membership, append and removal.
+
+    Used as collection_class of the one-to-many and many-to-many
+    relationships instead of a list, whose `in` and remove() scan every
+    item. Items keep their insertion order and are held once each, keyed
+    by identity: the session's identity map gives every row a single
+    object, and the key holds before the object has an id.
+    """
+
+    def __init__(self, items=()):
+        self._items = {}
+        for item in items:
+            self.append(item)
+
+    @collection.appender
+    def append(self, item):
+        self._items[id(item)] = item
+
+    @collection.remover
+    def remove(self, item):
+        """Remove item, ValueError when it is not in the collection (as list.remove)"""
+        if self._items.get(id(item)) is not item:
+            raise ValueError(f"{item!r} not in collection")
+        del self._items[id(item)]
+
+    def discard(self, item):
+        if item in self:
+            self.remove(item)
+
+    @collection.iterator
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __contains__(self, item):
+        return self._items.get(id(item)) is item
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        """Item(s) by position, O(n) apart from the first and last item"""
+        if index == 0 and self._items:
+            return next(iter(self._items.values()))
+        if index == -1 and self._items:
+            return next(reversed(self._items.values()))
+        return list(self._items.values())[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (OrderedSet, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"OrderedSet({list(self._items.values())!r})"
@@ -1,13 +1,17 @@
 import uuid
 from datetime import datetime
 from app.models.baseclass import BaseModel
-from sqlalchemy import Column, String, Float, Text, ForeignKey, Table
+from app.models.ordered_set import OrderedSet
+from sqlalchemy import Column, String, Float, Text, ForeignKey, Table, Index, cast, event, func, literal_column
 from sqlalchemy.orm import relationship
 from app import db
+from app.persistence import geo, search
 
 place_amenity = Table('place_amenity', db.metadata,
     Column('place_id', String(60), ForeignKey('places.id'), primary_key=True),
-    Column('amenity_id', String(60), ForeignKey('amenities.id'), primary_key=True)
+    Column('amenity_id', String(60), ForeignKey('amenities.id'), primary_key=True),
+    # The primary key only serves lookups by place_id, this one serves amenity_id
+    Index('ix_place_amenity_amenity_id', 'amenity_id')
 )
 
 def to_dict(self):
@@ -30,12 +34,24 @@ class Place(BaseModel):
     _price = db.Column('price', db.Float(), nullable=False)
     _latitude = db.Column('latitude', db.Float(), nullable=False)
     _longitude = db.Column('longitude', db.Float(), nullable=False)
-    _owner_id = db.Column('owner_id', db.String(60), db.ForeignKey('users.id'), nullable=False)
+    # Derived from latitude/longitude by their setters, indexed for the location search
+    _geohash = db.Column('geohash', db.String(geo.PRECISION), index=True)
+    _owner_id = db.Column('owner_id', db.String(60), db.ForeignKey('users.id'), nullable=False, index=True)
+
+    # Review aggregates, kept up to date by the Review mapper events (see review.py)
+    _review_count = db.Column('review_count', db.Integer(), nullable=False, default=0, server_default='0')
+    _rating_sum = db.Column('rating_sum', db.Integer(), nullable=False, default=0, server_default='0')
+    _rating_1 = db.Column('rating_1', db.Integer(), nullable=False, default=0, server_default='0')
+    _rating_2 = db.Column('rating_2', db.Integer(), nullable=False, default=0, server_default='0')
+    _rating_3 = db.Column('rating_3', db.Integer(), nullable=False, default=0, server_default='0')
+    _rating_4 = db.Column('rating_4', db.Integer(), nullable=False, default=0, server_default='0')
+    _rating_5 = db.Column('rating_5', db.Integer(), nullable=False, default=0, server_default='0')
 
     # Relationships
     owner_r = relationship("User", back_populates="places_r")
-    reviews_r = relationship("Review", back_populates="place_r")
-    amenities_r = relationship("Amenity", secondary=place_amenity, back_populates="places_r")
+    reviews_r = relationship("Review", back_populates="place_r", collection_class=OrderedSet)
+    amenities_r = relationship("Amenity", secondary=place_amenity, back_populates="places_r",
+                               collection_class=OrderedSet)
 
     def __init__(self, title, description, price, latitude, longitude, owner_id):
         super().__init__()
@@ -104,6 +120,7 @@ class Place(BaseModel):
         if not -90 <= value <= 90:
             raise ValueError("Latitude must be between -90 to 90 degrees")
         self._latitude = float(value)
+        self._update_geohash()
 
     """
     LONGITUDE
@@ -119,6 +136,19 @@ class Place(BaseModel):
         if not -180 <= value <= 180:
             raise ValueError("Longitude must be between -180 to 180 degrees")
         self._longitude = float(value)
+        self._update_geohash()
+
+    """
+    GEOHASH
+    """
+    @property
+    def geohash(self):
+        return self._geohash
+
+    def _update_geohash(self):
+        """Keep the geohash in step with the coordinates once both are set"""
+        if self._latitude is not None and self._longitude is not None:
+            self._geohash = geo.encode(self._latitude, self._longitude)
 
     """
     OWNER ID
@@ -133,12 +163,36 @@ class Place(BaseModel):
             raise ValueError("Owner ID cannot be empty")
         self._owner_id = str(value)
 
+    """
+    REVIEW AGGREGATES
+    """
+    # Derived from the reviews, never taken from an update payload
+    AGGREGATES = ('review_count', 'rating_sum', 'average_rating', 'rating_histogram')
+
+    @property
+    def review_count(self):
+        return self._review_count or 0
+
+    @property
+    def rating_sum(self):
+        return self._rating_sum or 0
+
+    @property
+    def average_rating(self):
+        """Mean rating, None while the place has no review"""
+        return self.rating_sum / self.review_count if self.review_count else None
+
+    @property
+    def rating_histogram(self):
+        """Number of reviews per rating, keyed '1' to '5'"""
+        return {str(rating): getattr(self, f'_rating_{rating}') or 0 for rating in range(1, 6)}
+
     """
     SAVE
     """
     def save(self):
         """Function to save created_at time"""
-        self.updated_at = datetime.now()
+        self.updated_at = datetime.utcnow()
 
     """
     UPDATE
@@ -146,7 +200,7 @@ class Place(BaseModel):
     def update(self, data):
         """Function to save updated_at time"""
         for key, value in data.items():
-            if hasattr(self, key):
+            if hasattr(self, key) and key not in self.AGGREGATES:
                 setattr(self, key, value)
         self.save()
 
@@ -154,7 +208,7 @@ class Place(BaseModel):
     ADD REVIEW
     """
     def add_review(self, review):
-        """Add a review to this place"""
+        """Add a review to this place, the membership check is O(1)"""
         if review not in self.reviews_r:
             self.reviews_r.append(review)
 
@@ -162,7 +216,7 @@ class Place(BaseModel):
     ADD AMENITY
     """
     def add_amenity(self, amenity):
-        """Add an amenity to this place"""
+        """Add an amenity to this place, the membership check is O(1)"""
         if amenity not in self.amenities_r:
             self.amenities_r.append(amenity)
 
@@ -175,6 +229,25 @@ class Place(BaseModel):
             "latitude": self.latitude,
             "longitude": self.longitude,
             "owner_id": self.owner_id,
+            "review_count": self.review_count,
+            "average_rating": self.average_rating,
+            "rating_histogram": self.rating_histogram,
             "amenities": [amenity.to_dict() for amenity in self.amenities_r],
             "reviews": [review.to_dict() for review in self.reviews_r]  # optional
         }
+
+
+# Mean rating in SQL, 0 without reviews. Constants are inlined rather than
+# bound so that queries render the exact expression of the index below,
+# which SQLite needs to read the sort and min_rating range from the index.
+average_rating = func.coalesce(
+    cast(Place._rating_sum, Float) / func.nullif(Place._review_count, literal_column('0')),
+    literal_column('0')
+)
+Index('ix_places_average_rating', average_rating, Place.id)
+# Price filters, and the price sort with its id tie-breaker
+Index('ix_places_price', Place._price, Place.id)
+
+# The full-text index is not part of the metadata, create and drop it along with the table
+event.listen(Place.__table__, 'after_create', lambda table, connection, **kw: search.install(connection))
+event.listen(Place.__table__, 'before_drop', lambda table, connection, **kw: search.uninstall(connection))
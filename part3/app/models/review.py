@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Integer, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, ForeignKey, event, func, inspect, or_, select
+from sqlalchemy.orm import relationship, validates
 from app.models.baseclass import BaseModel
+from app.models.place import Place
 
 
 class Review(BaseModel):
@@ -9,13 +10,20 @@ class Review(BaseModel):
     text = Column(String(1024), nullable=False)
     rating = Column(Integer, nullable=False)
 
-    place_id = Column(String(60), ForeignKey('places.id'), nullable=False)
-    user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
+    place_id = Column(String(60), ForeignKey('places.id'), nullable=False, index=True)
+    user_id = Column(String(60), ForeignKey('users.id'), nullable=False, index=True)
 
     # Relationships
     place_r = relationship("Place", back_populates="reviews_r")
     user_r = relationship("User", back_populates="reviews_r")
 
+    @validates('rating')
+    def validate_rating(self, key, value):
+        """The place aggregates keep one counter per rating, so only 1 to 5 is accepted"""
+        if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= 5:
+            raise ValueError("Rating must be an integer between 1 and 5")
+        return value
+
     def update(self, data):
         for key, value in data.items():
             setattr(self, key, value)
@@ -29,3 +37,67 @@ class Review(BaseModel):
         "place_id": self.place_id
     }
 
+
+"""
+PLACE REVIEW AGGREGATES
+"""
+def _count_rating(connection, place_id, rating, delta):
+    """Add (delta=1) or remove (delta=-1) one rating from a place's aggregates.
+
+    Issued as SET column = column + delta on the flush connection, so it is
+    part of the same transaction as the review change and concurrent
+    writers cannot lose each other's updates.
+    """
+    places = Place.__table__
+    bucket = places.c[f'rating_{rating}']
+    connection.execute(places.update().where(places.c.id == place_id).values({
+        places.c.review_count: places.c.review_count + delta,
+        places.c.rating_sum: places.c.rating_sum + delta * rating,
+        bucket: bucket + delta,
+    }))
+
+
+@event.listens_for(Review, 'after_insert')
+def _review_inserted(mapper, connection, review):
+    _count_rating(connection, review.place_id, review.rating, 1)
+
+
+@event.listens_for(Review, 'before_delete')
+def _review_deleted(mapper, connection, review):
+    # before rather than after: an expired review can still load its rating
+    _count_rating(connection, review.place_id, review.rating, -1)
+
+
+@event.listens_for(Review, 'after_update')
+def _review_updated(mapper, connection, review):
+    state = inspect(review)
+    rating, place_id = state.attrs.rating.history, state.attrs.place_id.history
+    if not rating.deleted and not place_id.deleted:
+        return
+    old_rating = rating.deleted[0] if rating.deleted else review.rating
+    old_place_id = place_id.deleted[0] if place_id.deleted else review.place_id
+    _count_rating(connection, old_place_id, old_rating, -1)
+    _count_rating(connection, review.place_id, review.rating, 1)
+
+
+def recompute_place_review_stats(connection):
+    """Recompute every place's aggregates from its reviews.
+
+    Only places whose stored values are wrong are written, returns how many
+    were repaired.
+    """
+    places, reviews = Place.__table__, Review.__table__
+
+    def aggregate(expression, *criteria):
+        return (select(expression)
+                .where(reviews.c.place_id == places.c.id, *criteria)
+                .scalar_subquery())
+
+    values = {
+        places.c.review_count: aggregate(func.count()),
+        places.c.rating_sum: aggregate(func.coalesce(func.sum(reviews.c.rating), 0)),
+    }
+    for rating in range(1, 6):
+        values[places.c[f'rating_{rating}']] = aggregate(func.count(), reviews.c.rating == rating)
+    stale = or_(*[column != value for column, value in values.items()])
+    return connection.execute(places.update().where(stale).values(values)).rowcount
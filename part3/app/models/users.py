@@ -2,8 +2,9 @@ import uuid
 from datetime import datetime
 import re
 from app.models.baseclass import BaseModel
+from app.models.ordered_set import OrderedSet
 from sqlalchemy.orm import relationship
-from app import bcrypt, db
+from app import db, passwords
 
 class User(BaseModel):
     __tablename__ = 'users'
@@ -15,16 +16,18 @@ class User(BaseModel):
     _is_admin = db.Column('is_admin', db.Boolean, default=False)
 
     # Relationships
-    places_r = relationship("Place", back_populates="owner_r", cascade="all, delete-orphan")
-    reviews_r = relationship("Review", back_populates="user_r", cascade="all, delete-orphan")
+    places_r = relationship("Place", back_populates="owner_r", cascade="all, delete-orphan",
+                            collection_class=OrderedSet)
+    reviews_r = relationship("Review", back_populates="user_r", cascade="all, delete-orphan",
+                             collection_class=OrderedSet)
 
     def hash_password(self, password):
         """Hash the password before storing it."""
-        self._password = bcrypt.generate_password_hash(password).decode('utf-8')
+        self._password = passwords.hash(password)
 
     def verify_password(self, password):
         """Verify the hashed password."""
-        return bcrypt.check_password_hash(self._password, password)
+        return passwords.verify(self._password, password)
 
     def __init__(self, first_name, last_name, email, is_admin=False):
         super().__init__()
@@ -120,7 +123,7 @@ class User(BaseModel):
     """
     def save(self):
         """Function to save created_at time"""
-        self.updated_at = datetime.now()
+        self.updated_at = datetime.utcnow()
 
     """
     UPDATE
@@ -130,6 +133,6 @@ class User(BaseModel):
         for key, value in data.items():
             if hasattr(self, key):
                 setattr(self, key, value)
-        self.updated_at = datetime.now()
+        self.updated_at = datetime.utcnow()
         
 
@@ -0,0 +1,119 @@
+"""
+Password hashing off the request threads.
+
+bcrypt is deliberately slow (~250ms at cost 12) and holds the CPU the whole
+time, so hashing inline stalls every other request served by the same
+worker. PasswordHasher runs hashpw/checkpw in a process pool instead: the
+request thread only waits on a future, and once too many hashes are queued
+new ones are refused with PasswordHasherBusy (the API answers 503) rather
+than piling up behind each other.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+import bcrypt
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the pool queue is full or a hash did not finish in time"""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(pw_hash, password):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), pw_hash.encode('utf-8'))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+class PasswordHasher:
+    """Flask extension hashing and checking bcrypt passwords in a process pool.
+
+    Settings read by init_app:
+        BCRYPT_LOG_ROUNDS           cost factor of new hashes
+        PASSWORD_HASH_WORKERS       pool size, 0 hashes inline in the caller
+        PASSWORD_HASH_MAX_PENDING   hashes queued or running before refusing more
+        PASSWORD_HASH_TIMEOUT       seconds a request waits for its hash
+    """
+
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.workers = os.cpu_count() or 1
+        self.max_pending = 4 * self.workers
+        self.timeout = 10
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.configure(
+            rounds=app.config.get('BCRYPT_LOG_ROUNDS', 12),
+            workers=app.config.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1),
+            max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING'),
+            timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10),
+        )
+
+    def configure(self, rounds=12, workers=1, max_pending=None, timeout=10):
+        """Apply new settings, the current pool (if any) is shut down and restarted lazily"""
+        self.shutdown()
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending if max_pending is not None else 4 * max(workers, 1)
+        self.timeout = timeout
+
+    @property
+    def pending(self):
+        """Number of hashes queued or running in the pool"""
+        return self._pending
+
+    def hash(self, password):
+        """bcrypt hash of password, as text"""
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, pw_hash, password):
+        """True when password matches pw_hash"""
+        return self._run(_verify, pw_hash, password)
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a threaded server can copy locks held by other threads
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _release(self, _future=None):
+        with self._pending_lock:
+            self._pending -= 1
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusy("Too many password hashes in progress")
+            self._pending += 1
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy("Password hashing timed out")
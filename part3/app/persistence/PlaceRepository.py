@@ -0,0 +1,136 @@
+from sqlalchemy import and_, func, or_, select
+from app import db
+from app.models.place import Place, average_rating, place_amenity
+from app.models.review import recompute_place_review_stats
+from app.persistence import geo, search
+from app.persistence.repository import SQLAlchemyRepository, SortOrder
+
+# First radius tried by a k-nearest search, multiplied by 4 until k places are found
+KNN_START_RADIUS_KM = 2.0
+# Half the circumference of the earth, every place is within this distance
+KNN_MAX_RADIUS_KM = 20016.0
+
+
+def rating_key(place):
+    """average_rating of a place or projected row as the SQL expression computes it, 0 when unrated"""
+    return place.rating_sum / place.review_count if place.review_count else 0
+
+
+# Sort orders of the place listing, a leading - sorts in descending order
+SORTS = {
+    'created_at': SortOrder.by(Place, 'created_at'),
+    '-created_at': SortOrder.by(Place, 'created_at', descending=True),
+    'price': SortOrder('price', Place._price, lambda place: place.price, False, ('price',)),
+    '-price': SortOrder('-price', Place._price, lambda place: place.price, True, ('price',)),
+    'rating': SortOrder('rating', average_rating, lambda place: rating_key(place), False,
+                        ('rating_sum', 'review_count')),
+    '-rating': SortOrder('-rating', average_rating, lambda place: rating_key(place), True,
+                         ('rating_sum', 'review_count')),
+}
+
+
+class PlaceRepository(SQLAlchemyRepository):
+    def __init__(self):
+        super().__init__(Place)
+
+    def listing_criteria(self, min_price=None, max_price=None, amenity_ids=(), owner_id=None, min_rating=None):
+        """SQL criteria of the place listing filters, each one served by an index"""
+        criteria = []
+        if min_price is not None:
+            criteria.append(Place._price >= min_price)
+        if max_price is not None:
+            criteria.append(Place._price <= max_price)
+        if owner_id is not None:
+            criteria.append(Place._owner_id == owner_id)
+        if min_rating is not None:
+            criteria.append(average_rating >= min_rating)
+        amenity_ids = set(amenity_ids)
+        if amenity_ids:
+            # Places linked to all of them: one GROUP BY over the amenity_id index
+            criteria.append(Place.id.in_(
+                select(place_amenity.c.place_id)
+                .where(place_amenity.c.amenity_id.in_(amenity_ids))
+                .group_by(place_amenity.c.place_id)
+                .having(func.count() == len(amenity_ids))
+            ))
+        return criteria
+
+    def _locations(self, boxes):
+        """(id, latitude, longitude) rows of the places inside boxes.
+
+        The geohash cells covering the boxes are read as index range scans,
+        the exact box test then drops the places of those cells that fall
+        outside.
+        """
+        table = self.model.__table__
+        query = self._query(columns=('id', 'latitude', 'longitude'))
+        prefixes = geo.covering_prefixes(boxes)
+        if prefixes:
+            ranges = []
+            for prefix in prefixes:
+                end = geo.prefix_end(prefix)
+                ranges.append(and_(table.c.geohash >= prefix, table.c.geohash < end)
+                              if end else table.c.geohash >= prefix)
+            query = query.filter(or_(*ranges))
+        return [row for row in query if geo.in_boxes(row.latitude, row.longitude, boxes)]
+
+    def _load_ranked(self, ranked, load=None):
+        """Load the places of the (id, distance) pairs, returns (place, distance) pairs in the same order"""
+        if not ranked:
+            return []
+        places = {place.id: place for place in
+                  self._query(load).filter(self.model.id.in_([place_id for place_id, _ in ranked]))}
+        return [(places[place_id], distance) for place_id, distance in ranked if place_id in places]
+
+    def find_near(self, latitude, longitude, k, radius_km=None, load=None):
+        """The k places nearest to a point, optionally within radius_km, as (place, distance_km) pairs.
+
+        Without a radius the search starts small and widens until k places
+        are found, so it only reads the neighbourhood of the point.
+        """
+        radius = radius_km or KNN_START_RADIUS_KM
+        while True:
+            ranked = []
+            for row in self._locations(geo.radius_bbox(latitude, longitude, radius)):
+                distance = geo.haversine_km(latitude, longitude, row.latitude, row.longitude)
+                if distance <= radius:
+                    ranked.append((row.id, distance))
+            if radius_km or len(ranked) >= k or radius >= KNN_MAX_RADIUS_KM:
+                break
+            radius = min(radius * 4, KNN_MAX_RADIUS_KM)
+        ranked.sort(key=lambda pair: pair[1])
+        return self._load_ranked(ranked[:k], load)
+
+    def find_in_bbox(self, boxes, latitude, longitude, k, radius_km=None, load=None):
+        """The k places inside boxes nearest to a point, optionally within radius_km, as (place, distance_km) pairs"""
+        ranked = []
+        for row in self._locations(boxes):
+            distance = geo.haversine_km(latitude, longitude, row.latitude, row.longitude)
+            if radius_km is None or distance <= radius_km:
+                ranked.append((row.id, distance))
+        ranked.sort(key=lambda pair: pair[1])
+        return self._load_ranked(ranked[:k], load)
+
+    def search_text(self, terms, k, load=None):
+        """The k places best matching every term, as (place, score, snippet) triples.
+
+        Ranked by BM25 (higher score is better) on SQLite. Other databases
+        get unranked LIKE matching, with no score or snippet.
+        """
+        if search.is_supported(db.session.connection()):
+            rows = db.session.execute(search.SEARCH, {'query': search.match_expression(terms), 'limit': k}).all()
+            ranked = [(row.id, (-row.rank, row.snippet)) for row in rows]
+        else:
+            table = self.model.__table__
+            patterns = [f"%{term.rstrip('*')}%" for term in terms]
+            query = self._query(columns=('id',)).filter(and_(*[
+                or_(table.c.title.like(pattern), table.c.description.like(pattern)) for pattern in patterns
+            ]))
+            ranked = [(row.id, (None, None)) for row in query.order_by(table.c.title).limit(k)]
+        return [(place, score, snippet) for place, (score, snippet) in self._load_ranked(ranked, load)]
+
+    def repair_review_stats(self):
+        """Recompute the review aggregates of every place, returns how many were wrong"""
+        repaired = recompute_place_review_stats(db.session.connection())
+        db.session.commit()
+        return repaired
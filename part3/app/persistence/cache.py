@@ -0,0 +1,133 @@
+"""
+Read-through entity cache used by the facade.
+
+Only column values are cached, never live ORM instances: an instance belongs
+to the session of the request that loaded it. On a hit the values are turned
+back into an instance attached to the current session without a query, and
+relationships are still lazy loaded from the database, so they cannot go
+stale in the cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with a size limit, a time to live and hit/miss counters"""
+
+    def __init__(self, max_size=1024, ttl=300, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def snapshot(obj):
+    """Column values of a persistent object, keyed by mapped attribute name"""
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+def restore(model, values):
+    """Rebuild an instance from a snapshot and attach it to the current session, no SELECT"""
+    obj = model.__mapper__.class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(obj, key, value)
+    make_transient_to_detached(obj)
+    return db.session.merge(obj, load=False)
+
+
+class EntityCache:
+    """One LRUCache per entity kind, kinds without settings are not cached.
+
+    settings maps a kind ('user', 'place', ...) to LRUCache keyword arguments,
+    e.g. {'amenity': {'max_size': 1024, 'ttl': 3600}}.
+    """
+
+    def __init__(self, settings=None):
+        self.configure(settings)
+
+    def configure(self, settings):
+        """Replace the per-kind caches, which also drops every cached entry"""
+        self._caches = {kind: LRUCache(**options) for kind, options in (settings or {}).items()}
+
+    def get(self, kind, repo, obj_id):
+        """Return the object from the cache or load it through repo and cache it"""
+        cache = self._caches.get(kind)
+        if cache is None:
+            return repo.get(obj_id)
+        identity = db.session.identity_map.get(repo.model.__mapper__.identity_key_from_primary_key([obj_id]))
+        if identity is not None:
+            # Already loaded by this request, the session copy is the freshest
+            return identity
+        values = cache.get(obj_id)
+        if values is not None:
+            return restore(repo.model, values)
+        obj = repo.get(obj_id)
+        if obj is not None:
+            cache.set(obj_id, snapshot(obj))
+        return obj
+
+    def invalidate(self, kind, *obj_ids):
+        cache = self._caches.get(kind)
+        if cache is not None:
+            for obj_id in obj_ids:
+                cache.invalidate(obj_id)
+
+    def clear(self):
+        for cache in self._caches.values():
+            cache.clear()
+
+    def stats(self):
+        return {kind: cache.stats() for kind, cache in self._caches.items()}
@@ -0,0 +1,117 @@
+"""
+Geohash helpers for the place location search.
+
+A geohash interleaves the bits of longitude and latitude into a base32
+string, so every prefix names a rectangular cell and the places inside a
+cell have consecutive geohash values. A bounding box is covered by a few
+cells and each cell becomes one index range scan (see prefix_end), so a
+search reads the places near the target instead of the whole table.
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 12
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    """Geohash of a point"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = ch = 0
+    even = True
+    while len(chars) < precision:
+        interval, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (interval[0] + interval[1]) / 2
+        ch <<= 1
+        if value >= mid:
+            ch |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[ch])
+            bits = ch = 0
+    return ''.join(chars)
+
+
+def prefix_end(prefix):
+    """Bound such that prefix <= geohash < bound selects the geohashes starting with prefix.
+
+    The bound is the next prefix in base32 order, None when there is none
+    ('zz...'). Digits and lowercase letters keep that order under any
+    collation, unlike a sentinel character appended to the prefix.
+    """
+    while prefix and prefix[-1] == BASE32[-1]:
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + BASE32[BASE32.index(prefix[-1]) + 1]
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a cell of the given precision"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(latitude, longitude, radius_km):
+    """Bounding boxes (min_lat, min_lng, max_lat, max_lng) enclosing a circle.
+
+    A circle crossing the antimeridian gives two boxes, one touching a pole
+    spans every longitude.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    if min_lat == -90.0 or max_lat == 90.0:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    dlng = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude)))))
+    return split_antimeridian(min_lat, longitude - dlng, max_lat, longitude + dlng)
+
+
+def split_antimeridian(min_lat, min_lng, max_lat, max_lng):
+    """Boxes covering the longitude span min_lng..max_lng, wrapped into -180..180"""
+    if max_lng - min_lng >= 360:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    min_lng = (min_lng + 180) % 360 - 180
+    max_lng = (max_lng + 180) % 360 - 180
+    if min_lng <= max_lng:
+        return [(min_lat, min_lng, max_lat, max_lng)]
+    return [(min_lat, min_lng, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lng)]
+
+
+def covering_prefixes(boxes, max_cells=16):
+    """Geohash prefixes of the finest cells covering boxes, using at most max_cells.
+
+    An empty list means no precision is coarse enough and the whole table
+    has to be read.
+    """
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        cells = set()
+        for min_lat, min_lng, max_lat, max_lng in boxes:
+            rows = range(int((min_lat + 90) // height), int(min((max_lat + 90) // height, 180 / height - 1)) + 1)
+            cols = range(int((min_lng + 180) // width), int(min((max_lng + 180) // width, 360 / width - 1)) + 1)
+            if len(cells) + len(rows) * len(cols) > max_cells:
+                break
+            cells.update(encode(-90 + (row + 0.5) * height, -180 + (col + 0.5) * width, precision)
+                         for row in rows for col in cols)
+        else:
+            return sorted(cells)
+    return []
+
+
+def in_boxes(latitude, longitude, boxes):
+    return any(min_lat <= latitude <= max_lat and min_lng <= longitude <= max_lng
+               for min_lat, min_lng, max_lat, max_lng in boxes)
@@ -0,0 +1,167 @@
+"""
+Versioned schema migrations.
+
+db.create_all() only creates tables that are missing, it never changes an
+existing one, so anything added to the models afterwards (such as an index)
+is described here as well. Migrations run once each, in version order, and
+the last applied version is kept in the schema_version table.
+"""
+from sqlalchemy import Column, Index, Integer, MetaData, Table, bindparam, inspect, select, text
+from sqlalchemy.schema import CreateColumn, CreateIndex, DropIndex
+from app import db
+from app.models.review import recompute_place_review_stats
+from app.persistence import geo, search
+# Register every model table on db.metadata
+from app.models import amenity, place, review, users  # noqa: F401
+
+version_metadata = MetaData()
+schema_version = Table('schema_version', version_metadata,
+    Column('version', Integer, nullable=False)
+)
+
+
+def declared_index(name):
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    raise ValueError(f"Index {name} is not declared on any model")
+
+
+def add_indexes(*names):
+    """Migration step creating indexes declared on the models, skipping existing ones"""
+    def migrate(connection):
+        for name in names:
+            index = declared_index(name)
+            if connection.dialect.name in ('sqlite', 'postgresql'):
+                # checkfirst reflects the indexes, which misses expression indexes
+                connection.execute(CreateIndex(index, if_not_exists=True))
+            else:
+                index.create(connection, checkfirst=True)
+    return migrate
+
+
+def drop_indexes(*names):
+    """Migration step dropping indexes by name, skipping missing ones"""
+    def migrate(connection):
+        if connection.dialect.name in ('sqlite', 'postgresql'):
+            for name in names:
+                connection.execute(DropIndex(Index(name), if_exists=True))
+            return
+        # No DROP INDEX IF EXISTS, e.g. MySQL, whose DROP INDEX also needs the table
+        inspector = inspect(connection)
+        for table_name in inspector.get_table_names():
+            for reflected in inspector.get_indexes(table_name):
+                if reflected['name'] in names:
+                    index = Index(reflected['name'])
+                    Table(table_name, MetaData(), index)
+                    index.drop(connection)
+    return migrate
+
+
+def add_columns(table_name, *names):
+    """Migration step adding columns declared on a model to its existing table"""
+    def migrate(connection):
+        table = db.metadata.tables[table_name]
+        existing = {column['name'] for column in inspect(connection).get_columns(table_name)}
+        for name in names:
+            if name not in existing:
+                ddl = CreateColumn(table.c[name]).compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
+    return migrate
+
+
+def steps(*migrations):
+    """Run several migration steps as one migration"""
+    def migrate(connection):
+        for step in migrations:
+            step(connection)
+    return migrate
+
+
+def backfill_geohash(connection, batch_size=1000):
+    """Compute the geohash of places stored before the column existed"""
+    places = db.metadata.tables['places']
+    rows = connection.execute(
+        select(places.c.id, places.c.latitude, places.c.longitude).where(places.c.geohash.is_(None))
+    ).all()
+    statement = places.update().where(places.c.id == bindparam('place_id')).values(geohash=bindparam('hash'))
+    for start in range(0, len(rows), batch_size):
+        connection.execute(statement, [
+            {'place_id': row.id, 'hash': geo.encode(row.latitude, row.longitude)}
+            for row in rows[start:start + batch_size]
+        ])
+
+
+# Foreign keys used by lookups and cascade deletes, price filters and the
+# (created_at, id) keyset pagination order
+HOT_PATH_INDEXES = (
+    'ix_reviews_place_id',
+    'ix_reviews_user_id',
+    'ix_places_owner_id',
+    'ix_places_price',
+    'ix_place_amenity_amenity_id',
+    'ix_users_created_at_id',
+    'ix_places_created_at_id',
+    'ix_reviews_created_at_id',
+    'ix_amenities_created_at_id',
+)
+
+# Same columns as ix_places_owner_id and co, created by the tables_sqlite.sql of
+# before the indexes were declared on the models. Kept alongside, every write
+# would update each index twice.
+LEGACY_INDEXES = (
+    'idx_places_owner_id',
+    'idx_reviews_place_id',
+    'idx_reviews_user_id',
+    'idx_place_amenity_amenity_id',
+)
+
+MIGRATIONS = [
+    (1, "Index foreign keys, places.price and the (created_at, id) pagination keys",
+     steps(drop_indexes(*LEGACY_INDEXES), add_indexes(*HOT_PATH_INDEXES))),
+    (2, "Add places.geohash for the location search",
+     steps(add_columns('places', 'geohash'), backfill_geohash, add_indexes('ix_places_geohash'))),
+    (3, "Add the places_fts full-text index (SQLite only)",
+     steps(search.install, search.rebuild)),
+    (4, "Add review count, rating sum and rating histogram to places",
+     steps(add_columns('places', 'review_count', 'rating_sum',
+                       'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5'),
+           recompute_place_review_stats)),
+    (5, "Index the average rating for the place listing sort and min_rating filter",
+     add_indexes('ix_places_average_rating')),
+    (6, "Drop the idx_* indexes duplicating ix_* ones, for databases migrated before 1 dropped them",
+     drop_indexes(*LEGACY_INDEXES)),
+    (7, "Add the id tie-breaker to ix_places_price for the price sort",
+     steps(drop_indexes('ix_places_price'), add_indexes('ix_places_price'))),
+]
+
+
+def current_version(connection):
+    """Return the last applied migration version, 0 for an unversioned database"""
+    if not inspect(connection).has_table('schema_version'):
+        return 0
+    version = connection.execute(select(schema_version.c.version)).scalar()
+    return version or 0
+
+
+def upgrade(engine):
+    """Apply every pending migration, each one in its own transaction.
+
+    Returns the list of versions that were applied. Existing rows are never
+    touched, so this is safe to run against a populated database.
+    """
+    with engine.begin() as connection:
+        version_metadata.create_all(connection)
+        version = current_version(connection)
+
+    applied = []
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as connection:
+            migrate(connection)
+            connection.execute(schema_version.delete())
+            connection.execute(schema_version.insert().values(version=number))
+        applied.append(number)
+    return applied
@@ -1,7 +1,11 @@
+import base64
+import json
 from abc import ABC, abstractmethod
+from collections import namedtuple
+from datetime import datetime
 from app import db
-from sqlalchemy.orm import joinedload
-from app.models.place import Place
+from sqlalchemy import DateTime, and_, func, or_
+from sqlalchemy.orm import raiseload, selectinload
 
 
 class Repository(ABC):
@@ -29,6 +33,48 @@ class Repository(ABC):
     def get_by_attribute(self, attr_name, attr_value):
         pass
 
+"""
+CURSOR
+"""
+class SortOrder(namedtuple('SortOrder', 'name column value descending columns')):
+    """Order of a keyset paginated query, ties are broken by id in the same direction.
+
+    column is the SQL expression sorted on and value(obj) reads the same
+    value back from a loaded object or a projected row, to build the cursor
+    of a page. columns are the table columns value() reads, a projection
+    must include them.
+    """
+
+    @classmethod
+    def by(cls, model, name, descending=False):
+        """Order on a plain column of model"""
+        return cls(('-' if descending else '') + name, getattr(model, name),
+                   lambda obj: getattr(obj, name), descending, (name,))
+
+
+def encode_cursor(obj, order):
+    """Build an opaque pagination cursor from an object's sort value and id"""
+    value = order.value(obj)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([order.name, value, obj.id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor, order):
+    """Return the (sort value, id) pair stored in a cursor, raises ValueError if
+    malformed or built for another order"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        name, value, obj_id = json.loads(raw)
+        if name != order.name:
+            raise ValueError
+        if isinstance(order.column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        return value, str(obj_id)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
 """
 SQLAlchemy Repository
 """
@@ -41,19 +87,122 @@ class SQLAlchemyRepository(Repository):
         db.session.add(obj)
         db.session.commit()
 
+    def add_many(self, objs, chunk_size=1000):
+        """Insert objects in one transaction, flushing one multi-row INSERT per chunk.
+
+        All or nothing: if any chunk fails, the whole transaction is rolled
+        back and the error re-raised.
+        """
+        try:
+            for start in range(0, len(objs), chunk_size):
+                db.session.add_all(objs[start:start + chunk_size])
+                db.session.flush()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
     def get(self, obj_id):
         return db.session.get(self.model, obj_id)
 
-
-    def get_all(self):
-        query = db.session.query(self.model)
-        if self.model.__name__ == "Place":
-            query = query.options(
-                joinedload(self.model.reviews_r),
-                joinedload(self.model.amenities_r)
-            )
+    def get_many(self, obj_ids, chunk_size=500):
+        """Fetch several objects with IN (...) queries, returns a dict keyed by id"""
+        obj_ids = list(dict.fromkeys(obj_ids))
+        found = {}
+        # Chunked to stay under the database's bound parameter limit
+        for start in range(0, len(obj_ids), chunk_size):
+            chunk = obj_ids[start:start + chunk_size]
+            for obj in db.session.query(self.model).filter(self.model.id.in_(chunk)):
+                found[obj.id] = obj
+        return found
+
+
+    def _query(self, load=None, columns=None, raise_on_lazy=False):
+        """Build the query shared by the read methods.
+
+        load: relationship names to fetch with selectinload, one extra
+            SELECT ... IN per relationship instead of a JOIN, so loading two
+            collections never multiplies into a cartesian product.
+        columns: column names to project. Rows (with those names as
+            attributes) are returned instead of model instances.
+        raise_on_lazy: any relationship not listed in load raises on access
+            instead of silently firing a lazy query.
+        """
+        if columns:
+            table = self.model.__table__
+            for name in columns:
+                if name not in table.c:
+                    raise ValueError(f"Unknown column: {name}")
+            return db.session.query(*[table.c[name].label(name) for name in columns])
+        options = [selectinload(getattr(self.model, name)) for name in load or ()]
+        if raise_on_lazy:
+            options.append(raiseload('*'))
+        return db.session.query(self.model).options(*options)
+
+    def _ordered(self, query, order):
+        # Ties on id go the same way, so a (column, id) index serves the whole ORDER BY
+        if order.descending:
+            return query.order_by(order.column.desc(), self.model.id.desc())
+        return query.order_by(order.column, self.model.id)
+
+    def get_all(self, load=None, columns=None, raise_on_lazy=False, criteria=(), order=None):
+        """Every object matching criteria, in the given SortOrder (unordered by default)"""
+        query = self._query(load, columns, raise_on_lazy).filter(*criteria)
+        if order is not None:
+            query = self._ordered(query, order)
         return query.all()
 
+    def get_page(self, limit, cursor=None, load=None, columns=None, raise_on_lazy=False,
+                 criteria=(), order=None):
+        """Return (objects, next_cursor) for one page of the objects matching criteria.
+
+        The page follows order (a SortOrder, created_at by default) then id.
+        Pages are found with a keyset seek on (sort value, id) rather than
+        OFFSET, so fetching a deep page costs the same as fetching the first
+        one. next_cursor is None once the last page has been returned.
+        """
+        model = self.model
+        order = order or SortOrder.by(model, 'created_at')
+        if columns:
+            # The cursor is built from these, so the projection must carry them
+            columns = list(columns) + [c for c in order.columns + ('id',) if c not in columns]
+        query = self._ordered(self._query(load, columns, raise_on_lazy).filter(*criteria), order)
+        if cursor:
+            value, obj_id = decode_cursor(cursor, order)
+            # The leading range is implied by the OR, but without it SQLite scans the
+            # (column, id) index from the start instead of seeking to the cursor
+            if order.descending:
+                after = and_(order.column <= value,
+                             or_(order.column < value, and_(order.column == value, model.id < obj_id)))
+            else:
+                after = and_(order.column >= value,
+                             or_(order.column > value, and_(order.column == value, model.id > obj_id)))
+            query = query.filter(after)
+        # Fetch one extra row to know whether another page exists
+        objs = query.limit(limit + 1).all()
+        if len(objs) > limit:
+            objs = objs[:limit]
+            return objs, encode_cursor(objs[-1], order)
+        return objs, None
+
+    def iter_all(self, batch_size=1000, load=None, columns=None, raise_on_lazy=False, criteria=(), order=None):
+        """Lazily iterate over every object matching criteria, fetching batch_size rows at a time.
+
+        Rows come in the given SortOrder (created_at by default) then id.
+        Relationships in load are fetched once per batch by selectinload.
+        """
+        query = self._query(load, columns, raise_on_lazy).filter(*criteria)
+        return self._ordered(query, order or SortOrder.by(self.model, 'created_at')).yield_per(batch_size)
+
+    def collection_version(self, *criteria):
+        """(row count, latest updated_at) of the matching rows.
+
+        Any insert, update or delete among those rows changes the pair, so it
+        can validate cached copies of a collection without reading it.
+        """
+        query = db.session.query(func.count(self.model.id), func.max(self.model.updated_at))
+        return tuple(query.filter(*criteria).one())
+
     def update(self, obj_id, update_data):
         obj = self.get(obj_id)
         if not obj:
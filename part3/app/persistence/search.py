@@ -0,0 +1,118 @@
+"""
+Full-text index over place titles and descriptions (SQLite FTS5).
+
+places_fts is an external-content table: it stores only the inverted
+index and reads the text back from places by rowid. Triggers on places
+keep it in step with every insert, delete and title/description update,
+whichever code path issues them. Run rebuild() (python rebuild_search.py)
+after loading rows with the triggers missing. places has a string primary
+key, so its rowid is implicit and a VACUUM may renumber it, leaving the
+index pointing at the wrong places: create_app() runs rebuild_if_stale(),
+which compares the rowids of the index with those of places (FTS5's
+integrity-check does not look at the content table) and rebuilds on any
+difference.
+
+Other databases have no FTS5, install() does nothing there and the
+repository falls back to LIKE matching.
+"""
+import re
+from sqlalchemy import text
+
+FTS_TABLE = 'places_fts'
+# BM25 weight of each indexed column, a word in the title counts ten times more
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+SNIPPET_TOKENS = 16
+
+INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='places', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS places_fts_insert AFTER INSERT ON places BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS places_fts_delete AFTER DELETE ON places BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.rowid, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS places_fts_update AFTER UPDATE OF title, description ON places BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.rowid, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+    END""",
+]
+
+UNINSTALL = [
+    "DROP TRIGGER IF EXISTS places_fts_insert",
+    "DROP TRIGGER IF EXISTS places_fts_delete",
+    "DROP TRIGGER IF EXISTS places_fts_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+SEARCH = text(f"""
+    SELECT places.id AS id,
+           bm25({FTS_TABLE}, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}) AS rank,
+           snippet({FTS_TABLE}, -1, '<b>', '</b>', '…', {SNIPPET_TOKENS}) AS snippet
+    FROM {FTS_TABLE} JOIN places ON places.rowid = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH :query
+    ORDER BY rank
+    LIMIT :limit
+""")
+
+
+def is_supported(connection):
+    return connection.dialect.name == 'sqlite'
+
+
+def install(connection):
+    """Create the index table and its triggers, if missing"""
+    if is_supported(connection):
+        for statement in INSTALL:
+            connection.execute(text(statement))
+
+
+def uninstall(connection):
+    if is_supported(connection):
+        for statement in UNINSTALL:
+            connection.execute(text(statement))
+
+
+def rebuild(connection):
+    """Re-index every place from the places table"""
+    if is_supported(connection):
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def is_stale(connection):
+    """Whether the index holds other rowids than places, False when it is not installed"""
+    if not is_supported(connection) or not connection.dialect.has_table(connection, FTS_TABLE):
+        return False
+    # One docsize row per indexed rowid
+    return connection.execute(text(f"""
+        SELECT EXISTS (SELECT rowid FROM places EXCEPT SELECT id FROM {FTS_TABLE}_docsize)
+            OR EXISTS (SELECT id FROM {FTS_TABLE}_docsize EXCEPT SELECT rowid FROM places)
+    """)).scalar() == 1
+
+
+def rebuild_if_stale(connection):
+    """Rebuild the index if is_stale(), returns whether it did"""
+    if not is_stale(connection):
+        return False
+    rebuild(connection)
+    return True
+
+
+def parse_terms(query):
+    """Words of a user query, a trailing * marks a prefix ('beach hou*')"""
+    return re.findall(r'\w+\*?', query)
+
+
+def match_expression(terms):
+    """FTS5 query matching every term.
+
+    Each word is quoted so that user input can never be read as FTS5
+    syntax (AND, NEAR, column filters, unbalanced quotes...).
+    """
+    return ' '.join(f'"{term.rstrip("*")}"' + ('*' if term.endswith('*') else '') for term in terms)
@@ -0,0 +1,60 @@
+"""
+SQLite connection tuning.
+
+SQLALCHEMY_ENGINE_OPTIONS size the connection pool, SQLitePragmas runs
+the SQLITE_PRAGMAS of the config on every new connection of an SQLite
+engine (connect event). With journal_mode=WAL readers no longer block the
+writer nor the other way round, synchronous=NORMAL syncs at checkpoints
+rather than at every commit, and busy_timeout makes a writer wait for the
+lock instead of failing at once with "database is locked". Engines of
+other databases are left alone.
+"""
+import re
+
+from sqlalchemy import event
+
+_NAME = re.compile(r'^[a-z_]+$')
+_VALUE = re.compile(r'^(-?\d+|[A-Za-z_]+)$')
+
+
+def pragma_statements(pragmas):
+    """PRAGMA statements of a {name: value} mapping, ValueError on anything but names and integers"""
+    statements = []
+    for name, value in pragmas.items():
+        if not _NAME.match(name) or not _VALUE.match(str(value)):
+            raise ValueError(f"Invalid SQLite pragma {name}={value!r}")
+        statements.append(f'PRAGMA {name}={value}')
+    return statements
+
+
+class SQLitePragmas:
+    """Flask extension running PRAGMA statements on each new SQLite connection.
+
+    Settings read by init_app:
+        SQLITE_PRAGMAS   {pragma: value}, e.g. {'journal_mode': 'WAL'}; empty or None does nothing
+    """
+
+    def __init__(self, db, app=None):
+        self.db = db
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        pragmas = app.config.get('SQLITE_PRAGMAS')
+        if not pragmas:
+            return
+        statements = pragma_statements(pragmas)
+
+        def on_connect(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for statement in statements:
+                    cursor.execute(statement)
+            finally:
+                cursor.close()
+
+        with app.app_context():
+            engines = list(self.db.engines.values())
+        for engine in engines:
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', on_connect)
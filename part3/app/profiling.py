@@ -0,0 +1,191 @@
+"""
+On-demand request profiling.
+
+Off unless PROFILE_TOKEN or PROFILE_SAMPLE_RATE is set; init_app then
+leaves the app untouched. When on, a WSGI middleware profiles:
+
+- requests sending X-Profile-Token: <PROFILE_TOKEN>, optionally with
+  X-Profile-Mode: cprofile or sampling,
+- a PROFILE_SAMPLE_RATE share of all requests, in PROFILE_MODE.
+
+cprofile records every call and writes a .prof file for pstats or
+snakeviz. sampling reads the request thread's stack every
+PROFILE_SAMPLE_INTERVAL seconds from a helper thread, which costs far
+less on the request itself, and writes a .collapsed file of
+"frame;frame;frame count" lines that flamegraph.pl or speedscope take as
+is. The profiled response carries the profile id in X-Profile-Id. Only
+the view is profiled, not the iteration of a streamed body.
+
+The PROFILE_KEEP newest profiles are kept in PROFILE_DIR and listed, for
+callers with the token, by GET /_profiles (download one with
+GET /_profiles/<name>).
+"""
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import abort, jsonify, request, send_from_directory
+
+MODES = ('cprofile', 'sampling')
+EXTENSIONS = {'cprofile': '.prof', 'sampling': '.collapsed'}
+
+
+def collapse(frame):
+    """One line of a collapsed stack file for frame and its callers, outermost first"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler(threading.Thread):
+    """Counts the stacks of another thread, one sample every interval seconds"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class ProfilingMiddleware:
+    """WSGI middleware profiling the requests Profiler selects"""
+
+    def __init__(self, wsgi_app, profiler):
+        self.wsgi_app = wsgi_app
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        mode = self.profiler.mode_for(environ)
+        if mode is None:
+            return self.wsgi_app(environ, start_response)
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        def tagged_start_response(status, headers, exc_info=None):
+            return start_response(status, headers + [('X-Profile-Id', profile_id)], exc_info)
+
+        started = time.perf_counter()
+        if mode == 'cprofile':
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(self.wsgi_app, environ, tagged_start_response)
+            finally:
+                self.profiler.save(profile_id, mode, environ, time.perf_counter() - started, profile.dump_stats)
+        sampler = Sampler(threading.get_ident(), self.profiler.interval)
+        sampler.start()
+        try:
+            return self.wsgi_app(environ, tagged_start_response)
+        finally:
+            sampler.stop()
+
+            def write(path):
+                with open(path, 'w') as f:
+                    f.writelines(f'{stack} {count}\n' for stack, count in sampler.stacks.most_common())
+
+            self.profiler.save(profile_id, mode, environ, time.perf_counter() - started, write)
+
+
+class Profiler:
+    """Flask extension profiling selected requests.
+
+    Settings read by init_app:
+        PROFILE_TOKEN             secret of the X-Profile-Token header and /_profiles
+        PROFILE_SAMPLE_RATE       share of all requests to profile, 0 to 1
+        PROFILE_MODE              cprofile or sampling, for sampled requests
+        PROFILE_SAMPLE_INTERVAL   seconds between two stack samples
+        PROFILE_DIR               where profiles are written
+        PROFILE_KEEP              number of profiles kept, the oldest are deleted
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.token = app.config.get('PROFILE_TOKEN')
+        self.sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0)
+        if not self.token and not self.sample_rate:
+            return
+        self.mode = app.config.get('PROFILE_MODE', 'sampling')
+        if self.mode not in MODES:
+            raise ValueError(f"PROFILE_MODE must be one of {', '.join(MODES)}")
+        self.interval = app.config.get('PROFILE_SAMPLE_INTERVAL', 0.005)
+        self.directory = app.config['PROFILE_DIR']
+        self.keep = app.config.get('PROFILE_KEEP', 100)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        app.wsgi_app = ProfilingMiddleware(app.wsgi_app, self)
+        if self.token:
+            app.add_url_rule('/_profiles', 'profiles', self.list_profiles)
+            app.add_url_rule('/_profiles/<name>', 'profile', self.get_profile)
+
+    def mode_for(self, environ):
+        """Profiling mode of a request, None when it is not profiled"""
+        token = environ.get('HTTP_X_PROFILE_TOKEN')
+        if token is not None and self._is_token(token):
+            mode = environ.get('HTTP_X_PROFILE_MODE', 'cprofile')
+            return mode if mode in MODES else 'cprofile'
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    def _is_token(self, token):
+        return bool(self.token) and hmac.compare_digest(token.encode(), self.token.encode())
+
+    def save(self, profile_id, mode, environ, duration, write):
+        """Write a profile with write(path) and drop the oldest ones beyond PROFILE_KEEP"""
+        path = re.sub(r'[^\w.-]+', '_', environ.get('PATH_INFO', '')).strip('_') or 'root'
+        name = f"{profile_id}-{environ.get('REQUEST_METHOD', 'GET')}-{path[:80]}-{duration * 1000:.0f}ms{EXTENSIONS[mode]}"
+        write(os.path.join(self.directory, name))
+        with self._lock:
+            for old in self.profiles()[self.keep:]:
+                try:
+                    os.remove(os.path.join(self.directory, old))
+                except FileNotFoundError:
+                    pass
+
+    def profiles(self):
+        """File names of the saved profiles, newest first"""
+        names = [name for name in os.listdir(self.directory) if name.endswith(tuple(EXTENSIONS.values()))]
+        return sorted(names, reverse=True)
+
+    """
+    ADMIN ENDPOINTS
+    """
+    def _check_token(self):
+        if not self._is_token(request.headers.get('X-Profile-Token', '')):
+            abort(403)
+
+    def list_profiles(self):
+        self._check_token()
+        return jsonify([{
+            'name': name,
+            'id': '-'.join(name.split('-', 2)[:2]),
+            'size': os.path.getsize(os.path.join(self.directory, name)),
+        } for name in self.profiles()])
+
+    def get_profile(self, name):
+        self._check_token()
+        if not name.endswith(tuple(EXTENSIONS.values())):
+            abort(404)
+        return send_from_directory(os.path.abspath(self.directory), name, as_attachment=True)
@@ -0,0 +1,137 @@
+"""
+SQL query statistics per request.
+
+Listeners on the SQLAlchemy engine events count every statement and its
+time while a QueryRecorder is active. QueryStats opens one recorder per
+request: the totals go out in a Server-Timing header (visible in the
+browser devtools), and a statement shape repeated more than
+QUERY_REPEAT_WARNING times is logged, which is how an N+1 (one lazy load
+per row of a list) shows up. assert_max_queries() records a block of
+code, so tests can pin the query budget of an endpoint.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Recorders of the current thread/task, a statement counts in each of them
+_recorders = ContextVar('query_recorders', default=())
+
+# A parenthesised list of placeholders, as rendered by an expanding IN
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)')
+
+
+def statement_shape(statement):
+    """Statement with whitespace and IN lists normalised, equal for every row of an N+1"""
+    return _PLACEHOLDER_LIST.sub('(?)', ' '.join(statement.split()))
+
+
+class QueryRecorder:
+    """Number, time and shapes of the statements run while it is active"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        """(shape, count) of the statements run more than threshold times"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+
+def start_recording():
+    recorder = QueryRecorder()
+    _recorders.set(_recorders.get() + (recorder,))
+    return recorder
+
+
+def stop_recording(recorder):
+    _recorders.set(tuple(active for active in _recorders.get() if active is not recorder))
+
+
+@contextmanager
+def record_queries():
+    """Record the statements run inside the with block"""
+    recorder = start_recording()
+    try:
+        yield recorder
+    finally:
+        stop_recording(recorder)
+
+
+@contextmanager
+def assert_max_queries(n):
+    """Fail with AssertionError when the with block runs more than n statements"""
+    with record_queries() as recorder:
+        yield recorder
+    if recorder.count > n:
+        shapes = '\n'.join(f'  {count} x {shape}' for shape, count in recorder.shapes.most_common())
+        raise AssertionError(f"{recorder.count} queries run, at most {n} expected:\n{shapes}")
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _recorders.get():
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_started', None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    for recorder in _recorders.get():
+        recorder.record(statement, duration)
+
+
+class QueryStats:
+    """Flask extension recording the SQL statements of each request.
+
+    Settings read at request time:
+        QUERY_STATS             record requests and send Server-Timing
+        QUERY_REPEAT_WARNING    log a statement run more than this many times
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    def _start(self):
+        if current_app.config.get('QUERY_STATS', True):
+            g.query_recorder = start_recording()
+
+    def _finish(self, response):
+        recorder = g.pop('query_recorder', None)
+        if recorder is None:
+            return response
+        stop_recording(recorder)
+        response.headers.add(
+            'Server-Timing', f'db;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries"'
+        )
+        for shape, count in recorder.repeated(current_app.config.get('QUERY_REPEAT_WARNING', 10)):
+            current_app.logger.warning(
+                "%s %s ran the same statement %d times, N+1 query? %s", request.method, request.path, count, shape
+            )
+        return response
+
+    def _teardown(self, exc):
+        # after_request is skipped when the view raised
+        recorder = g.pop('query_recorder', None)
+        if recorder is not None:
+            stop_recording(recorder)
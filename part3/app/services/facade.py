@@ -3,17 +3,63 @@ from app.models.place import Place
 from app.models.review import Review
 from app.models.users import User
 from app.persistence.UserRepository import UserRepository
+from app.persistence.PlaceRepository import SORTS, PlaceRepository
+from app.persistence import geo, search
 from app.persistence.repository import SQLAlchemyRepository
-from app import bcrypt
+from app.persistence.cache import EntityCache
 from app import db
+from sqlalchemy.orm import with_parent
 
 
 class HBnBFacade:
     def __init__(self):
         self.user_repo = UserRepository()
-        self.place_repo = SQLAlchemyRepository(Place)
+        self.place_repo = PlaceRepository()
         self.review_repo = SQLAlchemyRepository(Review)
         self.amenity_repo = SQLAlchemyRepository(Amenity)
+        # Read-through cache for get_user, get_place and get_amenity
+        self.cache = EntityCache()
+
+    def init_cache(self, settings):
+        """(Re)configure the entity cache from the ENTITY_CACHE setting, dropping cached entries"""
+        self.cache.configure(settings)
+
+    """
+    BATCH
+    """
+    def _create_many(self, repo, items_data, build):
+        """Build every item with build(data) and insert the valid ones in bulk.
+
+        Returns one (id, None) or (None, error message) pair per input item,
+        in input order. Ids are read before the insert so that reporting
+        them does not reload each committed row. The valid items are
+        inserted in one transaction: if the insert fails, none of them is
+        stored and the error is raised.
+        """
+        results = []
+        objs = []
+        for data in items_data:
+            try:
+                if not isinstance(data, dict):
+                    raise ValueError("Item must be an object")
+                obj = build(data)
+            except (TypeError, ValueError) as e:
+                results.append((None, str(e)))
+                continue
+            results.append((obj.id, None))
+            objs.append(obj)
+        repo.add_many(objs)
+        return results
+
+    @staticmethod
+    def _collect(items_data, key):
+        """Every string value of key across the dict items, used to prefetch references"""
+        values = []
+        for data in items_data:
+            if isinstance(data, dict):
+                value = data.get(key)
+                values.extend(v for v in (value if isinstance(value, list) else [value]) if isinstance(v, str))
+        return values
 
     """
     USER
@@ -22,16 +68,39 @@ class HBnBFacade:
         # Extract password and create user without it
         password = user_data.pop('password')
         user = User(**user_data)
-        user.password = bcrypt.generate_password_hash(password).decode('utf-8')
+        # Hashed in the password pool, raises PasswordHasherBusy when it is saturated
+        user.hash_password(password)
         self.user_repo.add(user)
         return user
 
     def get_user(self, user_id):
-        return self.user_repo.get(user_id)
+        return self.cache.get('user', self.user_repo, user_id)
 
     def get_user_by_email(self, email):
         return self.user_repo.get_user_by_email(email)
 
+    def get_all_users(self, load=None, columns=None):
+        return self.user_repo.get_all(load, columns)
+
+    def get_relations_version(self, obj, attributes):
+        """Version, (row count, latest updated_at), of the rows related to obj through each relationship attribute"""
+        repos = {User: self.user_repo, Place: self.place_repo, Review: self.review_repo, Amenity: self.amenity_repo}
+        versions = []
+        for attribute in attributes:
+            relationship = getattr(type(obj), attribute)
+            repo = repos[relationship.property.mapper.class_]
+            versions.append(repo.collection_version(with_parent(obj, relationship)))
+        return versions
+
+    def get_users_version(self):
+        return self.user_repo.collection_version()
+
+    def get_users_page(self, limit, cursor=None, load=None, columns=None):
+        return self.user_repo.get_page(limit, cursor, load, columns)
+
+    def iter_users(self, batch_size=1000, load=None, columns=None):
+        return self.user_repo.iter_all(batch_size, load, columns)
+
     def update_user(self, user_id, user_data):
         """Update a user and return the updated user"""
         user = self.user_repo.get(user_id)
@@ -42,6 +111,7 @@ class HBnBFacade:
         update_data = {k: v for k, v in user_data.items() if k in allowed_fields}
         user.update(update_data)
         db.session.commit()
+        self.cache.invalidate('user', user_id)
         return user
 
     def delete_user(self, user_id):
@@ -49,7 +119,12 @@ class HBnBFacade:
         user = self.user_repo.get(user_id)
         if not user:
             return False
+        # Owned places go with the user (delete-orphan cascade), and so do
+        # the user's reviews, which changes the aggregates of the places reviewed
+        place_ids = [place.id for place in user.places_r] + [review.place_id for review in user.reviews_r]
         self.user_repo.delete(user_id)
+        self.cache.invalidate('user', user_id)
+        self.cache.invalidate('place', *place_ids)
         return True
 
     """
@@ -60,50 +135,181 @@ class HBnBFacade:
         self.amenity_repo.add(amenity)
         return amenity
 
+    def create_amenities(self, amenities_data):
+        return self._create_many(self.amenity_repo, amenities_data, lambda data: Amenity(**data))
+
     def get_amenity(self, amenity_id):
-        return self.amenity_repo.get(amenity_id)
+        return self.cache.get('amenity', self.amenity_repo, amenity_id)
+
+    def get_all_amenities(self, load=None, columns=None):
+        return list(self.amenity_repo.get_all(load, columns))
+
+    def get_amenities_version(self):
+        return self.amenity_repo.collection_version()
 
-    def get_all_amenities(self):
-        return list(self.amenity_repo.get_all())
+    def get_amenities_page(self, limit, cursor=None, load=None, columns=None):
+        return self.amenity_repo.get_page(limit, cursor, load, columns)
 
     def update_amenity(self, amenity_id, amenity_data):
-        return self.amenity_repo.update(amenity_id, amenity_data)
+        amenity = self.amenity_repo.update(amenity_id, amenity_data)
+        self.cache.invalidate('amenity', amenity_id)
+        return amenity
+
+    def delete_amenity(self, amenity_id):
+        deleted = self.amenity_repo.delete(amenity_id)
+        self.cache.invalidate('amenity', amenity_id)
+        return deleted
     
     def add_amenity_to_place(self, place_id, amenity_id):
+        return self.add_amenities_to_place(place_id, [amenity_id])
+
+    def add_amenities_to_place(self, place_id, amenity_ids):
+        """Link several amenities to a place with one lookup query and one commit"""
         place = self.place_repo.get(place_id)
-        amenity = self.amenity_repo.get(amenity_id)
         if not place:
             raise ValueError("Place not found")
-        if not amenity:
+        amenities = self.amenity_repo.get_many(amenity_ids)
+        if len(amenities) != len(set(amenity_ids)):
             raise ValueError("Amenity not found")
-        place.add_amenity(amenity)
+        self._attach_amenities(place, amenities.values())
+        # The place's representation changed, so does its updated_at
+        place.save()
         db.session.commit()
+        self.cache.invalidate('place', place_id)
         return place
 
+    @staticmethod
+    def _attach_amenities(place, amenities):
+        """Append amenities the place is not linked to yet"""
+        for amenity in amenities:
+            place.add_amenity(amenity)
+
 
 
     """
     PLACE
     """
     def create_place(self, place_data):
+        """Create a place and link its amenities, unknown amenity ids are ignored"""
+        place_data = dict(place_data)
+        amenity_ids = place_data.pop('amenities', None) or []
         place = Place(**place_data)
+        if amenity_ids:
+            amenities = self.amenity_repo.get_many(amenity_ids)
+            self._attach_amenities(place, amenities.values())
         self.place_repo.add(place)
         return place
 
+    def create_places(self, places_data):
+        required_fields = ['title', 'price', 'latitude', 'longitude', 'owner_id']
+        # One IN query each for every owner and amenity referenced by the batch
+        owners = self.user_repo.get_many(self._collect(places_data, 'owner_id'))
+        amenities = self.amenity_repo.get_many(self._collect(places_data, 'amenities'))
+
+        def build(data):
+            data = dict(data)
+            amenity_ids = data.pop('amenities', None) or []
+            if not all(data.get(field) for field in required_fields):
+                raise ValueError("Missing required fields")
+            if data['owner_id'] not in owners:
+                raise ValueError("Owner not found")
+            place = Place(**data)
+            self._attach_amenities(place, [amenities[a] for a in amenity_ids if a in amenities])
+            return place
+
+        return self._create_many(self.place_repo, places_data, build)
+
     def get_place(self, place_id):
-        return self.place_repo.get(place_id)
+        return self.cache.get('place', self.place_repo, place_id)
+
+    def _place_listing(self, sort=None, **filters):
+        """(criteria, order) of a filtered and sorted place listing, raises ValueError on bad values"""
+        if sort is not None and sort not in SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+        for name in ('min_price', 'max_price', 'min_rating'):
+            if filters.get(name) is not None and filters[name] < 0:
+                raise ValueError(f"{name} must not be negative")
+        return self.place_repo.listing_criteria(**filters), SORTS.get(sort)
 
-    def get_all_places(self):
-        return self.place_repo.get_all()
+    def get_all_places(self, load=None, columns=None, sort=None, **filters):
+        """Places matching the listing filters (min_price, max_price, amenity_ids,
+        owner_id, min_rating), in sort order if one is given"""
+        criteria, order = self._place_listing(sort, **filters)
+        return self.place_repo.get_all(load, columns, criteria=criteria, order=order)
+
+    def get_place_version(self, place):
+        """Version of one place as served: its row plus the reviews and amenities it embeds"""
+        reviews = self.review_repo.collection_version(Review.place_id == place.id)
+        amenities = self.amenity_repo.collection_version(Amenity.places_r.any(Place.id == place.id))
+        return place.updated_at, reviews, amenities
+
+    def get_places_version(self):
+        """Version of the places collection, including the reviews and amenities it embeds"""
+        return (self.place_repo.collection_version(),
+                self.review_repo.collection_version(),
+                self.amenity_repo.collection_version())
+
+    def get_places_page(self, limit, cursor=None, load=None, columns=None, sort=None, **filters):
+        criteria, order = self._place_listing(sort, **filters)
+        return self.place_repo.get_page(limit, cursor, load, columns, criteria=criteria, order=order)
+
+    def iter_places(self, batch_size=1000, load=None, columns=None, sort=None, **filters):
+        criteria, order = self._place_listing(sort, **filters)
+        return self.place_repo.iter_all(batch_size, load, columns, criteria=criteria, order=order)
+
+    def search_places(self, latitude=None, longitude=None, radius_km=None, bbox=None, k=50, load=None):
+        """Places near a point and/or inside a bounding box, nearest first.
+
+        bbox is (min_lng, min_lat, max_lng, max_lat), min_lng > max_lng for a
+        box crossing the antimeridian. Without a point, distances are measured
+        from the center of the box. Returns (place, distance_km) pairs.
+        """
+        if (latitude is None) != (longitude is None):
+            raise ValueError("lat and lng must be given together")
+        if latitude is None and bbox is None:
+            raise ValueError("lat and lng or bbox is required")
+        if latitude is not None and not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError("lat must be between -90 and 90, lng between -180 and 180")
+        if radius_km is not None and radius_km <= 0:
+            raise ValueError("radius_km must be a positive number")
+        if k < 1:
+            raise ValueError("k must be a positive integer")
+        if bbox is None:
+            return self.place_repo.find_near(latitude, longitude, k, radius_km, load)
+
+        min_lng, min_lat, max_lng, max_lat = bbox
+        if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+            raise ValueError("bbox must be min_lng,min_lat,max_lng,max_lat in degrees")
+        if latitude is None:
+            latitude = (min_lat + max_lat) / 2
+            longitude = (min_lng + (max_lng - min_lng) % 360 / 2 + 180) % 360 - 180
+        boxes = geo.split_antimeridian(min_lat, min_lng, max_lat, max_lng)
+        return self.place_repo.find_in_bbox(boxes, latitude, longitude, k, radius_km, load)
+
+    def search_places_text(self, query, k=50, load=None):
+        """Places whose title or description contain every word of query, best match first.
+
+        A word ending in * matches as a prefix. Returns (place, score,
+        snippet) triples.
+        """
+        terms = search.parse_terms(query or '')
+        if not terms:
+            raise ValueError("q must contain at least one word")
+        if k < 1:
+            raise ValueError("k must be a positive integer")
+        return self.place_repo.search_text(terms, k, load)
 
     def update_place(self, place_id, place_data):
-        return self.place_repo.update(place_id, place_data)
+        place = self.place_repo.update(place_id, place_data)
+        self.cache.invalidate('place', place_id)
+        return place
     
     def delete_place(self, place_id):
         place = self.place_repo.get(place_id)
         if not place:
             return False
         self.place_repo.delete(place_id)
+        self.cache.invalidate('place', place_id)
         return True
 
 
@@ -129,14 +335,47 @@ class HBnBFacade:
         user_id = review_data["user_id"]
         # Review class will validate text and rating
         review = Review(text=text, rating=rating, place_id=place_id, user_id=user_id)
+        # The place's review aggregates are updated in the same transaction
         self.review_repo.add(review)
+        self.cache.invalidate('place', place_id)
         return review
 
+    def create_reviews(self, reviews_data):
+        required_fields = ["text", "rating", "user_id", "place_id"]
+        users = self.user_repo.get_many(self._collect(reviews_data, "user_id"))
+        places = self.place_repo.get_many(self._collect(reviews_data, "place_id"))
+
+        def build(data):
+            for field in required_fields:
+                if field not in data:
+                    raise ValueError(f"Missing required field: {field}")
+            if data["user_id"] not in users:
+                raise ValueError("User not found")
+            if data["place_id"] not in places:
+                raise ValueError("Place not found")
+            return Review(text=data["text"], rating=data["rating"],
+                          place_id=data["place_id"], user_id=data["user_id"])
+
+        results = self._create_many(self.review_repo, reviews_data, build)
+        self.cache.invalidate('place', *places)
+        return results
+
     def get_review(self, review_id):
         return self.review_repo.get(review_id)
 
-    def get_all_reviews(self):
-        return self.review_repo.get_all()
+    def get_all_reviews(self, load=None, columns=None):
+        return self.review_repo.get_all(load, columns)
+
+    def get_reviews_version(self, place_id=None):
+        if place_id is None:
+            return self.review_repo.collection_version()
+        return self.review_repo.collection_version(Review.place_id == place_id)
+
+    def get_reviews_page(self, limit, cursor=None, load=None, columns=None):
+        return self.review_repo.get_page(limit, cursor, load, columns)
+
+    def iter_reviews(self, batch_size=1000, load=None, columns=None):
+        return self.review_repo.iter_all(batch_size, load, columns)
 
     def get_reviews_by_place(self, place_id):
         place = self.place_repo.get(place_id)
@@ -161,9 +400,22 @@ class HBnBFacade:
         update_data = {k: v for k, v in review_data.items() if k in allowed_fields}
         review.update(update_data)
         db.session.commit()
+        self.cache.invalidate('place', review.place_id)
         return review
 
 
     def delete_review(self, review_id):
         # SQLAlchemy will handle relationship cleanup automatically
-        return self.review_repo.delete(review_id)
+        review = self.review_repo.get(review_id)
+        if not review:
+            return False
+        place_id = review.place_id
+        self.review_repo.delete(review_id)
+        self.cache.invalidate('place', place_id)
+        return True
+
+    def repair_review_stats(self):
+        """Recompute every place's review aggregates, returns how many places were wrong"""
+        repaired = self.place_repo.repair_review_stats()
+        self.cache.clear()
+        return repaired
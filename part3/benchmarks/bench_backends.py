@@ -0,0 +1,362 @@
+"""
+Backend benchmark: part2 InMemoryRepository vs part3 SQLAlchemyRepository.
+
+For each backend and data size, loads a synthetic dataset (see datagen)
+and times the repository operations on users (add, get, get_all,
+get_by_attribute, update, delete), then end-to-end requests through the
+Flask test client. Results are written as JSON, and a previous results
+file can be given to --compare to flag regressions between commits.
+
+Both parts ship a top-level package named app, so every (backend, size)
+runs in its own interpreter started in part3: the memory worker puts
+part2 first on sys.path before importing app, the sqlalchemy worker uses
+a throwaway SQLite file.
+
+    cd part3
+    python -m benchmarks.bench_backends --sizes 1000 100000 1000000 --output before.json
+    python -m benchmarks.bench_backends --sizes 1000 100000 1000000 --output after.json --compare before.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from benchmarks.datagen import Dataset, email
+
+PART3 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PART2 = os.path.join(os.path.dirname(PART3), 'part2')
+# Directory each backend's worker imports app from
+BACKENDS = {'memory': PART2, 'sqlalchemy': PART3}
+
+
+def summary(timings):
+    timings = sorted(timings)
+    return {
+        'n': len(timings),
+        'median_us': round(statistics.median(timings) * 1e6, 1),
+        'p95_us': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1e6, 1),
+        'mean_us': round(statistics.fmean(timings) * 1e6, 1),
+    }
+
+
+def timed(fn, calls, before=None):
+    """Time fn(*args) for each args of calls, before() runs untimed ahead of each call"""
+    timings = []
+    for args in calls:
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return summary(timings)
+
+
+"""
+BACKENDS
+"""
+class MemoryBackend:
+    """part2: objects in InMemoryRepository dicts"""
+
+    def __init__(self):
+        from app import create_app
+        from app.services import facade
+        self.app = create_app()
+        self.facade = facade
+        self.repo = facade.user_repo
+
+    def load(self, data):
+        from app.models.amenity import Amenity
+        from app.models.place import Place
+        from app.models.review import Review
+        from app.models.users import User
+        facade = self.facade
+        for row in data.users():
+            facade.user_repo.add(self._with_id(User(row['first_name'], row['last_name'], row['email']), row))
+        for row in data.amenities():
+            facade.amenity_repo.add(self._with_id(Amenity(row['name']), row))
+        for row in data.places():
+            amenities = [facade.amenity_repo.get(amenity_id) for amenity_id in row['amenity_ids']]
+            place = Place(row['title'], row['description'], row['price'], row['latitude'], row['longitude'],
+                          row['owner_id'], amenities)
+            facade.place_repo.add(self._with_id(place, row))
+        for row in data.reviews():
+            place, user = facade.place_repo.get(row['place_id']), facade.user_repo.get(row['user_id'])
+            review = Review(row['text'], row['rating'], place, user)
+            # Review() listed its random id in the place's and user's reviews
+            place.remove_review(review)
+            user.remove_review(review)
+            self._with_id(review, row)
+            place.add_review(review)
+            user.add_review(review)
+            facade.review_repo.add(review)
+
+    @staticmethod
+    def _with_id(obj, row):
+        obj.id = row['id']
+        return obj
+
+    def new_user(self, i):
+        from app.models.users import User
+        return User('New', 'User', f'new{i}@bench.io')
+
+    def end_request(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLAlchemyBackend:
+    """part3: SQLAlchemyRepository on a SQLite file"""
+
+    def __init__(self):
+        from app import create_app, db
+        from app.services import facade
+        from config import Config
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.app = create_app(type('BenchConfig', (Config,), {
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.path}',
+            'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+            'BCRYPT_LOG_ROUNDS': 4,
+            'PASSWORD_HASH_WORKERS': 0,
+        }))
+        self.db = db
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        self.facade = facade
+        self.repo = facade.user_repo
+
+    def insert(self, table, rows, chunk_size=20000):
+        from sqlalchemy import insert
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            self.db.session.execute(insert(table), chunk)
+            self.db.session.commit()
+
+    def load(self, data):
+        from app.models.amenity import Amenity
+        from app.models.place import Place, place_amenity
+        from app.models.review import Review, recompute_place_review_stats
+        from app.models.users import User
+        from app.persistence import geo
+        now = datetime.utcnow()
+        stamps = {'created_at': now, 'updated_at': now}
+        self.insert(User.__table__, (dict(row, password='x', is_admin=False, **stamps) for row in data.users()))
+        self.insert(Amenity.__table__, (dict(row, **stamps) for row in data.amenities()))
+        places = []
+
+        def place_rows():
+            for row in data.places():
+                places.append((row['id'], row.pop('amenity_ids')))
+                yield dict(row, geohash=geo.encode(row['latitude'], row['longitude']), **stamps)
+
+        self.insert(Place.__table__, place_rows())
+        self.insert(place_amenity, ({'place_id': place_id, 'amenity_id': amenity_id}
+                                    for place_id, amenity_ids in places for amenity_id in amenity_ids))
+        self.insert(Review.__table__, (dict(row, **stamps) for row in data.reviews()))
+        # Core inserts bypass the Review events keeping the place aggregates
+        with self.db.engine.begin() as connection:
+            recompute_place_review_stats(connection)
+
+    def new_user(self, i):
+        from app.models.users import User
+        user = User('New', 'User', f'new{i}@bench.io')
+        user.hash_password('x')
+        return user
+
+    def end_request(self):
+        self.db.session.remove()
+
+    def close(self):
+        self.db.session.remove()
+        self.db.engine.dispose()
+        self.context.pop()
+        os.remove(self.path)
+
+
+"""
+WORKER
+"""
+def run_worker(backend_name, size, ops, list_max, seed):
+    data = Dataset(size, seed)
+    rng = random.Random(seed)
+    backend = MemoryBackend() if backend_name == 'memory' else SQLAlchemyBackend()
+    try:
+        started = time.perf_counter()
+        backend.load(data)
+        load_seconds = time.perf_counter() - started
+        backend.end_request()
+
+        repo, end_request = backend.repo, backend.end_request
+        new_users = [backend.new_user(i) for i in range(ops)]
+        new_ids = [user.id for user in new_users]
+        user_ids = data.sample_ids('users', ops, rng)
+        emails = [email(rng.randrange(data.counts['users'])) for _ in range(ops)]
+        repository = {
+            'add': timed(repo.add, [(user,) for user in new_users], end_request),
+            'get': timed(repo.get, [(user_id,) for user_id in user_ids], end_request),
+            'get_all': timed(repo.get_all, [()] * max(1, min(5, ops)), end_request),
+            'get_by_attribute': timed(repo.get_by_attribute, [('email', e) for e in emails], end_request),
+            'update': timed(repo.update, [(user_id, {'first_name': 'Updated'}) for user_id in user_ids], end_request),
+            'delete': timed(repo.delete, [(user_id,) for user_id in new_ids], end_request),
+        }
+
+        client = backend.app.test_client()
+        places, users = data.sample_ids('places', ops, rng), data.sample_ids('users', ops, rng)
+        requests = {
+            'GET /api/v1/users/<id>': [('get', f'/api/v1/users/{user_id}', None)
+                                       for user_id in data.sample_ids('users', ops, rng)],
+            'GET /api/v1/reviews/<id>': [('get', f'/api/v1/reviews/{review_id}', None)
+                                         for review_id in data.sample_ids('reviews', ops, rng)],
+            'GET /api/v1/amenities/': [('get', '/api/v1/amenities/', None)] * ops,
+            'POST /api/v1/reviews/': [('post', '/api/v1/reviews/', {
+                'text': 'Bench review', 'rating': rng.randint(1, 5), 'place_id': place_id, 'user_id': user_id,
+            }) for place_id, user_id in zip(places, users)],
+        }
+        if data.counts['places'] <= list_max:
+            # Every place in one response, the memory backend has no pagination
+            requests['GET /api/v1/places/'] = [('get', '/api/v1/places/', None)] * max(1, ops // 10)
+        endpoints = {}
+        for label, calls in requests.items():
+            statuses = Counter()
+
+            def send(method, url, payload):
+                statuses[str(getattr(client, method)(url, json=payload).status_code)] += 1
+
+            endpoints[label] = dict(timed(send, calls, end_request), status=dict(statuses))
+        return {
+            'backend': backend_name,
+            'size': size,
+            'counts': data.counts,
+            'load_seconds': round(load_seconds, 3),
+            'repository': repository,
+            'endpoints': endpoints,
+        }
+    finally:
+        backend.close()
+
+
+"""
+DRIVER
+"""
+def spawn_worker(backend, size, args):
+    """Run one worker in a fresh interpreter and return its results"""
+    fd, output = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    command = [sys.executable, '-m', 'benchmarks.bench_backends', '--worker', backend, '--sizes', str(size),
+               '--ops', str(args.ops), '--list-max', str(args.list_max), '--seed', str(args.seed),
+               '--output', output]
+    try:
+        subprocess.run(command, cwd=PART3, check=True, stdout=subprocess.DEVNULL)
+        with open(output) as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=PART3, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measurements(results):
+    """{(backend, size, section, operation): median_us} of a results document"""
+    return {
+        (run['backend'], run['size'], section, name): values['median_us']
+        for run in results['runs'] for section in ('repository', 'endpoints')
+        for name, values in run[section].items()
+    }
+
+
+def compare(previous, current, threshold):
+    """Print the median ratio of every measurement in both documents, return the regressions"""
+    before, after = measurements(previous), measurements(current)
+    regressions = []
+    print(f"\n{'backend':<11}{'size':>9}  {'operation':<30}{'before us':>12}{'after us':>12}{'ratio':>8}")
+    for key in sorted(before.keys() & after.keys(), key=str):
+        ratio = after[key] / before[key] if before[key] else float('inf')
+        flag = '  REGRESSION' if ratio > threshold else ''
+        if flag:
+            regressions.append(key)
+        backend, size, _, name = key
+        print(f"{backend:<11}{size:>9}  {name:<30}{before[key]:>12.1f}{after[key]:>12.1f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def print_run(run):
+    print(f"\n{run['backend']} size={run['size']} load={run['load_seconds']}s")
+    for section in ('repository', 'endpoints'):
+        for name, values in run[section].items():
+            print(f"  {name:<30}{values['median_us']:>12.1f} us median{values['p95_us']:>12.1f} us p95")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--backends', nargs='+', choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    parser.add_argument('--ops', type=int, default=200, help='timed calls per operation')
+    parser.add_argument('--list-max', type=int, default=10000,
+                        help='largest place count for which GET /api/v1/places/ (every place) is timed')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_backends.json')
+    parser.add_argument('--compare', help='previous results file')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='after/before median ratio reported as a regression')
+    parser.add_argument('--worker', choices=sorted(BACKENDS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        sys.path.insert(0, BACKENDS[args.worker])
+        with open(args.output, 'w') as f:
+            json.dump(run_worker(args.worker, args.sizes[0], args.ops, args.list_max, args.seed), f)
+        return 0
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'ops': args.ops,
+            'seed': args.seed,
+        },
+        'runs': [],
+    }
+    for size in args.sizes:
+        for backend in args.backends:
+            run = spawn_worker(backend, size, args)
+            results['runs'].append(run)
+            print_run(run)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} measurement(s) slower than {args.threshold}x")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Location search benchmark: geohash index vs filtering every place.
+
+Fills throwaway SQLite databases with places spread over the globe and
+times a 10 km radius search and a 20-nearest search through the
+PlaceRepository, next to the client-side approach of loading every place
+and filtering by distance. Run it at growing catalog sizes to check the
+indexed searches stay flat while the scan grows with the table.
+
+    cd part3
+    python -m benchmarks.bench_geo --places 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert, text
+
+from app import create_app, db
+from app.models.place import Place
+from app.models.users import User
+from app.persistence import geo
+from app.persistence.PlaceRepository import PlaceRepository
+from benchmarks.bench_indexes import insert_chunks, make_config
+
+
+def populate(n_places):
+    now = datetime.utcnow()
+    owner_id = str(uuid.uuid4())
+    db.session.execute(insert(User.__table__), [{
+        "id": owner_id, "created_at": now, "updated_at": now, "first_name": "Bench",
+        "last_name": "Owner", "email": "owner@bench.io", "password": "x", "is_admin": False,
+    }])
+    rows = []
+    for i in range(n_places):
+        # Uniform over the sphere, not over the lat/lng rectangle
+        latitude = random.uniform(-60, 70)
+        longitude = random.uniform(-180, 180)
+        rows.append({"id": str(uuid.uuid4()), "created_at": now, "updated_at": now,
+                     "title": f"Place {i}", "description": "Synthetic", "price": 100.0,
+                     "latitude": latitude, "longitude": longitude, "owner_id": owner_id,
+                     "geohash": geo.encode(latitude, longitude)})
+    insert_chunks(Place.__table__, rows)
+
+
+def median_ms(fn, points):
+    timings = []
+    for latitude, longitude in points:
+        start = time.perf_counter()
+        fn(latitude, longitude)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def scan(latitude, longitude):
+    """What a client had to do before: every place, filtered by distance"""
+    rows = db.session.execute(text("SELECT id, latitude, longitude FROM places")).all()
+    return [row for row in rows if geo.haversine_km(latitude, longitude, row.latitude, row.longitude) <= 10]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--places", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    random.seed(0)
+
+    print(f"{'places':>10}{'scan ms':>12}{'radius ms':>12}{'20-NN ms':>12}")
+    for n_places in args.places:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        app = create_app(make_config(path))
+        try:
+            with app.app_context():
+                db.create_all()
+                populate(n_places)
+                repo = PlaceRepository()
+                points = [(random.uniform(-60, 70), random.uniform(-180, 180)) for _ in range(args.repeat)]
+                scan_ms = median_ms(scan, points[:5])
+                radius_ms = median_ms(lambda lat, lng: repo.find_near(lat, lng, 500, radius_km=10), points)
+                knn_ms = median_ms(lambda lat, lng: repo.find_near(lat, lng, 20), points)
+                print(f"{n_places:>10}{scan_ms:>12.2f}{radius_ms:>12.2f}{knn_ms:>12.2f}")
+                db.session.remove()
+                db.engine.dispose()
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Index benchmark: full table scan vs index seek on the hot lookups.
+
+Builds a throwaway SQLite database in the pre-migration shape (tables but
+none of the migration 1 indexes), fills it with synthetic rows, times the
+lookups, runs the migration runner against the populated file and times
+the same lookups again.
+
+    cd part3
+    python -m benchmarks.bench_indexes --reviews 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app import create_app, db
+from app.models.amenity import Amenity
+from app.models.place import Place, place_amenity
+from app.models.review import Review
+from app.models.users import User
+from app.persistence.migrations import HOT_PATH_INDEXES, declared_index, upgrade
+
+QUERIES = [
+    ("reviews by place_id", "SELECT id, text, rating FROM reviews WHERE place_id = :place_id", "place_id"),
+    ("reviews by user_id", "SELECT id FROM reviews WHERE user_id = :user_id", "user_id"),
+    ("places by owner_id", "SELECT id FROM places WHERE owner_id = :user_id", "user_id"),
+    ("places by price range", "SELECT id FROM places WHERE price BETWEEN :low AND :low + 5", "low"),
+    ("places with amenity", "SELECT place_id FROM place_amenity WHERE amenity_id = :amenity_id", "amenity_id"),
+]
+
+
+def make_config(path):
+    class BenchConfig:
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+    return BenchConfig
+
+
+def insert_chunks(table, rows, chunk_size=50000):
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(insert(table), rows[start:start + chunk_size])
+        db.session.commit()
+
+
+def populate(n_users, n_places, n_amenities, n_reviews):
+    now = datetime.utcnow()
+
+    def stamp(i):
+        return now - timedelta(seconds=i)
+
+    users = [{"id": str(uuid.uuid4()), "created_at": stamp(i), "updated_at": stamp(i),
+              "first_name": "Bench", "last_name": "User", "email": f"user{i}@bench.io",
+              "password": "x", "is_admin": False} for i in range(n_users)]
+    insert_chunks(User.__table__, users)
+
+    places = [{"id": str(uuid.uuid4()), "created_at": stamp(i), "updated_at": stamp(i),
+               "title": f"Place {i}", "description": "Synthetic", "price": random.uniform(10, 1000),
+               "latitude": random.uniform(-90, 90), "longitude": random.uniform(-180, 180),
+               "owner_id": random.choice(users)["id"]} for i in range(n_places)]
+    insert_chunks(Place.__table__, places)
+
+    amenities = [{"id": str(uuid.uuid4()), "created_at": now, "updated_at": now,
+                  "name": f"Amenity {i}"} for i in range(n_amenities)]
+    insert_chunks(Amenity.__table__, amenities)
+
+    links = [{"place_id": p["id"], "amenity_id": a["id"]}
+             for p in places for a in random.sample(amenities, min(3, n_amenities))]
+    insert_chunks(place_amenity, links)
+
+    reviews = ({"id": str(uuid.uuid4()), "created_at": stamp(i), "updated_at": stamp(i),
+                "text": "Synthetic review", "rating": random.randint(1, 5),
+                "place_id": random.choice(places)["id"], "user_id": random.choice(users)["id"]}
+               for i in range(n_reviews))
+    chunk = []
+    for row in reviews:
+        chunk.append(row)
+        if len(chunk) == 50000:
+            insert_chunks(Review.__table__, chunk)
+            chunk = []
+    insert_chunks(Review.__table__, chunk)
+
+    return users, places, amenities
+
+
+def time_queries(params, repeat):
+    """Median milliseconds per query, plus SQLite's plan for each"""
+    results = {}
+    for label, sql, key in QUERIES:
+        timings = []
+        for _ in range(repeat):
+            args = {key: random.choice(params[key])}
+            start = time.perf_counter()
+            db.session.execute(text(sql), args).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        plan = db.session.execute(text("EXPLAIN QUERY PLAN " + sql), args).fetchall()
+        results[label] = (statistics.median(timings), " / ".join(row[-1] for row in plan))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=1000000)
+    parser.add_argument("--places", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--amenities", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    random.seed(0)
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    app = create_app(make_config(path))
+    try:
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                # Recreate a database from before migration 1
+                for name in HOT_PATH_INDEXES:
+                    declared_index(name).drop(connection, checkfirst=True)
+
+            print(f"Populating {args.reviews} reviews, {args.places} places, {args.users} users...")
+            start = time.perf_counter()
+            users, places, amenities = populate(args.users, args.places, args.amenities, args.reviews)
+            print(f"  done in {time.perf_counter() - start:.1f}s")
+            params = {
+                "place_id": [p["id"] for p in places],
+                "user_id": [u["id"] for u in users],
+                "low": [p["price"] for p in places],
+                "amenity_id": [a["id"] for a in amenities],
+            }
+            review_count = db.session.execute(text("SELECT COUNT(*) FROM reviews")).scalar()
+
+            before = time_queries(params, args.repeat)
+            start = time.perf_counter()
+            applied = upgrade(db.engine)
+            migrate_seconds = time.perf_counter() - start
+            # Reconnect so no statement prepared against the old schema is reused
+            db.session.remove()
+            db.engine.dispose()
+            after = time_queries(params, args.repeat)
+
+            assert db.session.execute(text("SELECT COUNT(*) FROM reviews")).scalar() == review_count
+            print(f"Applied migrations {applied} in {migrate_seconds:.1f}s, {review_count} reviews preserved\n")
+            print(f"{'query':<24}{'scan ms':>10}{'seek ms':>10}{'speedup':>10}")
+            for label, _, _ in QUERIES:
+                scan_ms, seek_ms = before[label][0], after[label][0]
+                print(f"{label:<24}{scan_ms:>10.3f}{seek_ms:>10.3f}{scan_ms / max(seek_ms, 1e-6):>9.0f}x")
+            print("\nQuery plans (before -> after):")
+            for label, _, _ in QUERIES:
+                print(f"  {label}: {before[label][1]} -> {after[label][1]}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
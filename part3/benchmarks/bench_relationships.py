@@ -0,0 +1,82 @@
+"""
+Cost of the relationship collections at many reviews per place.
+
+For each --reviews size, stores that many reviews of a single place, loads
+the place with its reviews, then times the in-session collection work
+that flushes do not account for: Place.add_review of new reviews (its
+membership check included), `in` checks of stored reviews, and removals
+of stored reviews from either side of the relationship. With list
+collections they all grow linearly with the size of the place; with
+OrderedSet all but reviews_r.remove() stay flat: removing from the
+one-to-many side, SQLAlchemy's backref handler still walks the
+collection to look for duplicates, whereas setting review.place_r to
+None does not. Only the models and the facade are used, so the same
+script runs on older commits.
+
+    cd part3
+    python -m benchmarks.bench_relationships --reviews 1000 10000 50000
+"""
+import argparse
+import random
+import time
+
+
+def timed(operation, items):
+    started = time.perf_counter()
+    for item in items:
+        operation(item)
+    return (time.perf_counter() - started) / len(items)
+
+
+def run(size, operations, rng):
+    from app import create_app, db
+    from app.models.place import Place
+    from app.models.review import Review
+    from app.services import facade
+
+    app = create_app('config.TestingConfig')
+    with app.app_context():
+        db.create_all()
+        user = facade.create_user({'first_name': 'Bench', 'last_name': 'Mark',
+                                   'email': 'bench@relationships.io', 'password': 'password'})
+        place = facade.create_place({'title': 'Busy place', 'description': 'Many reviews', 'price': 100,
+                                     'latitude': 10.0, 'longitude': 10.0, 'owner_id': user.id})
+        user_id, place_id = user.id, place.id
+        for start in range(0, size, 5000):
+            facade.create_reviews([{'text': 'Review', 'rating': rng.randint(1, 5),
+                                    'user_id': user_id, 'place_id': place_id}
+                                   for _ in range(start, min(size, start + 5000))])
+        db.session.expunge_all()
+
+        place = db.session.get(Place, place_id)
+        stored = list(place.reviews_r)
+        assert len(stored) == size, f'{len(stored)} reviews loaded, {size} stored'
+        # Detached from the place, so that add_review appends to the collection only
+        new = [Review(text='New review', rating=5, place_id=place_id, user_id=user_id) for _ in range(operations)]
+        picked = rng.sample(stored, 2 * operations)
+        with db.session.no_autoflush:
+            add = timed(place.add_review, new)
+            contains = timed(lambda review: review in place.reviews_r, picked)
+            remove = timed(place.reviews_r.remove, picked[:operations])
+            detach = timed(lambda review: setattr(review, 'place_r', None), picked[operations:])
+        db.session.rollback()
+        db.session.remove()
+        db.drop_all()
+    return add, contains, remove, detach
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reviews', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--operations', type=int, default=500, help='reviews added, checked, and removed each way')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'reviews':>8}  {'add us':>8}  {'in us':>8}  {'remove us':>10}  {'detach us':>10}")
+    for size in args.reviews:
+        add, contains, remove, detach = run(size, min(args.operations, size // 2), random.Random(args.seed))
+        print(f"{size:>8}  {add * 1e6:>8.1f}  {contains * 1e6:>8.1f}  {remove * 1e6:>10.1f}  {detach * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
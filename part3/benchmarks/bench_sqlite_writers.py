@@ -0,0 +1,150 @@
+"""
+Concurrent writers on one SQLite file: default settings vs the tuned profile.
+
+For each profile, fills a fresh database file, then starts --writers
+processes creating reviews and updating places through the facade, and
+--readers processes reading places and their reviews, all for --seconds.
+Each process has its own app and engine, as the workers of a WSGI server
+would. Reports writes and reads per second, write latency and the
+writes that failed, "database is locked" errors included.
+
+Profiles:
+    default   Config: SQLAlchemy's default pool, SQLite in rollback-journal
+              mode with synchronous=FULL
+    tuned     ProductionConfig: pool options and SQLITE_TUNED_PRAGMAS (WAL,
+              synchronous=NORMAL, busy_timeout, mmap_size, cache_size)
+
+    cd part3
+    python -m benchmarks.bench_sqlite_writers --writers 1 4 8 --readers 4 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+PROFILES = ('default', 'tuned')
+
+
+def make_app(profile, path):
+    from app import create_app
+    from config import Config, ProductionConfig
+    base = ProductionConfig if profile == 'tuned' else Config
+    return create_app(type('BenchConfig', (base,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'BCRYPT_LOG_ROUNDS': 4,
+        'PASSWORD_HASH_WORKERS': 0,
+        'QUERY_STATS': False,
+        'METRICS': False,
+        # Every process must see the others' writes
+        'ENTITY_CACHE': {},
+    }))
+
+
+def populate(profile, path, users, places):
+    from app import db
+    from app.services import facade
+    app = make_app(profile, path)
+    with app.app_context():
+        db.create_all()
+        user_ids = [facade.create_user({'first_name': 'Bench', 'last_name': 'Writer',
+                                        'email': f'writer{i}@sqlite.io', 'password': 'password'}).id
+                    for i in range(users)]
+        place_ids = [facade.create_place({'title': f'Place {i}', 'description': 'Contended place', 'price': 100,
+                                          'latitude': 10.0, 'longitude': 10.0,
+                                          'owner_id': user_ids[i % users]}).id
+                     for i in range(places)]
+        db.session.remove()
+        db.engine.dispose()
+    return user_ids, place_ids
+
+
+def worker(role, profile, path, ids, seed, start_at, seconds, results):
+    from app import db
+    from app.services import facade
+    user_ids, place_ids = ids
+    rng = random.Random(seed)
+    app = make_app(profile, path)
+    timings, errors = [], []
+    with app.app_context():
+        while time.time() < start_at:
+            time.sleep(0.001)
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if role == 'reader':
+                    facade.get_place(rng.choice(place_ids))
+                    list(facade.get_reviews_by_place(rng.choice(place_ids)))
+                elif rng.random() < 0.8:
+                    facade.create_review({'text': 'Concurrent review', 'rating': rng.randint(1, 5),
+                                          'user_id': rng.choice(user_ids), 'place_id': rng.choice(place_ids)})
+                else:
+                    facade.update_place(rng.choice(place_ids), {'price': rng.randint(10, 1000)})
+            except Exception as e:
+                db.session.rollback()
+                errors.append(type(e).__name__ + (': database is locked' if 'locked' in str(e) else ''))
+                continue
+            finally:
+                db.session.remove()
+            timings.append(time.perf_counter() - started)
+        db.engine.dispose()
+    results.put((role, timings, errors))
+
+
+def run(profile, writers, args):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        ids = populate(profile, path, args.users, args.places)
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        start_at = time.time() + 2 + 0.2 * (writers + args.readers)
+        roles = ['writer'] * writers + ['reader'] * args.readers
+        processes = [context.Process(target=worker, args=(role, profile, path, ids, args.seed + n, start_at,
+                                                          args.seconds, results))
+                     for n, role in enumerate(roles)]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    writes = sorted(t for role, timings, _ in collected if role == 'writer' for t in timings)
+    reads = sum(len(timings) for role, timings, _ in collected if role == 'reader')
+    errors = [e for role, _, errs in collected if role == 'writer' for e in errs]
+    errors += [e for role, _, errs in collected if role == 'reader' for e in errs]
+    p50 = statistics.median(writes) * 1e3 if writes else float('nan')
+    p99 = writes[int(len(writes) * 0.99)] * 1e3 if writes else float('nan')
+    print(f"{profile:<8}  {writers:>7}  {len(writes) / args.seconds:>9.0f}  {reads / args.seconds:>8.0f}"
+          f"  {p50:>8.2f}  {p99:>8.2f}  {len(errors):>6}")
+    for message in sorted(set(errors))[:5]:
+        print(f"          {errors.count(message)} x {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--places', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'profile':<8}  {'writers':>7}  {'writes/s':>9}  {'reads/s':>8}  {'p50 ms':>8}  {'p99 ms':>8}  {'errors':>6}")
+    for writers in args.writers:
+        for profile in args.profiles:
+            run(profile, writers, args)
+
+
+if __name__ == '__main__':
+    main()
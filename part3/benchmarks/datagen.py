@@ -0,0 +1,72 @@
+"""
+Deterministic synthetic data for the benchmarks.
+
+Entities come out as plain dicts, independent of either backend, with
+ids derived from (kind, index) so that both backends hold the same rows
+and a benchmark can pick an existing id without keeping every row in
+memory. size is the number of places; a dataset also has size / 10
+users, one review per place on average and 10 to 100 amenities.
+"""
+import random
+import uuid
+
+NAMESPACE = uuid.UUID('6f1c2a4e-3b7d-4c8e-9a10-5d2f3e4b6c7a')
+# Collection name -> kind used in ids
+KINDS = {'users': 'user', 'amenities': 'amenity', 'places': 'place', 'reviews': 'review'}
+
+
+def entity_id(kind, index):
+    return str(uuid.uuid5(NAMESPACE, f'{kind}-{index}'))
+
+
+def email(index):
+    return f'user{index}@bench.io'
+
+
+class Dataset:
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.seed = seed
+        self.counts = {
+            'users': max(1, size // 10),
+            'amenities': min(100, max(10, size // 1000)),
+            'places': size,
+            'reviews': size,
+        }
+
+    def _random(self, kind):
+        return random.Random(f'{self.seed}-{kind}')
+
+    def users(self):
+        for i in range(self.counts['users']):
+            yield {'id': entity_id('user', i), 'first_name': f'First{i % 1000}', 'last_name': f'Last{i % 997}',
+                   'email': email(i)}
+
+    def amenities(self):
+        for i in range(self.counts['amenities']):
+            yield {'id': entity_id('amenity', i), 'name': f'Amenity {i}'}
+
+    def places(self):
+        rng = self._random('places')
+        for i in range(self.counts['places']):
+            yield {
+                'id': entity_id('place', i), 'title': f'Place {i}', 'description': 'Synthetic place',
+                'price': round(rng.uniform(10, 1000), 2),
+                'latitude': rng.uniform(-60, 70), 'longitude': rng.uniform(-180, 180),
+                'owner_id': entity_id('user', rng.randrange(self.counts['users'])),
+                'amenity_ids': [entity_id('amenity', a)
+                                for a in rng.sample(range(self.counts['amenities']), 3)],
+            }
+
+    def reviews(self):
+        rng = self._random('reviews')
+        for i in range(self.counts['reviews']):
+            yield {
+                'id': entity_id('review', i), 'text': 'Synthetic review', 'rating': rng.randint(1, 5),
+                'place_id': entity_id('place', rng.randrange(self.counts['places'])),
+                'user_id': entity_id('user', rng.randrange(self.counts['users'])),
+            }
+
+    def sample_ids(self, kind, n, rng):
+        """n random existing ids of a collection ('users', 'places'...)"""
+        return [entity_id(KINDS[kind], rng.randrange(self.counts[kind])) for _ in range(n)]
@@ -1,15 +1,95 @@
 import os
+import tempfile
 
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
     DEBUG = False
+    # Cursor pagination on list endpoints (?limit=&cursor=)
+    PAGE_SIZE_DEFAULT = 50
+    PAGE_SIZE_MAX = 500
+    # Rows fetched per round trip when streaming NDJSON exports
+    STREAM_BATCH_SIZE = 1000
+    # Largest payload accepted by the POST .../batch endpoints
+    BATCH_MAX_ITEMS = 10000
+    # bcrypt cost factor, each +1 doubles the hashing time
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    # Process pool hashing passwords off the request threads, 0 workers hashes inline
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    # Hashes queued or running before new signups get a 503
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 4 * (os.cpu_count() or 1)))
+    # Seconds a request waits for its hash before giving up with a 503
+    PASSWORD_HASH_TIMEOUT = 10
+    # Count the SQL statements of each request and report them in Server-Timing
+    QUERY_STATS = True
+    # Log a warning when one statement runs more than this many times in a request
+    QUERY_REPEAT_WARNING = 10
+    # Record request latency, status and DB time per route and serve them on /metrics
+    METRICS = True
+    # Profiling (app/profiling.py), entirely off unless a token or a sample rate is set
+    PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_MODE = os.getenv('PROFILE_MODE', 'sampling')
+    PROFILE_SAMPLE_INTERVAL = 0.005
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'hbnb-profiles'))
+    PROFILE_KEEP = 100
+    # Facade read-through cache per entity type, a type left out is not cached
+    ENTITY_CACHE = {
+        'amenity': {'max_size': 1024, 'ttl': 3600},
+        'place': {'max_size': 10000, 'ttl': 60},
+        'user': {'max_size': 10000, 'ttl': 60},
+    }
+    # Rebuild the full-text index at startup if a VACUUM renumbered the rowids of places
+    SEARCH_INDEX_CHECK = True
+    # PRAGMAs run on every new SQLite connection (app/pragmas.py), none by default
+    SQLITE_PRAGMAS = {}
+
+# Concurrent writers on an SQLite file: WAL lets reads go on during a write,
+# NORMAL syncs at checkpoints only (a power cut may lose the last commits,
+# never corrupt the file), busy_timeout waits up to 5 s for the write lock
+# instead of raising "database is locked", and mmap/cache keep the hot pages
+# in memory. Sizes are in bytes for mmap_size, in KiB when cache_size < 0.
+SQLITE_TUNED_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
 
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///development.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+class ProductionConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///production.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Pooled connections: pool_size kept open, max_overflow more under load, a
+    # checkout waits pool_timeout seconds for one. pre_ping replaces connections
+    # the server closed, recycle drops them before a server-side idle timeout.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': 30,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    }
+    # Only applied when DATABASE_URL is an SQLite file
+    SQLITE_PRAGMAS = SQLITE_TUNED_PRAGMAS
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    BCRYPT_LOG_ROUNDS = 4
+    PASSWORD_HASH_WORKERS = 0
+    PROFILE_TOKEN = None
+    PROFILE_SAMPLE_RATE = 0
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
 config = {
     'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig,
     'default': DevelopmentConfig
 }
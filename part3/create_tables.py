@@ -1,4 +1,5 @@
 from app import create_app, db
+from app.persistence.migrations import upgrade
 
 # Create the Flask app
 app = create_app()
@@ -7,3 +8,6 @@ app = create_app()
 with app.app_context():
     db.create_all()
     print("✅ All tables created successfully.")
+    # Bring tables that already existed up to date with the models
+    for version in upgrade(db.engine):
+        print(f"✅ Applied migration {version}.")
@@ -0,0 +1,14 @@
+from app import create_app, db
+from app.persistence.migrations import MIGRATIONS, upgrade
+
+# Create the Flask app
+app = create_app()
+
+# Apply pending schema migrations to the existing database
+with app.app_context():
+    applied = upgrade(db.engine)
+    descriptions = dict((number, description) for number, description, _ in MIGRATIONS)
+    for version in applied:
+        print(f"✅ Applied migration {version}: {descriptions[version]}")
+    if not applied:
+        print("✅ Database schema is up to date.")
@@ -0,0 +1,17 @@
+from sqlalchemy import text
+from app import create_app, db
+from app.persistence import search
+
+# Create the Flask app
+app = create_app()
+
+# Re-index every place, e.g. after importing rows with the triggers missing
+with app.app_context():
+    with db.engine.begin() as connection:
+        if not search.is_supported(connection):
+            print("⚠️  Full-text search needs SQLite FTS5, nothing to rebuild.")
+        else:
+            search.install(connection)
+            search.rebuild(connection)
+            count = connection.execute(text("SELECT COUNT(*) FROM places")).scalar()
+            print(f"✅ Search index rebuilt for {count} places.")
@@ -0,0 +1,10 @@
+from app import create_app
+from app.services import facade
+
+# Create the Flask app
+app = create_app()
+
+# Recompute the review count, rating sum and histogram stored on every place
+with app.app_context():
+    repaired = facade.repair_review_stats()
+    print(f"✅ Review aggregates repaired on {repaired} place(s).")
@@ -25,9 +25,20 @@ CREATE TABLE `places` (
 `price` float NOT NULL,
 `latitude` float NOT NULL,
 `longitude` float NOT NULL,
+`geohash` varchar(12) DEFAULT NULL,
 `owner_id` varchar(60) NOT NULL,
+`review_count` int NOT NULL DEFAULT 0,
+`rating_sum` int NOT NULL DEFAULT 0,
+`rating_1` int NOT NULL DEFAULT 0,
+`rating_2` int NOT NULL DEFAULT 0,
+`rating_3` int NOT NULL DEFAULT 0,
+`rating_4` int NOT NULL DEFAULT 0,
+`rating_5` int NOT NULL DEFAULT 0,
 PRIMARY KEY (`id`),
 KEY `owner_id` (`owner_id`),
+KEY `ix_places_price` (`price`),
+KEY `ix_places_geohash` (`geohash`),
+KEY `ix_places_created_at_id` (`created_at`, `id`),
 CONSTRAINT `places_ibfk_1` FOREIGN KEY (`owner_id`) REFERENCES `users` (`id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
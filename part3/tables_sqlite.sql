@@ -5,6 +5,7 @@
 PRAGMA foreign_keys = ON;
 
 -- Drop tables in reverse order to avoid foreign key constraint issues
+DROP TABLE IF EXISTS places_fts;
 DROP TABLE IF EXISTS place_amenity;
 DROP TABLE IF EXISTS reviews;
 DROP TABLE IF EXISTS amenities;
@@ -33,7 +34,15 @@ CREATE TABLE places (
     price DECIMAL(10, 2) NOT NULL,
     latitude FLOAT NOT NULL,
     longitude FLOAT NOT NULL,
+    geohash VARCHAR(12),
     owner_id CHAR(36) NOT NULL,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum INTEGER NOT NULL DEFAULT 0,
+    rating_1 INTEGER NOT NULL DEFAULT 0,
+    rating_2 INTEGER NOT NULL DEFAULT 0,
+    rating_3 INTEGER NOT NULL DEFAULT 0,
+    rating_4 INTEGER NOT NULL DEFAULT 0,
+    rating_5 INTEGER NOT NULL DEFAULT 0,
     FOREIGN KEY (owner_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
@@ -68,11 +77,38 @@ CREATE TABLE place_amenity (
     FOREIGN KEY (amenity_id) REFERENCES amenities(id) ON DELETE CASCADE
 );
 
--- Create indexes for better performance
-CREATE INDEX idx_places_owner_id ON places(owner_id);
-CREATE INDEX idx_reviews_place_id ON reviews(place_id);
-CREATE INDEX idx_reviews_user_id ON reviews(user_id);
-CREATE INDEX idx_place_amenity_amenity_id ON place_amenity(amenity_id);
+-- Create indexes for better performance (names match the SQLAlchemy models)
+CREATE INDEX ix_places_owner_id ON places(owner_id);
+CREATE INDEX ix_places_price ON places(price, id);
+CREATE INDEX ix_places_geohash ON places(geohash);
+CREATE INDEX ix_reviews_place_id ON reviews(place_id);
+CREATE INDEX ix_reviews_user_id ON reviews(user_id);
+CREATE INDEX ix_place_amenity_amenity_id ON place_amenity(amenity_id);
+
+-- Keyset pagination order for the list endpoints
+CREATE INDEX ix_users_created_at_id ON users(created_at, id);
+CREATE INDEX ix_places_created_at_id ON places(created_at, id);
+CREATE INDEX ix_reviews_created_at_id ON reviews(created_at, id);
+CREATE INDEX ix_amenities_created_at_id ON amenities(created_at, id);
+
+-- Full-text index over place titles and descriptions (app/persistence/search.py)
+CREATE VIRTUAL TABLE places_fts USING fts5(
+    title, description,
+    content='places', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER places_fts_insert AFTER INSERT ON places BEGIN
+    INSERT INTO places_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+CREATE TRIGGER places_fts_delete AFTER DELETE ON places BEGIN
+    INSERT INTO places_fts(places_fts, rowid, title, description)
+    VALUES ('delete', old.rowid, old.title, old.description);
+END;
+CREATE TRIGGER places_fts_update AFTER UPDATE OF title, description ON places BEGIN
+    INSERT INTO places_fts(places_fts, rowid, title, description)
+    VALUES ('delete', old.rowid, old.title, old.description);
+    INSERT INTO places_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
 
 -- ========================================
 -- INITIAL DATA INSERTION
@@ -0,0 +1,118 @@
+import unittest
+
+from app import create_app, db
+from app.persistence.cache import LRUCache
+from app.services import facade
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        """Test the entry touched least recently is evicted first"""
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire_after_ttl(self):
+        """Test an entry older than the TTL counts as a miss"""
+        clock = FakeClock()
+        cache = LRUCache(max_size=10, ttl=5, clock=clock)
+        cache.set("a", 1)
+        clock.now = 4
+        self.assertEqual(cache.get("a"), 1)
+        clock.now = 5
+        self.assertIsNone(cache.get("a"))
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expirations"]), (1, 1, 1))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+
+class TestFacadeEntityCache(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def new_session(self):
+        """Drop the identity map, as a new request would"""
+        db.session.remove()
+
+    def test_get_amenity_reads_through(self):
+        """Test the second lookup of an amenity is served from the cache"""
+        amenity_id = facade.create_amenity({"name": "Wi-Fi"}).id
+        self.new_session()
+
+        self.assertEqual(facade.get_amenity(amenity_id).name, "Wi-Fi")
+        self.new_session()
+        self.assertEqual(facade.get_amenity(amenity_id).name, "Wi-Fi")
+
+        stats = facade.cache.stats()["amenity"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_cached_place_loads_relationships(self):
+        """Test a place rebuilt from the cache still lazy loads current relationships"""
+        user = facade.create_user({
+            "first_name": "Cache",
+            "last_name": "Owner",
+            "email": "cache.owner@example.com",
+            "password": "password",
+        })
+        place_id = facade.create_place({
+            "title": "Cached",
+            "description": "Cached place",
+            "price": 50,
+            "latitude": 0.0,
+            "longitude": 0.0,
+            "owner_id": user.id,
+        }).id
+        amenity_id = facade.create_amenity({"name": "Pool"}).id
+        self.new_session()
+        facade.get_place(place_id)
+        self.new_session()
+
+        facade.add_amenities_to_place(place_id, [amenity_id])
+        self.new_session()
+        place = facade.get_place(place_id)
+        self.assertEqual([a.name for a in place.amenities_r], ["Pool"])
+        self.assertEqual(place.owner_r.email, "cache.owner@example.com")
+
+    def test_update_invalidates(self):
+        """Test an update through the facade is visible on the next lookup"""
+        amenity_id = facade.create_amenity({"name": "Wi-Fi"}).id
+        self.new_session()
+        facade.get_amenity(amenity_id)
+        self.new_session()
+
+        facade.update_amenity(amenity_id, {"name": "Fast Wi-Fi"})
+        self.new_session()
+        self.assertEqual(facade.get_amenity(amenity_id).name, "Fast Wi-Fi")
+
+        facade.delete_amenity(amenity_id)
+        self.new_session()
+        self.assertIsNone(facade.get_amenity(amenity_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from app.persistence import geo
+
+
+class TestGeo(unittest.TestCase):
+    def test_encode(self):
+        """Test the geohash of a known point and that prefixes name enclosing cells"""
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+        self.assertTrue(geo.encode(57.64911, 10.40744).startswith("u4pruydqqvj"))
+
+    def test_prefix_end(self):
+        """Test the range bound of a prefix, with carries past 'z'"""
+        self.assertEqual(geo.prefix_end("u09t"), "u09u")
+        self.assertEqual(geo.prefix_end("u09z"), "u0b")
+        self.assertEqual(geo.prefix_end("9"), "b")
+        self.assertIsNone(geo.prefix_end("zz"))
+
+    def test_haversine(self):
+        """Test the distance between Paris and London"""
+        self.assertAlmostEqual(geo.haversine_km(48.8566, 2.3522, 51.5074, -0.1278), 343.5, delta=1)
+
+    def test_covering_prefixes_contain_box(self):
+        """Test every point of a box falls in one of its covering cells"""
+        boxes = geo.radius_bbox(48.8566, 2.3522, 5)
+        prefixes = geo.covering_prefixes(boxes)
+        self.assertTrue(0 < len(prefixes) <= 16)
+        min_lat, min_lng, max_lat, max_lng = boxes[0]
+        for i in range(11):
+            for j in range(11):
+                point = geo.encode(min_lat + (max_lat - min_lat) * i / 10, min_lng + (max_lng - min_lng) * j / 10)
+                self.assertTrue(any(point.startswith(prefix) for prefix in prefixes))
+
+    def test_radius_bbox_wraps(self):
+        """Test a circle crossing the antimeridian or a pole"""
+        self.assertEqual(len(geo.radius_bbox(0, 179.9, 50)), 2)
+        self.assertEqual(geo.radius_bbox(89.9, 0, 50), [(geo.radius_bbox(89.9, 0, 50)[0][0], -180.0, 90.0, 180.0)])
+        self.assertEqual(geo.covering_prefixes([(-90, -180, 90, 180)]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
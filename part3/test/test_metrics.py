@@ -0,0 +1,83 @@
+import unittest
+
+from app import create_app, db, metrics
+from config import TestingConfig
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def scrape(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        samples = {}
+        for line in response.data.decode().splitlines():
+            if not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                samples[name] = float(value)
+        return samples
+
+    def test_request_metrics(self):
+        """Test latency, DB time and status codes are recorded per route"""
+        self.client.get("/api/v1/users/")
+        self.client.get("/api/v1/users/")
+        self.client.get("/api/v1/users/unknown")
+        self.client.get("/no/such/route")
+        samples = self.scrape()
+
+        users = 'route="/api/v1/users/",method="GET"'
+        self.assertEqual(samples[f'hbnb_http_request_duration_seconds_count{{{users}}}'], 2)
+        self.assertEqual(samples[f'hbnb_http_request_duration_seconds_bucket{{{users},le="+Inf"}}'], 2)
+        self.assertGreater(samples[f'hbnb_http_request_duration_seconds_sum{{{users}}}'], 0)
+        self.assertEqual(samples[f'hbnb_http_request_db_seconds_count{{{users}}}'], 2)
+        self.assertEqual(samples[f'hbnb_http_responses_total{{{users},status="200"}}'], 2)
+        self.assertEqual(samples[f'hbnb_http_requests_in_flight{{{users}}}'], 0)
+        self.assertEqual(
+            samples['hbnb_http_responses_total{route="/api/v1/users/<user_id>",method="GET",status="404"}'], 1
+        )
+        self.assertEqual(samples['hbnb_http_responses_total{route="<unmatched>",method="GET",status="404"}'], 1)
+
+    def test_routes_are_preregistered(self):
+        """Test every route is exported before its first request"""
+        samples = self.scrape()
+        self.assertEqual(samples['hbnb_http_request_duration_seconds_count{route="/api/v1/places/",method="POST"}'], 0)
+
+    def test_series_are_bounded(self):
+        """Test made-up methods and paths are recorded without adding series"""
+        routes = set(metrics._routes)
+        for i in range(20):
+            self.client.open(f"/no/such/route/{i}", method=f"MADEUP{i}")
+            self.client.open("/api/v1/users/", method=f"MADEUP{i}")
+            self.client.open(f"/api/v1/users/{i}", method="HEAD")
+        samples = self.scrape()
+
+        self.assertEqual(set(metrics._routes), routes)
+        self.assertEqual(samples['hbnb_http_request_duration_seconds_count{route="<unmatched>",method="other"}'], 40)
+        self.assertEqual(samples['hbnb_http_request_duration_seconds_count{route="<unmatched>",method="HEAD"}'], 20)
+        self.assertNotIn("MADEUP", "".join(samples))
+
+    def test_process_gauges(self):
+        """Test the pool, password hashing and cache gauges are exported"""
+        samples = self.scrape()
+        self.assertGreaterEqual(samples["hbnb_db_pool_checkout_seconds_count"], 1)
+        self.assertEqual(samples["hbnb_password_hash_pending"], 0)
+        self.assertIn('hbnb_cache_hit_ratio{kind="place"}', samples)
+
+    def test_disabled(self):
+        app = create_app(type("NoMetrics", (TestingConfig,), {"METRICS": False}))
+        self.assertEqual(app.test_client().get("/metrics").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from unittest import mock
+
+from sqlalchemy import event, text
+
+from app import create_app, db
+from app.persistence.migrations import (
+    HOT_PATH_INDEXES, LEGACY_INDEXES, MIGRATIONS, current_version, declared_index, drop_indexes, upgrade
+)
+from app.persistence import geo
+from app.services import facade
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("config.TestingConfig")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        # Recreate a database from before the indexes were declared
+        with db.engine.begin() as connection:
+            for name in HOT_PATH_INDEXES + ('ix_places_average_rating',):
+                declared_index(name).drop(connection)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def index_names(self):
+        # The inspector skips expression indexes, sqlite_master lists them all
+        with db.engine.connect() as connection:
+            return set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+
+    def test_upgrade_adds_indexes_without_data_loss(self):
+        """Test upgrading a populated unversioned database adds the indexes"""
+        user = facade.create_user({
+            "first_name": "Kept",
+            "last_name": "User",
+            "email": "kept@example.com",
+            "password": "password",
+        })
+        user_id = user.id
+        db.session.remove()
+
+        self.assertEqual(upgrade(db.engine), [number for number, _, _ in MIGRATIONS])
+        self.assertTrue(set(HOT_PATH_INDEXES) | {"ix_places_average_rating"} <= self.index_names())
+        self.assertEqual(facade.get_user(user_id).email, "kept@example.com")
+
+    def test_upgrade_drops_legacy_indexes(self):
+        """Test the idx_* indexes of the old SQL script are replaced, not duplicated"""
+        with db.engine.begin() as connection:
+            connection.execute(text("CREATE INDEX idx_places_owner_id ON places(owner_id)"))
+            connection.execute(text("CREATE INDEX idx_reviews_place_id ON reviews(place_id)"))
+            connection.execute(text("CREATE INDEX idx_reviews_user_id ON reviews(user_id)"))
+            connection.execute(text("CREATE INDEX idx_place_amenity_amenity_id ON place_amenity(amenity_id)"))
+
+        upgrade(db.engine)
+        names = self.index_names()
+        self.assertFalse(set(LEGACY_INDEXES) & names)
+        self.assertTrue(set(HOT_PATH_INDEXES) <= names)
+
+    def test_upgrade_backfills_geohash(self):
+        """Test migration 2 adds places.geohash to an old table and fills it in"""
+        user = facade.create_user({
+            "first_name": "Geo",
+            "last_name": "Owner",
+            "email": "geo@example.com",
+            "password": "password",
+        })
+        place = facade.create_place({
+            "title": "Old Place",
+            "description": "Stored before the geohash column",
+            "price": 50.0,
+            "latitude": 48.8606,
+            "longitude": 2.3376,
+            "owner_id": user.id,
+        })
+        place_id = place.id
+        db.session.remove()
+        with db.engine.begin() as connection:
+            connection.execute(text("DROP INDEX ix_places_geohash"))
+            connection.execute(text("ALTER TABLE places DROP COLUMN geohash"))
+
+        upgrade(db.engine)
+        self.assertIn("ix_places_geohash", self.index_names())
+        self.assertEqual(facade.get_place(place_id).geohash, geo.encode(48.8606, 2.3376))
+        self.assertEqual([p.id for p, _ in facade.search_places(48.86, 2.34, radius_km=1)], [place_id])
+
+    def test_drop_indexes_without_if_exists(self):
+        """Test dialects without DROP INDEX IF EXISTS, such as MySQL, look the indexes up first"""
+        with db.engine.begin() as connection:
+            connection.execute(text("CREATE INDEX idx_places_owner_id ON places(owner_id)"))
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.strip())
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            with db.engine.begin() as connection, mock.patch.object(connection.dialect, "name", "mysql"):
+                drop_indexes("idx_places_owner_id", "idx_never_created")(connection)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+
+        self.assertNotIn("idx_places_owner_id", self.index_names())
+        self.assertEqual([s for s in statements if s.startswith("DROP")], ["DROP INDEX idx_places_owner_id"])
+
+    def test_upgrade_widens_price_index(self):
+        """Test migration 7 replaces the price-only ix_places_price with the (price, id) one"""
+        with db.engine.begin() as connection:
+            connection.execute(text("CREATE INDEX ix_places_price ON places(price)"))
+            connection.execute(text("CREATE TABLE schema_version (version INTEGER NOT NULL)"))
+            connection.execute(text("INSERT INTO schema_version VALUES (6)"))
+
+        self.assertEqual(upgrade(db.engine), [7])
+        with db.engine.connect() as connection:
+            columns = connection.execute(text("PRAGMA index_info(ix_places_price)")).all()
+        self.assertEqual([column.name for column in columns], ["price", "id"])
+
+    def test_upgrade_is_idempotent(self):
+        """Test a second upgrade applies nothing and keeps the version"""
+        upgrade(db.engine)
+        self.assertEqual(upgrade(db.engine), [])
+        with db.engine.connect() as connection:
+            self.assertEqual(current_version(connection), MIGRATIONS[-1][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+from app import create_app, db
+from app.models.ordered_set import OrderedSet
+from app.models.place import Place
+from app.services import facade
+
+
+class TestOrderedSetRelationships(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("config.TestingConfig")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = facade.create_user({
+            "first_name": "Set",
+            "last_name": "Owner",
+            "email": "set.owner@example.com",
+            "password": "password",
+        })
+        self.place = facade.create_place({
+            "title": "Loft",
+            "description": "A loft",
+            "price": 80,
+            "latitude": 10.0,
+            "longitude": 20.0,
+            "owner_id": self.user.id,
+        })
+        self.reviews = [facade.create_review({
+            "text": f"Review {i}",
+            "rating": 4,
+            "user_id": self.user.id,
+            "place_id": self.place.id,
+        }) for i in range(3)]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_insertion_order_and_membership(self):
+        """Test the collection keeps insertion order and answers `in`"""
+        reviews = self.place.reviews_r
+
+        self.assertIsInstance(reviews, OrderedSet)
+        self.assertEqual(list(reviews), self.reviews)
+        self.assertEqual(len(reviews), 3)
+        self.assertIn(self.reviews[1], reviews)
+        self.assertIs(reviews[0], self.reviews[0])
+        self.assertIs(reviews[-1], self.reviews[-1])
+
+    def test_add_review_once(self):
+        """Test adding a review the place has already is a no-op"""
+        self.place.add_review(self.reviews[0])
+
+        self.assertEqual(len(self.place.reviews_r), 3)
+
+    def test_remove(self):
+        """Test removing a review keeps the others in order and fails like list.remove"""
+        facade.delete_review(self.reviews[1].id)
+
+        self.assertEqual(list(self.place.reviews_r), [self.reviews[0], self.reviews[2]])
+        self.assertNotIn(self.reviews[1], self.user.reviews_r)
+        with self.assertRaises(ValueError):
+            self.place.reviews_r.remove(self.reviews[1])
+
+    def test_reload_and_assign(self):
+        """Test the collection loads from the database and accepts a list"""
+        amenities = [facade.create_amenity({"name": name}) for name in ("Wi-Fi", "Pool")]
+        place_id = self.place.id
+        db.session.expunge_all()
+
+        place = db.session.get(Place, place_id)
+        self.assertEqual([review.text for review in place.reviews_r], ["Review 0", "Review 1", "Review 2"])
+        place.amenities_r = [db.session.merge(amenity) for amenity in amenities]
+        db.session.commit()
+        db.session.expunge_all()
+
+        place = db.session.get(Place, place_id)
+        self.assertEqual(sorted(amenity.name for amenity in place.amenities_r), ["Pool", "Wi-Fi"])
+        self.assertIn(place, place.amenities_r[0].places_r)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from app import create_app, db, passwords
+from app.passwords import PasswordHasher, PasswordHasherBusy
+
+
+class TestPasswordHasher(unittest.TestCase):
+    def test_inline_hash_and_verify(self):
+        """Test hashing in the calling thread when no workers are configured"""
+        hasher = PasswordHasher()
+        hasher.configure(rounds=4, workers=0)
+        pw_hash = hasher.hash("secret")
+
+        self.assertTrue(pw_hash.startswith("$2b$04$"))
+        self.assertTrue(hasher.verify(pw_hash, "secret"))
+        self.assertFalse(hasher.verify(pw_hash, "wrong"))
+        self.assertFalse(hasher.verify("not a hash", "secret"))
+
+    def test_pool_hash_and_verify(self):
+        """Test hashing in a worker process"""
+        hasher = PasswordHasher()
+        hasher.configure(rounds=4, workers=1)
+        try:
+            pw_hash = hasher.hash("secret")
+            self.assertTrue(hasher.verify(pw_hash, "secret"))
+            self.assertFalse(hasher.verify(pw_hash, "wrong"))
+            self.assertEqual(hasher.pending, 0)
+        finally:
+            hasher.shutdown()
+
+    def test_pool_back_pressure(self):
+        """Test a hash is refused while the queue is full, and accepted again once it drains"""
+        hasher = PasswordHasher()
+        hasher.configure(rounds=4, workers=1, max_pending=1)
+        try:
+            hasher.hash("warm up")  # start the worker process
+            hasher.rounds = 14
+            slow = threading.Thread(target=hasher.hash, args=("slow",))
+            slow.start()
+            while hasher.pending == 0:
+                time.sleep(0.001)
+            with self.assertRaises(PasswordHasherBusy):
+                hasher.hash("refused")
+            slow.join()
+
+            hasher.rounds = 4
+            self.assertTrue(hasher.hash("accepted"))
+        finally:
+            hasher.shutdown()
+
+
+class TestSignupBackPressure(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_signup_returns_503_when_saturated(self):
+        """Test a saturated hasher turns a signup into a 503 with Retry-After"""
+        payload = {"first_name": "Busy", "last_name": "User", "email": "busy@example.com", "password": "password"}
+        with mock.patch.object(passwords, "hash", side_effect=PasswordHasherBusy()):
+            response = self.client.post("/api/v1/users/", json=payload)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+
+        # Nothing was stored, the retry succeeds
+        self.assertEqual(self.client.post("/api/v1/users/", json=payload).status_code, 201)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,524 @@
+import json
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text
+
+from app import create_app, db
+from app.persistence import search
+from app.querystats import assert_max_queries
+from app.services import facade
+from config import TestingConfig
+
+
+class TestPlaceEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # Create a test user first to be owner of places
+        user_response = self.client.post(
+            "/api/v1/users/",
+            json={
+                "first_name": "Place",
+                "last_name": "Owner",
+                "email": "place.owner@example.com",
+                "password": "password",
+            },
+        )
+        self.user_data = json.loads(user_response.data)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create_place(self, title, price=100.0, amenities=None, latitude=37.7749, longitude=-122.4194,
+                     description="A place to test"):
+        response = self.client.post(
+            "/api/v1/places/",
+            json={
+                "title": title,
+                "description": description,
+                "price": price,
+                "latitude": latitude,
+                "longitude": longitude,
+                "owner_id": self.user_data["id"],
+                "amenities": amenities or [],
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+        return json.loads(response.data)["place"]
+
+    def test_get_all_places(self):
+        """Test retrieving all places without pagination returns a plain list"""
+        self.create_place("Beach House")
+        response = self.client.get("/api/v1/places/")
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(data, list)
+        self.assertEqual(data[0]["title"], "Beach House")
+
+    def test_get_places_paginated(self):
+        """Test walking every page of places with a cursor"""
+        created = [self.create_place(f"Place {i}")["id"] for i in range(5)]
+
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            url = "/api/v1/places/?limit=2"
+            if cursor:
+                url += f"&cursor={cursor}"
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)
+            self.assertLessEqual(len(data["items"]), 2)
+            seen.extend(item["id"] for item in data["items"])
+            pages += 1
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(seen), sorted(created))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_get_places_invalid_pagination(self):
+        """Test a bad limit or a tampered cursor is rejected"""
+        self.assertEqual(self.client.get("/api/v1/places/?limit=abc").status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/places/?limit=0").status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/places/?cursor=not-a-cursor").status_code, 400)
+
+    def test_get_places_ndjson_stream(self):
+        """Test places are streamed one JSON object per line when NDJSON is requested"""
+        created = [self.create_place(f"Place {i}")["id"] for i in range(3)]
+        response = self.client.get(
+            "/api/v1/places/", headers={"Accept": "application/x-ndjson"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = response.get_data(as_text=True).splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(sorted(row["id"] for row in rows), sorted(created))
+        self.assertIn("amenities", rows[0])
+        self.assertIn("reviews", rows[0])
+
+    def test_get_places_ndjson_sorted(self):
+        """Test the NDJSON stream follows ?sort= and rejects an unknown sort like the JSON listing"""
+        for title, price in (("Mid", 200.0), ("Low", 50.0), ("High", 900.0)):
+            self.create_place(title, price=price)
+        headers = {"Accept": "application/x-ndjson"}
+
+        response = self.client.get("/api/v1/places/?sort=-price", headers=headers)
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([row["title"] for row in rows], ["High", "Mid", "Low"])
+        self.assertEqual(self.client.get("/api/v1/places/?sort=bogus", headers=headers).status_code, 400)
+
+    def create_amenity(self, name):
+        response = self.client.post("/api/v1/amenities/", json={"name": name})
+        return json.loads(response.data)["id"]
+
+    def test_create_place_with_amenities(self):
+        """Test amenities given at creation are linked, unknown IDs are ignored"""
+        wifi = self.create_amenity("Wi-Fi")
+        place = self.create_place("Linked", amenities=[wifi, wifi, "nonexistent-id"])
+
+        data = json.loads(self.client.get(f"/api/v1/places/{place['id']}").data)
+        self.assertEqual([a["id"] for a in data["amenities"]], [wifi])
+
+    def test_add_amenities_to_place(self):
+        """Test several amenities are added in one call without duplicates"""
+        wifi = self.create_amenity("Wi-Fi")
+        pool = self.create_amenity("Pool")
+        place = self.create_place("Linked", amenities=[wifi])
+
+        response = self.client.post(
+            f"/api/v1/places/{place['id']}/add_amenity",
+            json={"amenity_ids": [wifi, pool]},
+        )
+        self.assertEqual(response.status_code, 200)
+        names = sorted(a["name"] for a in json.loads(response.data)["amenities"])
+        self.assertEqual(names, ["Pool", "Wi-Fi"])
+
+        # The single-ID form still works and unknown IDs are a 404
+        response = self.client.post(
+            f"/api/v1/places/{place['id']}/add_amenity", json={"amenity_id": pool}
+        )
+        self.assertEqual(len(json.loads(response.data)["amenities"]), 2)
+        response = self.client.post(
+            f"/api/v1/places/{place['id']}/add_amenity",
+            json={"amenity_ids": [pool, "nonexistent-id"]},
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            self.client.post(f"/api/v1/places/{place['id']}/add_amenity", json={}).status_code,
+            400,
+        )
+
+    def test_create_places_batch(self):
+        """Test a batch creates the valid places and reports the invalid one"""
+        amenity = json.loads(
+            self.client.post("/api/v1/amenities/", json={"name": "Pool"}).data
+        )
+        place = {
+            "description": "Batch place",
+            "price": 90.0,
+            "latitude": 1.0,
+            "longitude": 2.0,
+            "owner_id": self.user_data["id"],
+            "amenities": [amenity["id"]],
+        }
+        response = self.client.post(
+            "/api/v1/places/batch",
+            json=[
+                dict(place, title="First"),
+                dict(place, title="Bad", price=-1),
+                dict(place, title="Second"),
+            ],
+        )
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((data["created"], data["failed"]), (2, 1))
+        self.assertEqual([r["status"] for r in data["results"]], [201, 400, 201])
+
+        created = json.loads(
+            self.client.get(f"/api/v1/places/{data['results'][0]['id']}").data
+        )
+        self.assertEqual(created["title"], "First")
+        self.assertEqual([a["name"] for a in created["amenities"]], ["Pool"])
+
+    def test_create_places_batch_invalid_payload(self):
+        """Test a batch that is not a non-empty array is rejected"""
+        self.assertEqual(self.client.post("/api/v1/places/batch", json={}).status_code, 400)
+        self.assertEqual(self.client.post("/api/v1/places/batch", json=[]).status_code, 400)
+
+    def list_titles(self, query):
+        response = self.client.get(f"/api/v1/places/?{query}")
+        self.assertEqual(response.status_code, 200, response.data)
+        data = json.loads(response.data)
+        return [p["title"] for p in (data["items"] if "items" in data else data)]
+
+    def review(self, place_id, rating):
+        self.client.post(
+            "/api/v1/reviews/",
+            json={"text": "Review", "rating": rating, "user_id": self.user_data["id"], "place_id": place_id},
+        )
+
+    def test_list_places_filtered(self):
+        """Test price, amenity (all of), owner and rating filters"""
+        wifi, pool = self.create_amenity("Wifi"), self.create_amenity("Pool")
+        cheap = self.create_place("Cheap", price=50, amenities=[wifi])
+        self.create_place("Mid", price=150, amenities=[wifi, pool])
+        self.create_place("Luxury", price=500, amenities=[pool])
+        self.review(cheap["id"], 5)
+
+        self.assertEqual(self.list_titles("min_price=100&max_price=200"), ["Mid"])
+        self.assertEqual(sorted(self.list_titles(f"amenity_id={wifi}")), ["Cheap", "Mid"])
+        self.assertEqual(self.list_titles(f"amenity_id={wifi}&amenity_id={pool}"), ["Mid"])
+        self.assertEqual(self.list_titles("min_rating=4"), ["Cheap"])
+        self.assertEqual(len(self.list_titles(f"owner_id={self.user_data['id']}")), 3)
+        self.assertEqual(self.list_titles("owner_id=nobody"), [])
+
+    def test_list_places_sorted(self):
+        """Test sorting by price and rating, with cursor pages following the sort"""
+        places = {title: self.create_place(title, price=price)["id"]
+                  for title, price in (("B", 200), ("A", 100), ("D", 400), ("C", 300))}
+        self.review(places["C"], 5)
+        self.review(places["A"], 4)
+        self.review(places["D"], 1)
+
+        self.assertEqual(self.list_titles("sort=price"), ["A", "B", "C", "D"])
+        self.assertEqual(self.list_titles("sort=-price"), ["D", "C", "B", "A"])
+        self.assertEqual(self.list_titles("sort=-rating"), ["C", "A", "D", "B"])
+
+        titles, cursor = [], None
+        while True:
+            query = "sort=-price&limit=3" + (f"&cursor={cursor}" if cursor else "")
+            data = json.loads(self.client.get(f"/api/v1/places/?{query}").data)
+            titles += [p["title"] for p in data["items"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(titles, ["D", "C", "B", "A"])
+
+        # A cursor only continues the sort it was built for
+        data = json.loads(self.client.get("/api/v1/places/?sort=price&limit=1").data)
+        response = self.client.get(f"/api/v1/places/?sort=-rating&cursor={data['next_cursor']}")
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_places_invalid_filters(self):
+        """Test malformed filters and unknown sorts are rejected"""
+        for query in ("min_price=cheap", "sort=name", "min_rating=-1"):
+            self.assertEqual(self.client.get(f"/api/v1/places/?{query}").status_code, 400, query)
+
+    def create_landmarks(self):
+        self.create_place("Louvre", latitude=48.8606, longitude=2.3376)
+        self.create_place("Eiffel Tower", latitude=48.8584, longitude=2.2945)
+        self.create_place("Versailles", latitude=48.8049, longitude=2.1204)
+        self.create_place("Big Ben", latitude=51.5007, longitude=-0.1246)
+
+    def test_search_places_radius(self):
+        """Test a radius search returns the places within it, nearest first"""
+        self.create_landmarks()
+        response = self.client.get("/api/v1/places/search?lat=48.8566&lng=2.3522&radius_km=10")
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["title"] for p in data], ["Louvre", "Eiffel Tower"])
+        self.assertLess(data[0]["distance_km"], data[1]["distance_km"])
+        self.assertIn("reviews", data[0])
+
+    def test_search_places_nearest(self):
+        """Test a k-nearest search widens until it finds k places"""
+        self.create_landmarks()
+        data = json.loads(self.client.get("/api/v1/places/search?lat=51.5&lng=-0.12&k=2").data)
+
+        self.assertEqual([p["title"] for p in data], ["Big Ben", "Versailles"])
+        self.assertGreater(data[1]["distance_km"], 300)
+
+    def test_search_places_bbox(self):
+        """Test a bounding box search, including one crossing the antimeridian"""
+        self.create_landmarks()
+        self.create_place("Fiji", latitude=-17.7134, longitude=178.0650)
+        self.create_place("Samoa", latitude=-13.7590, longitude=-172.1046)
+
+        data = json.loads(self.client.get("/api/v1/places/search?bbox=2.2,48.8,2.4,48.9").data)
+        self.assertEqual({p["title"] for p in data}, {"Louvre", "Eiffel Tower"})
+
+        data = json.loads(self.client.get("/api/v1/places/search?bbox=170,-20,-170,-10").data)
+        self.assertEqual({p["title"] for p in data}, {"Fiji", "Samoa"})
+
+    def test_search_places_follows_updates(self):
+        """Test moving a place moves it in the search index"""
+        place = self.create_place("Mobile Home", latitude=10.0, longitude=10.0)
+        update = dict(place, latitude=-10.0, amenities=[])
+        del update["id"]
+        self.client.put(f"/api/v1/places/{place['id']}", json=update)
+
+        data = json.loads(self.client.get("/api/v1/places/search?lat=-10&lng=10&radius_km=1").data)
+        self.assertEqual([p["id"] for p in data], [place["id"]])
+        data = json.loads(self.client.get("/api/v1/places/search?lat=10&lng=10&radius_km=1").data)
+        self.assertEqual(data, [])
+
+    def test_search_places_invalid(self):
+        """Test malformed search parameters are rejected"""
+        for query in ("", "lat=10", "lat=x&lng=1", "bbox=1,2,3", "lat=1&lng=1&radius_km=-1", "lat=1&lng=1&k=0"):
+            response = self.client.get(f"/api/v1/places/search?{query}")
+            self.assertEqual(response.status_code, 400, query)
+
+    def text_search(self, query):
+        response = self.client.get("/api/v1/places/search", query_string={"q": query})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def test_search_places_text_ranking(self):
+        """Test a title match ranks above a description match, with a highlighted snippet"""
+        self.create_place("Quiet cabin", description="Wooden cabin near the beach")
+        self.create_place("Beach house", description="Sunny house by the sea")
+        self.create_place("City flat", description="Downtown apartment")
+
+        data = self.text_search("beach")
+        self.assertEqual([p["title"] for p in data], ["Beach house", "Quiet cabin"])
+        self.assertGreater(data[0]["score"], data[1]["score"])
+        self.assertIn("<b>beach</b>", data[1]["snippet"].lower())
+
+        self.assertEqual([p["title"] for p in self.text_search("beach sunny")], ["Beach house"])
+        self.assertEqual([p["title"] for p in self.text_search("apart*")], ["City flat"])
+        self.assertEqual(self.text_search("apart"), [])
+
+    def test_search_places_text_follows_changes(self):
+        """Test the index follows updates and deletes"""
+        place = self.create_place("Old name")
+        update = dict(place, title="Lighthouse", amenities=[])
+        del update["id"]
+        self.client.put(f"/api/v1/places/{place['id']}", json=update)
+
+        self.assertEqual(self.text_search("old"), [])
+        self.assertEqual([p["id"] for p in self.text_search("lighthouse")], [place["id"]])
+        self.client.delete(f"/api/v1/places/{place['id']}")
+        self.assertEqual(self.text_search("lighthouse"), [])
+
+    def test_search_places_text_syntax_is_literal(self):
+        """Test FTS5 operators and quotes in q are searched as plain words"""
+        self.create_place("Cabin AND lake NEAR town")
+        self.assertEqual(len(self.text_search('"cabin" AND NEAR(')), 1)
+        self.assertEqual(self.client.get("/api/v1/places/search?q=%2A%2A").status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/places/search?q=cabin&lat=1&lng=1").status_code, 400)
+
+    def test_search_index_rebuild(self):
+        """Test rebuilding indexes rows written while the triggers were missing"""
+        with db.engine.begin() as connection:
+            search.uninstall(connection)
+        place = self.create_place("Imported castle")
+        with db.engine.begin() as connection:
+            search.install(connection)
+            self.assertEqual(self.text_search("castle"), [])
+            search.rebuild(connection)
+        self.assertEqual([p["id"] for p in self.text_search("castle")], [place["id"]])
+
+    def test_search_index_rebuilt_when_stale(self):
+        """Test places renumbered behind the index's back, as by a VACUUM, are detected and re-indexed"""
+        place = self.create_place("Harbour castle")
+        with db.engine.begin() as connection:
+            self.assertFalse(search.rebuild_if_stale(connection))
+            # Not an update of title or description, the triggers do not run
+            connection.execute(text("UPDATE places SET rowid = rowid + 100"))
+            self.assertTrue(search.is_stale(connection))
+        self.assertEqual(self.text_search("castle"), [])
+
+        with db.engine.begin() as connection:
+            self.assertTrue(search.rebuild_if_stale(connection))
+            self.assertFalse(search.is_stale(connection))
+        self.assertEqual([p["id"] for p in self.text_search("castle")], [place["id"]])
+
+    def test_search_index_checked_at_startup(self):
+        """Test create_app rebuilds a stale index of an existing database"""
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        config = type("FileConfig", (TestingConfig,), {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+        try:
+            with create_app(config).app_context():
+                db.create_all()
+                user = facade.create_user({"first_name": "File", "last_name": "Owner",
+                                           "email": "file.owner@example.com", "password": "password"})
+                facade.create_place({"title": "Harbour castle", "description": "By the sea", "price": 10,
+                                     "latitude": 1.0, "longitude": 1.0, "owner_id": user.id})
+                db.session.remove()
+                with db.engine.begin() as connection:
+                    connection.execute(text("UPDATE places SET rowid = rowid + 100"))
+                db.engine.dispose()
+
+            with create_app(config).app_context():
+                with db.engine.connect() as connection:
+                    self.assertFalse(search.is_stale(connection))
+                db.engine.dispose()
+        finally:
+            os.remove(path)
+
+    def test_get_place_conditional(self):
+        """Test a place answers 304 until one of its reviews changes"""
+        place = self.create_place("Cached House")
+        url = f"/api/v1/places/{place['id']}"
+        response = self.client.get(url)
+        etag = response.headers["ETag"]
+        self.assertIn("Last-Modified", response.headers)
+
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+        self.client.post(
+            "/api/v1/reviews/",
+            json={"text": "Great", "rating": 5, "user_id": self.user_data["id"], "place_id": place["id"]},
+        )
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(len(json.loads(response.data)["reviews"]), 1)
+
+    def test_get_places_list_conditional(self):
+        """Test the place list answers 304 until a place is added"""
+        self.create_place("First")
+        etag = self.client.get("/api/v1/places/").headers["ETag"]
+        self.assertEqual(self.client.get("/api/v1/places/", headers={"If-None-Match": etag}).status_code, 304)
+        # Another query string is another representation
+        self.assertEqual(self.client.get("/api/v1/places/?limit=1", headers={"If-None-Match": etag}).status_code, 200)
+
+        self.create_place("Second")
+        self.assertEqual(self.client.get("/api/v1/places/", headers={"If-None-Match": etag}).status_code, 200)
+
+    def test_update_place_if_match(self):
+        """Test a PUT with a stale If-Match is refused with 412"""
+        place = self.create_place("Versioned")
+        url = f"/api/v1/places/{place['id']}"
+        etag = self.client.get(url).headers["ETag"]
+        update = dict(place, title="Renamed", amenities=[])
+        del update["id"]
+
+        response = self.client.put(url, json=update, headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+        response = self.client.put(url, json=dict(update, title="Lost update"), headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(json.loads(self.client.get(url).data)["title"], "Renamed")
+
+    def test_get_places_sparse_fields(self):
+        """Test ?fields= returns only the asked fields, id always included"""
+        place = self.create_place("Sparse House", price=80)
+        self.review(place["id"], 4)
+        response = self.client.get("/api/v1/places/?fields=title,price,average_rating")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data),
+                         [{"id": place["id"], "title": "Sparse House", "price": 80.0, "average_rating": 4.0}])
+
+        response = self.client.get(f"/api/v1/places/{place['id']}?fields=rating_histogram")
+        self.assertEqual(json.loads(response.data),
+                         {"id": place["id"], "rating_histogram": {"1": 0, "2": 0, "3": 0, "4": 1, "5": 0}})
+
+    def test_get_places_sparse_include(self):
+        """Test ?include= embeds only the asked relations"""
+        place = self.create_place("Included House")
+        self.review(place["id"], 5)
+        data = json.loads(self.client.get("/api/v1/places/?fields=title&include=reviews").data)
+        self.assertEqual(set(data[0]), {"id", "title", "reviews"})
+        self.assertEqual(data[0]["reviews"][0]["rating"], 5)
+
+        data = json.loads(self.client.get(f"/api/v1/places/{place['id']}?include=amenities").data)
+        self.assertEqual(data["amenities"], [])
+        self.assertNotIn("reviews", data)
+
+    def test_get_places_sparse_paginated(self):
+        """Test sparse fields combine with keyset pagination on a computed sort"""
+        for title, rating in (("Good", 4), ("Best", 5), ("Poor", 1)):
+            self.review(self.create_place(title)["id"], rating)
+        data = json.loads(self.client.get("/api/v1/places/?fields=title&sort=-rating&limit=2").data)
+        self.assertEqual([p["title"] for p in data["items"]], ["Best", "Good"])
+        self.assertEqual(set(data["items"][0]), {"id", "title"})
+        data = json.loads(self.client.get(f"/api/v1/places/?fields=title&sort=-rating&limit=2&cursor={data['next_cursor']}").data)
+        self.assertEqual([p["title"] for p in data["items"]], ["Poor"])
+
+    def test_get_places_sparse_invalid(self):
+        """Test unknown fields and relations are refused"""
+        place = self.create_place("Strict House")
+        self.assertEqual(self.client.get("/api/v1/places/?fields=password").status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/places/?include=owner").status_code, 400)
+        self.assertEqual(self.client.get(f"/api/v1/places/{place['id']}?fields=nope").status_code, 400)
+
+    def test_get_place_sparse_etag(self):
+        """Test a sparse representation has its own ETag"""
+        place = self.create_place("Tagged House")
+        url = f"/api/v1/places/{place['id']}"
+        full, sparse = self.client.get(url), self.client.get(url + "?fields=title")
+        self.assertNotEqual(full.headers["ETag"], sparse.headers["ETag"])
+        response = self.client.get(url + "?fields=title", headers={"If-None-Match": full.headers["ETag"]})
+        self.assertEqual(response.status_code, 200)
+
+    def test_places_query_budget(self):
+        """Test place reads run a fixed number of statements, whatever the number of places"""
+        wifi = self.create_amenity("Wifi")
+        for i in range(10):
+            place = self.create_place(f"Place {i}", amenities=[wifi])
+            self.review(place["id"], 4)
+        with assert_max_queries(6):
+            self.assertEqual(len(json.loads(self.client.get("/api/v1/places/").data)), 10)
+        with assert_max_queries(4):
+            self.client.get("/api/v1/places/?fields=title,average_rating")
+        with assert_max_queries(5):
+            self.client.get("/api/v1/places/?fields=title&include=reviews")
+        with assert_max_queries(4):
+            self.client.get("/api/v1/places/search?lat=37.77&lng=-122.42&k=10")
+        with assert_max_queries(5):
+            self.client.get(f"/api/v1/places/{place['id']}")
+
+
+if __name__ == "__main__":
+    unittest.main()
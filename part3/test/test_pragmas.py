@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text
+
+from app import create_app, db
+from app.pragmas import pragma_statements
+from config import ProductionConfig, TestingConfig
+
+
+class TestSQLitePragmas(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def pragma(self, app, name):
+        with app.app_context():
+            value = db.session.execute(text(f'PRAGMA {name}')).scalar()
+            db.session.remove()
+            db.engine.dispose()
+            return value
+
+    def test_production_profile_applied(self):
+        """Test every new connection of the production config runs the tuned pragmas"""
+        app = create_app(type('FileConfig', (ProductionConfig,), {
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.path}',
+            'PASSWORD_HASH_WORKERS': 0,
+        }))
+
+        self.assertEqual(self.pragma(app, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(app, 'synchronous'), 1)
+        self.assertEqual(self.pragma(app, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(app, 'cache_size'), -65536)
+
+    def test_no_pragmas_by_default(self):
+        """Test a config without SQLITE_PRAGMAS keeps SQLite's defaults"""
+        app = create_app(type('FileConfig', (TestingConfig,), {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.path}'}))
+
+        self.assertEqual(self.pragma(app, 'journal_mode'), 'delete')
+
+    def test_invalid_pragma(self):
+        """Test pragma names and values are restricted to words and integers"""
+        self.assertEqual(pragma_statements({'cache_size': -2000}), ['PRAGMA cache_size=-2000'])
+        with self.assertRaises(ValueError):
+            pragma_statements({'journal_mode': 'WAL; DROP TABLE users'})
+        with self.assertRaises(ValueError):
+            pragma_statements({'user_version=1; --': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
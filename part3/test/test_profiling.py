@@ -0,0 +1,78 @@
+import os
+import pstats
+import shutil
+import tempfile
+import time
+import unittest
+
+from app import create_app
+from config import TestingConfig
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_app(self, **settings):
+        config = type("ProfilingConfig", (TestingConfig,), dict(PROFILE_DIR=self.directory, **settings))
+        app = create_app(config)
+
+        @app.route("/_slow")
+        def slow():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+            return "ok"
+
+        return app
+
+    def test_off_by_default(self):
+        """Test the app is left untouched without a token or a sample rate"""
+        app = self.make_app()
+        self.assertEqual(type(app.wsgi_app).__name__, "method")
+        response = app.test_client().get("/_slow", headers={"X-Profile-Token": "anything"})
+        self.assertNotIn("X-Profile-Id", response.headers)
+        self.assertEqual(app.test_client().get("/_profiles").status_code, 404)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_cprofile_with_token(self):
+        """Test a request with the token gets a pstats profile, listed and downloadable"""
+        client = self.make_app(PROFILE_TOKEN="secret").test_client()
+        self.assertNotIn("X-Profile-Id", client.get("/_slow", headers={"X-Profile-Token": "wrong"}).headers)
+        profile_id = client.get("/_slow", headers={"X-Profile-Token": "secret"}).headers["X-Profile-Id"]
+
+        self.assertEqual(client.get("/_profiles").status_code, 403)
+        profiles = client.get("/_profiles", headers={"X-Profile-Token": "secret"}).get_json()
+        self.assertEqual([p["id"] for p in profiles], [profile_id])
+        self.assertRegex(profiles[0]["name"], r"-GET-slow-\d+ms\.prof$")
+        stats = pstats.Stats(os.path.join(self.directory, profiles[0]["name"]))
+        self.assertTrue(any(name == "slow" for _, _, name in stats.stats))
+
+        response = client.get(f"/_profiles/{profiles[0]['name']}", headers={"X-Profile-Token": "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get("/_profiles/..%2Fconfig.py", headers={"X-Profile-Token": "secret"}).status_code, 404)
+
+    def test_sampling_rate(self):
+        """Test sampled requests get collapsed stacks naming the view"""
+        client = self.make_app(PROFILE_SAMPLE_RATE=1.0, PROFILE_MODE="sampling", PROFILE_SAMPLE_INTERVAL=0.001).test_client()
+        self.assertIn("X-Profile-Id", client.get("/_slow").headers)
+        [name] = os.listdir(self.directory)
+        self.assertTrue(name.endswith(".collapsed"))
+        with open(os.path.join(self.directory, name)) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+        self.assertTrue(any("slow (test_profiling.py" in line for line in lines))
+
+    def test_keeps_newest_profiles(self):
+        client = self.make_app(PROFILE_TOKEN="secret", PROFILE_KEEP=2).test_client()
+        for _ in range(4):
+            client.get("/_slow", headers={"X-Profile-Token": "secret", "X-Profile-Mode": "sampling"})
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from sqlalchemy import text
+
+from app import create_app, db
+from app.querystats import assert_max_queries, record_queries, statement_shape
+
+
+class TestQueryStats(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("config.TestingConfig")
+
+        @self.app.route("/_repeat/<int:n>")
+        def repeat(n):
+            for i in range(n):
+                db.session.execute(text("SELECT :i"), {"i": i})
+            return "ok"
+
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        self.app_context.pop()
+
+    def test_server_timing_header(self):
+        """Test the number of statements of a request is reported"""
+        response = self.client.get("/_repeat/3")
+        self.assertRegex(response.headers["Server-Timing"], r'^db;dur=\d+\.\d{2};desc="3 queries"$')
+
+        self.app.config["QUERY_STATS"] = False
+        self.assertNotIn("Server-Timing", self.client.get("/_repeat/3").headers)
+
+    def test_repeated_statement_warning(self):
+        """Test a statement run more than QUERY_REPEAT_WARNING times is logged"""
+        self.app.config["QUERY_REPEAT_WARNING"] = 4
+        with self.assertLogs(self.app.logger, "WARNING") as logs:
+            self.client.get("/_repeat/5")
+        self.assertIn("GET /_repeat/5 ran the same statement 5 times", logs.output[0])
+        with self.assertNoLogs(self.app.logger, "WARNING"):
+            self.client.get("/_repeat/4")
+
+    def test_assert_max_queries(self):
+        """Test the budget helper passes within budget and lists the statements otherwise"""
+        with assert_max_queries(2):
+            self.client.get("/_repeat/2")
+        with self.assertRaises(AssertionError) as failure:
+            with assert_max_queries(2):
+                self.client.get("/_repeat/3")
+        self.assertIn("3 queries run, at most 2 expected", str(failure.exception))
+        self.assertIn("3 x SELECT ?", str(failure.exception))
+
+    def test_nested_recorders(self):
+        """Test a statement counts in every active recorder"""
+        with record_queries() as outer:
+            db.session.execute(text("SELECT 1"))
+            with record_queries() as inner:
+                db.session.execute(text("SELECT 2"))
+        db.session.execute(text("SELECT 3"))
+        self.assertEqual((outer.count, inner.count), (2, 1))
+
+    def test_statement_shape(self):
+        """Test IN lists and whitespace do not split one statement shape"""
+        self.assertEqual(statement_shape("SELECT *\n  FROM t WHERE id IN (?, ?, ?)"),
+                         statement_shape("SELECT * FROM t WHERE id IN (?)"))
+        self.assertEqual(statement_shape("SELECT * FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s)"),
+                         "SELECT * FROM t WHERE id IN (?)")
+
+
+if __name__ == "__main__":
+    unittest.main()
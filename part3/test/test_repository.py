@@ -0,0 +1,121 @@
+import unittest
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+
+from app import create_app, db
+from app.models.amenity import Amenity
+from app.services import facade
+
+
+class TestSQLAlchemyRepository(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("config.TestingConfig")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = facade.create_user({
+            "first_name": "Repo",
+            "last_name": "Owner",
+            "email": "repo.owner@example.com",
+            "password": "password",
+        })
+        self.amenity = facade.create_amenity({"name": "Wi-Fi"})
+        self.place = facade.create_place({
+            "title": "Loft",
+            "description": "A loft",
+            "price": 80,
+            "latitude": 10.0,
+            "longitude": 20.0,
+            "owner_id": self.user.id,
+        })
+        facade.add_amenity_to_place(self.place.id, self.amenity.id)
+        facade.create_review({
+            "text": "Nice",
+            "rating": 4,
+            "user_id": self.user.id,
+            "place_id": self.place.id,
+        })
+        # Start every test from an empty identity map
+        db.session.expunge_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_get_all_selectin_load(self):
+        """Test relationships listed in load are populated by the query"""
+        places = facade.place_repo.get_all(load=("amenities_r", "reviews_r"), raise_on_lazy=True)
+
+        self.assertEqual(len(places), 1)
+        self.assertEqual([a.name for a in places[0].amenities_r], ["Wi-Fi"])
+        self.assertEqual([r.text for r in places[0].reviews_r], ["Nice"])
+
+    def test_get_all_raise_on_lazy(self):
+        """Test a relationship that was not asked for raises instead of lazy loading"""
+        places = facade.place_repo.get_all(load=("amenities_r",), raise_on_lazy=True)
+
+        with self.assertRaises(InvalidRequestError):
+            places[0].owner_r
+
+    def test_get_all_columns(self):
+        """Test a column projection returns rows carrying only those columns"""
+        users = facade.user_repo.get_all(columns=("id", "email"))
+
+        self.assertEqual(users[0].email, "repo.owner@example.com")
+        self.assertEqual(tuple(users[0]._fields), ("id", "email"))
+
+    def test_get_all_unknown_column(self):
+        """Test projecting a column that does not exist is rejected"""
+        with self.assertRaises(ValueError):
+            facade.user_repo.get_all(columns=("id", "nope"))
+
+    def test_add_many_is_all_or_nothing(self):
+        """Test a failing chunk rolls back the chunks flushed before it"""
+        invalid = Amenity(name="Spa")
+        invalid._name = None  # Past the setter, so that the INSERT fails on NOT NULL
+
+        with self.assertRaises(IntegrityError):
+            facade.amenity_repo.add_many([Amenity(name="Sauna"), Amenity(name="Gym"), invalid], chunk_size=2)
+        names = {amenity.name for amenity in facade.amenity_repo.get_all()}
+        self.assertEqual(names, {"Wi-Fi"})
+
+    def page_query_plan(self, get_page):
+        """EXPLAIN QUERY PLAN details of the SELECT run by get_page(cursor) for a cursor past the first row"""
+        _, cursor = get_page(None)
+        statements = []
+
+        def capture(conn, cursor_, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            get_page(cursor)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+        statement, parameters = next((s, p) for s, p in statements if "LIMIT" in s)
+        with db.engine.connect() as connection:
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        return [row[-1] for row in rows]
+
+    def test_get_page_seeks_the_cursor(self):
+        """Test a page after a cursor seeks the (column, id) index rather than scanning it"""
+        for i in range(3):
+            owner = facade.create_user({"first_name": "Page", "last_name": f"User{i}",
+                                        "email": f"page{i}@example.com", "password": "password"})
+            facade.create_place({"title": f"Page {i}", "description": "Paged", "price": 50 + i,
+                                 "latitude": 1.0, "longitude": 2.0, "owner_id": owner.id})
+        plans = [
+            self.page_query_plan(lambda cursor: facade.user_repo.get_page(1, cursor)),
+            self.page_query_plan(lambda cursor: facade.get_places_page(1, cursor, sort="-rating")),
+            self.page_query_plan(lambda cursor: facade.get_places_page(1, cursor, sort="price")),
+        ]
+        for plan in plans:
+            self.assertTrue(any(detail.startswith("SEARCH") for detail in plan), plan)
+            self.assertFalse(any(detail.startswith("SCAN") or "TEMP B-TREE" in detail for detail in plan), plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import json
+import unittest
+
+from sqlalchemy import text
+
+from app import create_app, db
+from app.querystats import assert_max_queries
+from app.services import facade
+
+
+class TestReviewEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # Create a test user
+        user_response = self.client.post(
+            "/api/v1/users/",
+            json={
+                "first_name": "Review",
+                "last_name": "Writer",
+                "email": "review.writer@example.com",
+                "password": "password",
+            },
+        )
+        self.user_data = json.loads(user_response.data)
+
+        # Create a test place
+        place_response = self.client.post(
+            "/api/v1/places/",
+            json={
+                "title": "Place for Reviews",
+                "description": "A place to test reviews",
+                "price": 120.00,
+                "latitude": 37.7749,
+                "longitude": -122.4194,
+                "owner_id": self.user_data["id"],
+                "amenities": [],
+            },
+        )
+        self.place_data = json.loads(place_response.data)["place"]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create_review(self, text="Great stay", rating=5):
+        response = self.client.post(
+            "/api/v1/reviews/",
+            json={
+                "text": text,
+                "rating": rating,
+                "user_id": self.user_data["id"],
+                "place_id": self.place_data["id"],
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+        return json.loads(response.data)
+
+    def test_create_review_success(self):
+        """Test creating a review with valid data"""
+        data = self.create_review()
+
+        self.assertEqual(data["user_id"], self.user_data["id"])
+        self.assertEqual(data["place_id"], self.place_data["id"])
+
+    def test_get_reviews_sparse(self):
+        """Test ?fields= and ?include= on reviews"""
+        review = self.create_review(rating=4)
+        data = json.loads(self.client.get("/api/v1/reviews/?fields=rating&include=user").data)
+        self.assertEqual(data, [{
+            "id": review["id"], "rating": 4,
+            "user": {"id": self.user_data["id"], "first_name": "Review", "last_name": "Writer"},
+        }])
+        data = json.loads(self.client.get(f"/api/v1/reviews/{review['id']}?include=place").data)
+        self.assertEqual(data["place"], {"id": self.place_data["id"], "title": "Place for Reviews"})
+        self.assertEqual(data["text"], "Great stay")
+
+    def test_get_review_conditional_with_include(self):
+        """Test the ETag of a review embedding its place changes when the place does"""
+        review = self.create_review()
+        url = f"/api/v1/reviews/{review['id']}?include=place"
+        etag = self.client.get(url).headers["ETag"]
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": etag}).status_code, 304)
+
+        facade.update_place(self.place_data["id"], {"title": "Renamed place"})
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)["place"]["title"], "Renamed place")
+        # Without ?include= the review alone did not change
+        plain = f"/api/v1/reviews/{review['id']}"
+        self.assertEqual(self.client.get(plain, headers={"If-None-Match": self.client.get(plain).headers["ETag"]})
+                         .status_code, 304)
+
+    def test_reviews_query_budget(self):
+        """Test review lists run a fixed number of statements, whatever the number of reviews"""
+        for rating in range(1, 6):
+            self.create_review(rating=rating)
+        with assert_max_queries(2):
+            self.assertEqual(len(json.loads(self.client.get("/api/v1/reviews/").data)), 5)
+        with assert_max_queries(4):
+            self.client.get("/api/v1/reviews/?include=user,place")
+
+    def test_create_reviews_batch(self):
+        """Test a batch of reviews reports unknown references per item"""
+        review = {
+            "text": "Batch review",
+            "rating": 4,
+            "user_id": self.user_data["id"],
+            "place_id": self.place_data["id"],
+        }
+        response = self.client.post(
+            "/api/v1/reviews/batch",
+            json=[review, dict(review, place_id="nonexistent-place-id"), "not an object"],
+        )
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(data["results"][0]["status"], 201)
+        self.assertEqual(data["results"][1]["error"], "Place not found")
+        self.assertEqual(data["results"][2]["status"], 400)
+
+        reviews = json.loads(
+            self.client.get(f"/api/v1/reviews/places/{self.place_data['id']}/reviews").data
+        )
+        self.assertEqual([r["id"] for r in reviews], [data["results"][0]["id"]])
+
+    def place_stats(self):
+        place = json.loads(self.client.get(f"/api/v1/places/{self.place_data['id']}").data)
+        return place["review_count"], place["average_rating"], place["rating_histogram"]
+
+    def test_review_aggregates_follow_changes(self):
+        """Test the place's count, average and histogram after create, update and delete"""
+        self.assertEqual(self.place_stats(), (0, None, {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}))
+
+        first = self.create_review(rating=5)
+        self.create_review(rating=2)
+        self.assertEqual(self.place_stats(), (2, 3.5, {"1": 0, "2": 1, "3": 0, "4": 0, "5": 1}))
+
+        self.client.put(
+            f"/api/v1/reviews/{first['id']}",
+            json={"text": "Changed my mind", "rating": 1, "user_id": self.user_data["id"]},
+        )
+        self.assertEqual(self.place_stats(), (2, 1.5, {"1": 1, "2": 1, "3": 0, "4": 0, "5": 0}))
+
+        self.client.delete(f"/api/v1/reviews/{first['id']}", json={"user_id": self.user_data["id"]})
+        self.assertEqual(self.place_stats(), (1, 2.0, {"1": 0, "2": 1, "3": 0, "4": 0, "5": 0}))
+
+    def test_review_aggregates_batch(self):
+        """Test reviews created in a batch are counted"""
+        review = {"text": "Batch", "user_id": self.user_data["id"], "place_id": self.place_data["id"]}
+        self.client.post("/api/v1/reviews/batch", json=[dict(review, rating=r) for r in (3, 4, 5)])
+        self.assertEqual(self.place_stats()[:2], (3, 4.0))
+
+    def test_review_rating_out_of_range(self):
+        """Test a rating outside 1-5 is rejected and not counted"""
+        response = self.client.post(
+            "/api/v1/reviews/",
+            json={"text": "Off the scale", "rating": 6,
+                  "user_id": self.user_data["id"], "place_id": self.place_data["id"]},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.place_stats()[0], 0)
+
+    def test_repair_review_stats(self):
+        """Test the repair recomputes aggregates that drifted from the reviews"""
+        self.create_review(rating=4)
+        db.session.execute(text("UPDATE places SET review_count = 7, rating_3 = 2"))
+        db.session.commit()
+
+        self.assertEqual(facade.repair_review_stats(), 1)
+        self.assertEqual(self.place_stats(), (1, 4.0, {"1": 0, "2": 0, "3": 0, "4": 1, "5": 0}))
+        self.assertEqual(facade.repair_review_stats(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import unittest
+from types import SimpleNamespace
+
+from flask_restx import Model, fields, marshal
+
+from app.api.v1 import serializers
+from app.api.v1.places import place_output_model, place_search_model
+
+
+class TestSerializers(unittest.TestCase):
+    def assertSameAsMarshal(self, model, *objects):
+        serialize = serializers.compile_model(model)
+        for obj in objects:
+            expected = marshal(obj, model)
+            self.assertEqual(serialize(obj), expected)
+            self.assertEqual(list(serialize(obj)), list(expected))
+
+    def test_place_models(self):
+        """Test the compiled place models output what marshal() does"""
+        place = {
+            "id": "p1", "title": "Loft", "description": None, "price": 80, "latitude": 48.8, "longitude": 2,
+            "owner_id": "u1", "review_count": 1, "average_rating": 4.0, "rating_histogram": {"4": 1},
+            "amenities": [{"id": "a1", "name": "Wifi", "extra": True}],
+            "reviews": [{"id": "r1", "text": "Nice", "rating": 4, "user_id": "u2", "place_id": "p1"}],
+        }
+        self.assertSameAsMarshal(place_output_model, place, dict(place, amenities=None, reviews=[]), {})
+        self.assertSameAsMarshal(place_search_model, dict(place, distance_km=1.5))
+
+    def test_field_options(self):
+        """Test defaults, attributes, null nesting, scalar lists and objects"""
+        child = Model("Child", {"name": fields.String})
+        model = Model("Options", {
+            "count": fields.Integer(default=0),
+            "label": fields.String(attribute="name"),
+            "path": fields.String(attribute="child.name"),
+            "flag": fields.Boolean,
+            "child": fields.Nested(child),
+            "maybe": fields.Nested(child, allow_null=True),
+            "tags": fields.List(fields.String),
+            "children": fields.List(fields.Nested(child)),
+            "when": fields.DateTime,
+        })
+        self.assertSameAsMarshal(
+            model,
+            {"name": "n", "flag": "false", "child": {"name": 3}, "tags": [1, None], "children": [{"name": "c"}]},
+            {"child": None, "tags": None, "children": [None]},
+            SimpleNamespace(name="obj", flag=1, child=SimpleNamespace(name="o"), tags=("a",), children=[]),
+        )
+
+    def test_wildcard_falls_back_to_marshal(self):
+        model = Model("Wild", {"*": fields.Wildcard(fields.String)})
+        self.assertSameAsMarshal(model, {"a": 1, "b": "x"})
+
+    def test_dumps_without_orjson(self):
+        """Test the json module fallback encodes the same document"""
+        data = {"a": [1, 2.5, None], "b": "é"}
+        orjson, serializers.orjson = serializers.orjson, None
+        try:
+            self.assertEqual(json.loads(serializers.dumps(data)), data)
+        finally:
+            serializers.orjson = orjson
+        self.assertEqual(json.loads(serializers.dumps(data)), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import json
+import unittest
+
+from app import create_app, db
+from app.services import facade
+from app.querystats import assert_max_queries
+
+
+class TestUserEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("config.TestingConfig")
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create_user(self, email):
+        response = self.client.post(
+            "/api/v1/users/",
+            json={
+                "first_name": "John",
+                "last_name": "Doe",
+                "email": email,
+                "password": "password",
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+        return json.loads(response.data)
+
+    def test_create_user_success(self):
+        """Test creating a user with valid data"""
+        data = self.create_user("john.doe@example.com")
+
+        self.assertIn("id", data)
+        self.assertEqual(data["email"], "john.doe@example.com")
+
+    def test_get_users_paginated(self):
+        """Test users are paginated with a stable order and a final empty cursor"""
+        ids = [self.create_user(f"user{i}@example.com")["id"] for i in range(3)]
+
+        first = json.loads(self.client.get("/api/v1/users/?limit=2").data)
+        self.assertEqual(len(first["items"]), 2)
+        self.assertIsNotNone(first["next_cursor"])
+
+        second = json.loads(
+            self.client.get(f"/api/v1/users/?limit=2&cursor={first['next_cursor']}").data
+        )
+        self.assertEqual(len(second["items"]), 1)
+        self.assertIsNone(second["next_cursor"])
+
+        seen = [u["id"] for u in first["items"] + second["items"]]
+        self.assertEqual(sorted(seen), sorted(ids))
+
+    def test_get_users_ndjson_stream(self):
+        """Test users are streamed as NDJSON without leaking password hashes"""
+        self.create_user("stream@example.com")
+        response = self.client.get(
+            "/api/v1/users/", headers={"Accept": "application/x-ndjson"}
+        )
+
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["email"], "stream@example.com")
+        self.assertNotIn("password", rows[0])
+
+    def test_get_user_conditional(self):
+        """Test If-None-Match and If-Modified-Since on a user"""
+        user = self.create_user("etag@example.com")
+        url = f"/api/v1/users/{user['id']}"
+        response = self.client.get(url)
+        etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": etag}).status_code, 304)
+        self.assertEqual(self.client.get(url, headers={"If-Modified-Since": last_modified}).status_code, 304)
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": '"other"'}).status_code, 200)
+
+    def test_get_user_conditional_with_include(self):
+        """Test the ETag of a user embedding their reviews changes when a review does"""
+        user = self.create_user("include@example.com")
+        place = facade.create_place({"title": "Flat", "description": "A flat", "price": 80, "latitude": 1.0,
+                                     "longitude": 2.0, "owner_id": user["id"]})
+        review = facade.create_review({"text": "Good", "rating": 4, "user_id": user["id"], "place_id": place.id})
+        url = f"/api/v1/users/{user['id']}?include=reviews"
+        etag = self.client.get(url).headers["ETag"]
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": etag}).status_code, 304)
+
+        response = self.client.put(f"/api/v1/reviews/{review.id}",
+                                   json={"text": "Better", "rating": 5, "user_id": user["id"]})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)["reviews"][0]["text"], "Better")
+
+    def test_update_user_if_match(self):
+        """Test a PUT with a stale If-Match is refused with 412"""
+        user = self.create_user("match@example.com")
+        url = f"/api/v1/users/{user['id']}"
+        etag = self.client.get(url).headers["ETag"]
+        update = {"first_name": "Jane", "last_name": "Doe", "email": "match@example.com"}
+
+        self.assertEqual(self.client.put(url, json=update, headers={"If-Match": etag}).status_code, 200)
+        response = self.client.put(url, json=dict(update, first_name="Late"), headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 412)
+
+    def test_get_users_sparse(self):
+        """Test ?fields= and ?include= on users"""
+        user = self.create_user("sparse@example.com")
+        data = json.loads(self.client.get("/api/v1/users/?fields=email").data)
+        self.assertEqual(data, [{"id": user["id"], "email": "sparse@example.com"}])
+
+        data = json.loads(self.client.get(f"/api/v1/users/{user['id']}?fields=first_name&include=places,reviews").data)
+        self.assertEqual(data, {"id": user["id"], "first_name": "John", "places": [], "reviews": []})
+        self.assertEqual(self.client.get("/api/v1/users/?fields=password").status_code, 400)
+
+    def test_users_query_budget(self):
+        """Test user lists run a fixed number of statements, whatever the number of users"""
+        for i in range(5):
+            self.create_user(f"budget{i}@example.com")
+        with assert_max_queries(2):
+            self.assertEqual(len(json.loads(self.client.get("/api/v1/users/").data)), 5)
+        with assert_max_queries(4):
+            self.client.get("/api/v1/users/?include=places,reviews")
+
+
+if __name__ == "__main__":
+    unittest.main()